@@ -1,21 +1,28 @@
 """FastAPI应用主入口"""
+import asyncio
+import json
 import os
 import re
-from fastapi import FastAPI, HTTPException, status
+import time
+import uuid
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Iterator, Tuple
 import uvicorn
 
-from config import KeyManager, get_default_config, config as app_config
+from core.cancellation import CancellationToken
+from config import KeyManager, MODEL_MAPPING, get_default_config, config as app_config
 from scenarios import (
     PropertyChatbotService,
     WorkOrderAIService,
     ContractAuditService,
     KnowledgeQAService
 )
-from services import ChatService, RAGService
-from utils import default_logger
+from services import ChatService, RAGService, SemanticCache
+from utils import CoalescePolicy, coalesce_stream, default_logger, default_metrics
 
 # CORS 配置
 DEFAULT_CORS_ORIGINS = [
@@ -64,12 +71,117 @@ def _sanitize_error(error: Exception) -> str:
     return error_str
 
 
+async def _iterate_until_disconnect(
+    http_request: Request,
+    stream: Iterator,
+    cancel_token: CancellationToken,
+    endpoint: str
+) -> AsyncIterator:
+    """在线程池中迭代同步流，客户端断开时取消令牌
+
+    取消会立即关闭上游 HTTP 响应，正在阻塞读取的线程随之返回，不再继续消耗输出 token。
+    """
+    iterator = iter(stream)
+    done = object()
+    disconnected = False
+    try:
+        while True:
+            if await http_request.is_disconnected():
+                disconnected = True
+                break
+            chunk = await run_in_threadpool(next, iterator, done)
+            if chunk is done:
+                break
+            yield chunk
+    except (GeneratorExit, asyncio.CancelledError):
+        # 客户端断开后 StreamingResponse 取消任务或关闭生成器
+        disconnected = True
+        raise
+    finally:
+        if disconnected:
+            cancel_token.cancel()
+            default_metrics.inc("stream_client_disconnects", endpoint=endpoint)
+            try:
+                iterator.close()
+            except (AttributeError, ValueError):
+                # 非生成器或正在其它线程中执行：取消后该线程会自行结束
+                pass
+
+
+def _coalesce_policy(requested: Optional[bool]) -> Optional[CoalescePolicy]:
+    """流式片段合并策略：请求未指定时按服务配置"""
+    enabled = app_config.stream_coalesce_enabled if requested is None else requested
+    if not enabled:
+        return None
+    return CoalescePolicy(
+        max_bytes=app_config.stream_coalesce_max_bytes,
+        max_delay=app_config.stream_coalesce_max_delay_ms / 1000,
+        sentence=app_config.stream_coalesce_sentence
+    )
+
+
+def _sse_frame(text: str) -> str:
+    """文本编码为 SSE 帧（多行文本每行一个 data 字段，客户端按换行拼回）"""
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+
+def _event_frame(event: str, data: Dict[str, Any], fmt: str) -> str:
+    """结构化事件编码为 SSE 帧（event 字段为事件名）或 NDJSON 行"""
+    if fmt == "ndjson":
+        return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _split_deltas(events: AsyncIterator) -> AsyncIterator:
+    """delta 事件展开为文本片段（供合并），其余事件原样输出"""
+    async for event, data in events:
+        if event == "delta":
+            yield data["text"]
+        else:
+            yield event, data
+
+
+def _structured_stream_response(
+    http_request: Request,
+    events: Iterator,
+    endpoint: str,
+    fmt: str,
+    coalesce: Optional[bool],
+    cancel_token: CancellationToken,
+    result_model: type
+):
+    """把服务产出的 (事件名, 数据) 流转为 SSE/NDJSON 响应
+
+    delta 文本按合并策略合并，最后的 result 事件按非流式接口的响应模型整理。
+    """
+    from fastapi.responses import StreamingResponse
+
+    async def generate():
+        try:
+            source = _iterate_until_disconnect(http_request, events, cancel_token, endpoint)
+            async for item in coalesce_stream(_split_deltas(source), _coalesce_policy(coalesce)):
+                if isinstance(item, str):
+                    yield _event_frame("delta", {"text": item}, fmt)
+                    continue
+                event, data = item
+                if event == "result":
+                    data = result_model(**data).model_dump()
+                yield _event_frame(event, data, fmt)
+        except Exception as e:
+            default_logger.error(f"{endpoint} stream error: {str(e)}")
+            yield _event_frame("result", {"success": False, "error": _sanitize_error(e)}, fmt)
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/event-stream"
+    return StreamingResponse(generate(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
 class ChatRequest(BaseModel):
     """聊天请求"""
     message: str = Field(..., description="用户消息", min_length=1, max_length=10000)
     session_id: Optional[str] = Field(default="default", description="会话ID", max_length=64)
     temperature: Optional[float] = Field(default=0.7, description="温度参数", ge=0, le=2)
     history: Optional[List[Dict]] = Field(default=None, description="历史消息")
+    stream_coalesce: Optional[bool] = Field(default=None, description="流式输出是否合并小片段（默认按服务配置）")
 
     @validator('session_id')
     def validate_session_id(cls, v):
@@ -86,6 +198,7 @@ class ChatResponse(BaseModel):
     session_id: Optional[str] = None
     usage: Optional[Dict] = None
     error: Optional[str] = None
+    cached: Optional[bool] = None
 
 
 class WorkOrderProcessRequest(BaseModel):
@@ -93,6 +206,8 @@ class WorkOrderProcessRequest(BaseModel):
     content: str = Field(..., description="工单内容", min_length=1, max_length=5000)
     provider: Optional[str] = Field(default="deepseek", description="模型提供商")
     model: Optional[str] = Field(default=None, description="模型名称")
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存（默认按温度自动判断）")
+    stream_coalesce: Optional[bool] = Field(default=None, description="流式输出是否合并小片段（默认按服务配置）")
 
 
 class WorkOrderProcessResponse(BaseModel):
@@ -100,6 +215,25 @@ class WorkOrderProcessResponse(BaseModel):
     success: bool
     result: Optional[Dict] = None
     error: Optional[str] = None
+    finish_reason: Optional[str] = Field(default=None, description="结束原因（json_complete 表示 JSON 结果完成后提前结束）")
+
+
+class WorkOrderBatchItem(BaseModel):
+    """批量处理中的单个工单"""
+    id: str = Field(..., description="工单ID（原样返回在结果中）", min_length=1, max_length=128)
+    content: str = Field(..., description="工单内容", min_length=1, max_length=5000)
+
+
+class WorkOrderBatchRequest(BaseModel):
+    """批量工单处理请求"""
+    items: List[WorkOrderBatchItem] = Field(..., description="工单列表", min_length=1)
+    concurrency: Optional[int] = Field(default=None, description="并发处理数（不超过服务配置的上限）", ge=1)
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存（默认按温度自动判断）")
+
+
+class WorkOrderBatchResult(WorkOrderProcessResponse):
+    """批量处理中单个工单的结果"""
+    id: str
 
 
 class ContractAuditRequest(BaseModel):
@@ -107,6 +241,8 @@ class ContractAuditRequest(BaseModel):
     content: str = Field(..., description="合同内容", min_length=1, max_length=20000)
     provider: Optional[str] = Field(default="qianwen", description="模型提供商")
     model: Optional[str] = Field(default=None, description="模型名称")
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存（默认按温度自动判断）")
+    stream_coalesce: Optional[bool] = Field(default=None, description="流式输出是否合并小片段（默认按服务配置）")
 
 
 class ContractAuditResponse(BaseModel):
@@ -114,12 +250,14 @@ class ContractAuditResponse(BaseModel):
     success: bool
     result: Optional[Dict] = None
     error: Optional[str] = None
+    finish_reason: Optional[str] = Field(default=None, description="结束原因（json_complete 表示 JSON 结果完成后提前结束）")
 
 
 class KnowledgeQueryRequest(BaseModel):
     """知识库问答请求"""
     question: str = Field(..., description="问题", min_length=1, max_length=500)
     knowledge: Optional[List[str]] = Field(default=None, description="知识库内容", max_length=100)
+    stream_coalesce: Optional[bool] = Field(default=None, description="流式输出是否合并小片段（默认按服务配置）")
 
 
 class KnowledgeQueryResponse(BaseModel):
@@ -145,10 +283,19 @@ def get_chatbot_service() -> PropertyChatbotService:
     """获取智能客服服务实例"""
     if "chatbot" not in _services:
         config = get_default_config("property_chatbot")
+        semantic_cache = None
+        if app_config.semantic_cache_enabled:
+            semantic_cache = SemanticCache(
+                threshold=app_config.semantic_cache_threshold,
+                max_entries=app_config.semantic_cache_max_entries,
+                default_ttl=app_config.semantic_cache_ttl,
+                name="property_chatbot"
+            )
         _services["chatbot"] = PropertyChatbotService(
             provider=config.provider,
             model=config.model,
-            temperature=config.temperature
+            temperature=config.temperature,
+            semantic_cache=semantic_cache
         )
     return _services["chatbot"]
 
@@ -185,6 +332,42 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """运行指标"""
+    from core.response_cache import get_response_cache
+
+    from core.circuit_breaker import breaker_stats
+    from core.concurrency import concurrency_stats
+    from core.rate_limiter import rate_limiter_stats
+    from core.router import router_scores
+    from core.scheduler import scheduler_stats
+    from core.single_flight import get_single_flight
+
+    result = {
+        "metrics": default_metrics.snapshot(),
+        "llm_cache": get_response_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "routers": router_scores(),
+        "circuit_breakers": breaker_stats(),
+        "rate_limiters": rate_limiter_stats(),
+        "concurrency": concurrency_stats(),
+        "scheduler": scheduler_stats(),
+    }
+    chatbot = _services.get("chatbot")
+    if chatbot is not None and chatbot.semantic_cache is not None:
+        result["semantic_cache"] = chatbot.semantic_cache.stats()
+    return result
+
+
+@app.get("/router/scores")
+async def get_router_scores():
+    """多Provider路由各目标的实时评分"""
+    from core.router import router_scores
+
+    return {"routers": router_scores()}
+
+
 @app.get("/providers", response_model=List[ProviderInfo])
 async def get_providers():
     """获取可用的模型提供商"""
@@ -203,7 +386,8 @@ async def chat(request: ChatRequest):
     """智能客服对话接口"""
     try:
         service = get_chatbot_service()
-        result = service.chat(
+        result = await run_in_threadpool(
+            service.chat,
             user_message=request.message,
             session_id=request.session_id
         )
@@ -224,7 +408,7 @@ async def chat(request: ChatRequest):
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     """流式对话接口"""
     from fastapi.responses import StreamingResponse
 
@@ -237,16 +421,21 @@ async def chat_stream(request: ChatRequest):
             detail=_sanitize_error(e)
         )
 
+    cancel_token = CancellationToken()
+
     async def generate():
         try:
-            for chunk in service.stream_chat(
+            stream = service.stream_chat(
                 user_message=request.message,
-                session_id=request.session_id
-            ):
-                yield f"data: {chunk}\n\n"
+                session_id=request.session_id,
+                cancel_token=cancel_token
+            )
+            chunks = _iterate_until_disconnect(http_request, stream, cancel_token, "/chat/stream")
+            async for chunk in coalesce_stream(chunks, _coalesce_policy(request.stream_coalesce)):
+                yield _sse_frame(chunk)
         except Exception as e:
             default_logger.error(f"Chat stream error: {str(e)}")
-            yield f"data: [ERROR] {_sanitize_error(e)}\n\n"
+            yield _sse_frame(f"[ERROR] {_sanitize_error(e)}")
 
     return StreamingResponse(
         generate(),
@@ -275,6 +464,20 @@ async def clear_session(session_id: str):
         )
 
 
+@app.delete("/chat/cache")
+async def invalidate_chat_cache(question: Optional[str] = None):
+    """失效智能客服语义缓存（不指定问题则清空）"""
+    service = get_chatbot_service()
+    if service.semantic_cache is None:
+        return {"success": True, "invalidated": 0}
+    if question:
+        count = service.semantic_cache.invalidate(question=question)
+    else:
+        count = service.semantic_cache.stats()["entries"]
+        service.semantic_cache.clear()
+    return {"success": True, "invalidated": count}
+
+
 # ==================== 工单处理API ====================
 
 @app.post("/workorder/process", response_model=WorkOrderProcessResponse)
@@ -282,7 +485,7 @@ async def process_workorder(request: WorkOrderProcessRequest):
     """工单智能处理接口"""
     try:
         service = get_workorder_service()
-        result = service.process(request.content)
+        result = await run_in_threadpool(service.process, request.content, use_cache=request.cache)
         return WorkOrderProcessResponse(**result)
     except ValueError as e:
         default_logger.warning(f"Workorder validation error: {str(e)}")
@@ -298,6 +501,79 @@ async def process_workorder(request: WorkOrderProcessRequest):
         )
 
 
+@app.post("/workorder/process/stream")
+async def process_workorder_stream(
+    request: WorkOrderProcessRequest,
+    http_request: Request,
+    fmt: str = Query(default="sse", alias="format", pattern="^(sse|ndjson)$", description="输出格式：sse / ndjson")
+):
+    """工单智能处理流式接口（progress/delta 事件，最后为 result 事件）"""
+    try:
+        service = get_workorder_service()
+    except Exception as e:
+        default_logger.error(f"Workorder stream init error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=_sanitize_error(e)
+        )
+
+    cancel_token = CancellationToken()
+    return _structured_stream_response(
+        http_request,
+        service.process_stream(request.content, cancel_token=cancel_token),
+        "/workorder/process/stream",
+        fmt,
+        request.stream_coalesce,
+        cancel_token,
+        WorkOrderProcessResponse
+    )
+
+
+@app.post("/workorder/batch")
+async def process_workorder_batch(request: WorkOrderBatchRequest, http_request: Request):
+    """批量工单处理接口
+
+    并发处理请求中的工单，按完成顺序以 NDJSON 逐行返回结果（每行带工单ID）；
+    单个工单失败不影响其它工单，客户端断开后不再处理剩余工单。
+    """
+    from fastapi.responses import StreamingResponse
+
+    if len(request.items) > app_config.workorder_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many work orders: at most {app_config.workorder_batch_max_items} per batch"
+        )
+    ids = [item.id for item in request.items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate work order ids")
+
+    try:
+        service = get_workorder_service()
+    except Exception as e:
+        default_logger.error(f"Workorder batch init error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=_sanitize_error(e)
+        )
+
+    concurrency = min(request.concurrency or app_config.workorder_batch_concurrency,
+                      app_config.workorder_batch_concurrency)
+    cancel_token = CancellationToken()
+    results = service.process_many(
+        ((item.id, item.content) for item in request.items),
+        concurrency=concurrency,
+        use_cache=request.cache,
+        cancel_token=cancel_token
+    )
+
+    async def generate():
+        async for result in _iterate_until_disconnect(http_request, results, cancel_token, "/workorder/batch"):
+            line = WorkOrderBatchResult(**result).model_dump()
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
 # ==================== 合同审核API ====================
 
 @app.post("/contract/audit", response_model=ContractAuditResponse)
@@ -305,7 +581,7 @@ async def audit_contract(request: ContractAuditRequest):
     """合同审核接口"""
     try:
         service = get_contract_service()
-        result = service.audit(request.content)
+        result = await run_in_threadpool(service.audit, request.content, use_cache=request.cache)
         return ContractAuditResponse(**result)
     except ValueError as e:
         default_logger.warning(f"Contract validation error: {str(e)}")
@@ -321,6 +597,34 @@ async def audit_contract(request: ContractAuditRequest):
         )
 
 
+@app.post("/contract/audit/stream")
+async def audit_contract_stream(
+    request: ContractAuditRequest,
+    http_request: Request,
+    fmt: str = Query(default="sse", alias="format", pattern="^(sse|ndjson)$", description="输出格式：sse / ndjson")
+):
+    """合同审核流式接口（progress/delta 事件，最后为 result 事件）"""
+    try:
+        service = get_contract_service()
+    except Exception as e:
+        default_logger.error(f"Contract stream init error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=_sanitize_error(e)
+        )
+
+    cancel_token = CancellationToken()
+    return _structured_stream_response(
+        http_request,
+        service.audit_stream(request.content, cancel_token=cancel_token),
+        "/contract/audit/stream",
+        fmt,
+        request.stream_coalesce,
+        cancel_token,
+        ContractAuditResponse
+    )
+
+
 # ==================== 知识库问答API ====================
 
 @app.post("/knowledge/query", response_model=KnowledgeQueryResponse)
@@ -331,7 +635,7 @@ async def query_knowledge(request: KnowledgeQueryRequest):
         service = KnowledgeQAService(
             knowledge_base=request.knowledge or []
         )
-        result = service.query(request.question)
+        result = await run_in_threadpool(service.query, request.question)
         return KnowledgeQueryResponse(**result)
     except ValueError as e:
         default_logger.warning(f"Knowledge query validation error: {str(e)}")
@@ -347,6 +651,36 @@ async def query_knowledge(request: KnowledgeQueryRequest):
         )
 
 
+@app.post("/knowledge/query/stream")
+async def query_knowledge_stream(
+    request: KnowledgeQueryRequest,
+    http_request: Request,
+    fmt: str = Query(default="sse", alias="format", pattern="^(sse|ndjson)$", description="输出格式：sse / ndjson")
+):
+    """知识库问答流式接口（progress/delta 事件，最后为 result 事件）"""
+    try:
+        service = KnowledgeQAService(
+            knowledge_base=request.knowledge or []
+        )
+    except Exception as e:
+        default_logger.error(f"Knowledge stream init error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=_sanitize_error(e)
+        )
+
+    cancel_token = CancellationToken()
+    return _structured_stream_response(
+        http_request,
+        service.query_stream(request.question, cancel_token=cancel_token),
+        "/knowledge/query/stream",
+        fmt,
+        request.stream_coalesce,
+        cancel_token,
+        KnowledgeQueryResponse
+    )
+
+
 @app.post("/knowledge/add")
 async def add_knowledge(knowledge: List[str]):
     """添加知识到知识库"""
@@ -363,6 +697,7 @@ class LLMChatRequest(BaseModel):
     model: Optional[str] = Field(default=None, description="模型名称")
     temperature: Optional[float] = Field(default=0.7, description="温度参数")
     max_tokens: Optional[int] = Field(default=2048, description="最大token数")
+    cache: Optional[bool] = Field(default=None, description="是否使用响应缓存（默认按温度自动判断）")
 
 
 @app.post("/llm/chat")
@@ -371,22 +706,25 @@ async def llm_chat(request: LLMChatRequest):
     try:
         from core import LLMFactory
 
-        llm = LLMFactory.create(
+        llm = LLMFactory.create_for_scenario(
+            "llm_chat",
             provider=request.provider,
             model=request.model
         )
 
-        response = llm.chat(
+        response = await llm.achat(
             messages=request.messages,
             temperature=request.temperature,
-            max_tokens=request.max_tokens
+            max_tokens=request.max_tokens,
+            cache=request.cache
         )
 
         return {
             "success": True,
             "content": response.content,
             "model": response.model,
-            "usage": response.usage
+            "usage": response.usage,
+            "cached": response.cached
         }
     except ValueError as e:
         default_logger.warning(f"LLM chat validation error: {str(e)}")
@@ -402,6 +740,163 @@ async def llm_chat(request: LLMChatRequest):
         )
 
 
+# ==================== OpenAI兼容API ====================
+
+# 由网关解析的请求字段，其余字段原样透传给 Provider
+_PROXY_FIELDS = frozenset({"model", "messages", "temperature", "max_tokens", "stream"})
+_PROXY_ENDPOINT = "/v1/chat/completions"
+
+
+def _openai_error(status_code: int, message: str, error_type: str = "invalid_request_error") -> JSONResponse:
+    """OpenAI 格式的错误响应"""
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "code": None}}
+    )
+
+
+def _proxy_upstream_error(e: Exception) -> JSONResponse:
+    """上游调用失败：4xx/5xx 沿用上游状态码，其它错误按 502 返回"""
+    status_code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    if not isinstance(status_code, int) or status_code < 400:
+        status_code = status.HTTP_502_BAD_GATEWAY
+    error_type = "rate_limit_error" if status_code == 429 else "upstream_error"
+    default_logger.error(f"OpenAI proxy upstream error: {str(e)}")
+    return _openai_error(status_code, _sanitize_error(e), error_type)
+
+
+def _resolve_proxy_model(model: Optional[str]) -> Tuple[str, Optional[str]]:
+    """解析 model 字段：支持 provider/model、MODEL_MAPPING 中登记的模型名或 Provider 名"""
+    from core import LLMFactory
+
+    providers = LLMFactory.get_providers()
+    if not model:
+        default = get_default_config("openai_proxy")
+        return default.provider, default.model
+    if "/" in model:
+        provider, _, name = model.partition("/")
+        if provider in providers:
+            return provider, name or None
+    for provider, models in MODEL_MAPPING.items():
+        if model in models and provider in providers:
+            return provider, model
+    if model in providers:
+        return model, None
+    raise ValueError(f"The model '{model}' does not exist")
+
+
+def _completion_body(response) -> Dict[str, Any]:
+    """非流式响应体：优先原样返回上游 JSON，缺失时按 OpenAI 格式组装"""
+    raw = response.raw_response
+    if isinstance(raw, dict) and "choices" in raw:
+        return raw
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": response.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": response.content},
+            "finish_reason": response.finish_reason or "stop",
+        }],
+        "usage": response.usage or {},
+    }
+
+
+def _record_proxy_usage(provider: str, model: Optional[str], usage: Dict, source: str):
+    """记录代理请求的 token 用量（source: provider 为上游返回值，estimate 为估算值）"""
+    for kind in ("prompt_tokens", "completion_tokens"):
+        default_metrics.inc(
+            "proxy_tokens", usage.get(kind) or 0, provider=provider, model=model or "", kind=kind, source=source
+        )
+
+
+def _prepend(first: Any, iterator: Iterator) -> Iterator:
+    """把已取出的首个片段放回流的开头（关闭时一并关闭原始流）"""
+    yield first
+    yield from iterator
+
+
+@app.post(_PROXY_ENDPOINT)
+async def openai_chat_completions(http_request: Request):
+    """OpenAI 兼容的对话接口
+
+    使用网关的 Key、路由、限流等能力调用 Provider。stream=true 时上游 SSE 字节原样转发，
+    只旁路统计 token 用量；首个片段到达前的上游错误以 OpenAI 错误格式返回。
+    """
+    from fastapi.responses import StreamingResponse
+    from core import BaseLLMClient, LLMFactory, TokenCounter
+    from core.sse import SSEUsageTap
+
+    try:
+        body = await http_request.json()
+    except ValueError:
+        return _openai_error(status.HTTP_400_BAD_REQUEST, "Request body must be valid JSON")
+    if not isinstance(body, dict) or not isinstance(body.get("messages"), list) or not body["messages"]:
+        return _openai_error(status.HTTP_400_BAD_REQUEST, "'messages' must be a non-empty list")
+
+    try:
+        provider, model = _resolve_proxy_model(body.get("model"))
+    except ValueError as e:
+        return _openai_error(status.HTTP_404_NOT_FOUND, str(e), "model_not_found")
+
+    messages = body["messages"]
+    temperature = body.get("temperature", 0.7)
+    max_tokens = body.get("max_tokens", 2048)
+    # 客户端控制参数（cache、cancel_token、raw_stream 等）只供网关内部使用，不接受调用方传入
+    extra = BaseLLMClient.strip_control_params({k: v for k, v in body.items() if k not in _PROXY_FIELDS})
+    try:
+        llm = LLMFactory.create_for_scenario("openai_proxy", provider=provider, model=model)
+    except ValueError as e:
+        return _openai_error(status.HTTP_400_BAD_REQUEST, _sanitize_error(e))
+
+    if not body.get("stream"):
+        try:
+            response = await llm.achat(messages, temperature, max_tokens, **extra)
+        except Exception as e:
+            return _proxy_upstream_error(e)
+        _record_proxy_usage(provider, response.model, response.usage or {}, "provider")
+        return JSONResponse(_completion_body(response))
+
+    cancel_token = CancellationToken()
+    iterator = iter(llm.stream_chat(
+        messages, temperature, max_tokens, raw_stream=True, cancel_token=cancel_token, **extra
+    ))
+    done = object()
+    try:
+        first = await run_in_threadpool(next, iterator, done)
+    except Exception as e:
+        return _proxy_upstream_error(e)
+
+    async def relay():
+        tap = SSEUsageTap()
+        try:
+            if first is done:
+                return
+            stream = _prepend(first, iterator)
+            async for chunk in _iterate_until_disconnect(http_request, stream, cancel_token, _PROXY_ENDPOINT):
+                tap.feed(chunk)
+                yield chunk
+        finally:
+            tap.close()
+            if tap.usage is not None:
+                _record_proxy_usage(provider, model, tap.usage, "provider")
+            else:
+                # 上游未返回用量时，按提示词估算输入，按事件数估算输出
+                estimate = {
+                    "prompt_tokens": TokenCounter.count_messages_tokens(messages),
+                    "completion_tokens": tap.events,
+                }
+                _record_proxy_usage(provider, model, estimate, "estimate")
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== 启动入口 ====================
 
 def run_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = False):
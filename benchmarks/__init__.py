@@ -0,0 +1,16 @@
+"""基准测试模块"""
+from .corpus import QAPair, BenchmarkCorpus, build_synthetic_corpus, build_property_corpus
+from .embedding import HashingEmbeddingService
+from .rag_benchmark import BenchmarkConfig, BenchmarkResult, RAGBenchmark, format_results
+
+__all__ = [
+    "QAPair",
+    "BenchmarkCorpus",
+    "build_synthetic_corpus",
+    "build_property_corpus",
+    "HashingEmbeddingService",
+    "BenchmarkConfig",
+    "BenchmarkResult",
+    "RAGBenchmark",
+    "format_results",
+]
@@ -0,0 +1,163 @@
+"""基准测试语料
+
+提供两类可配置规模的语料：
+1. 合成语料：随机填充文本中嵌入唯一事实句
+2. 物业领域样例语料：按小区生成通知/规定文档，带公共页眉页脚
+
+每个问题都标注了答案文本，检索结果中包含该文本的分块即视为命中，
+因此标注与具体分块方式无关，可用于比较不同的分块配置。
+"""
+import random
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class QAPair:
+    """标注的问题-答案对"""
+    question: str
+    answer: str
+    doc_id: int
+
+
+@dataclass
+class BenchmarkCorpus:
+    """基准测试语料"""
+    name: str
+    documents: List[str]
+    qa_pairs: List[QAPair] = field(default_factory=list)
+
+    @property
+    def total_chars(self) -> int:
+        return sum(len(doc) for doc in self.documents)
+
+
+# 合成语料使用的常用汉字
+_FILLER_CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+    "十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+)
+
+_CODE_CHARS = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+_LOCATIONS = ["地下车库", "一号楼大堂", "配电房", "水泵房", "消防控制室", "东门岗亭", "会所二楼", "中心花园", "物业服务中心", "三号楼屋顶"]
+
+
+def _random_text(rng: random.Random, length: int, pool: str = _FILLER_CHARS) -> str:
+    """生成随机填充文本"""
+    sentences = []
+    remaining = length
+    while remaining > 0:
+        n = min(remaining, rng.randint(12, 30))
+        sentences.append("".join(rng.choice(pool) for _ in range(n)) + "。")
+        remaining -= n + 1
+    return "".join(sentences)
+
+
+def build_synthetic_corpus(
+    num_docs: int = 200,
+    doc_length: int = 600,
+    seed: int = 42
+) -> BenchmarkCorpus:
+    """构建合成语料
+
+    Args:
+        num_docs: 文档数量
+        doc_length: 每篇文档的大致字符数
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    documents = []
+    qa_pairs = []
+    # 问题与事实句只共享设备代号；填充文本不使用问题中的字，避免干扰词面匹配
+    template_chars = set("位于何处多长时间检查一回") | set(_CODE_CHARS)
+    pool = "".join(c for c in _FILLER_CHARS if c not in template_chars)
+
+    for doc_id in range(num_docs):
+        # 每篇文档的事实句带一个随机设备代号，问题通过代号定位答案
+        code = "".join(rng.choice(_CODE_CHARS) for _ in range(6))
+        location = rng.choice(_LOCATIONS)
+        fact = f"{code}号设备安装在{location}，巡检周期为{rng.randint(1, 30)}天。"
+        before = _random_text(rng, rng.randint(0, doc_length), pool)
+        after = _random_text(rng, max(0, doc_length - len(before)), pool)
+        documents.append(before + fact + after)
+        qa_pairs.append(QAPair(
+            question=f"{code}位于何处？多长时间检查一回？",
+            answer=fact,
+            doc_id=doc_id
+        ))
+
+    return BenchmarkCorpus(name=f"synthetic-{num_docs}", documents=documents, qa_pairs=qa_pairs)
+
+
+_COMMUNITY_PREFIX = ["阳光", "翠湖", "锦绣", "金桂", "滨江", "紫荆", "碧水", "御景", "星河", "枫林", "香樟", "云杉"]
+_COMMUNITY_SUFFIX = ["花园", "名苑", "府", "家园", "公馆", "雅居", "新城", "华庭"]
+
+_HEADER = "【物业服务通知】尊敬的各位业主、住户：您好！为进一步提升小区物业服务质量，保障全体业主的合法权益，现将相关事项通知如下。"
+_FOOTER = "如有疑问，请联系物业服务中心，服务时间为每日8:00至20:00。感谢您的理解与配合！"
+
+
+def _property_facts(rng: random.Random, community: str) -> List[tuple]:
+    """生成一个小区的事实句及对应问题"""
+    fee = rng.choice(["1.8", "2.2", "2.5", "2.8", "3.2", "3.5"])
+    parking = rng.choice(["150", "200", "260", "300", "350"])
+    start_hour = rng.choice(["7", "8", "9"])
+    end_hour = rng.choice(["17", "18", "19"])
+    elevator_day = rng.choice(["一", "二", "三", "四", "五"])
+    garbage = rng.choice(["7:00-9:00和18:00-21:00", "6:30-8:30和19:00-21:00", "7:30-9:30和18:30-20:30"])
+    phone = f"0571-8{rng.randint(1000000, 9999999)}"
+    deposit = rng.choice(["2000", "3000", "5000"])
+    pet = rng.choice(["须办理犬只登记并全程牵绳", "禁止进入儿童游乐区且须牵绳", "须佩戴犬牌并及时清理粪便"])
+
+    return [
+        (f"{community}物业费收费标准为每平方米每月{fee}元，按季度缴纳。",
+         f"{community}的物业费怎么收？"),
+        (f"{community}地下车位月租费用为{parking}元每月，需在物业服务中心办理停车卡。",
+         f"{community}停车位一个月多少钱？"),
+        (f"{community}装修施工时间为工作日{start_hour}:00至{end_hour}:00，节假日禁止产生噪音的施工，装修押金为{deposit}元。",
+         f"在{community}装修，几点可以施工？押金多少？"),
+        (f"{community}电梯例行维保安排在每月第一个星期{elevator_day}上午，维保期间单台电梯停运。",
+         f"{community}电梯什么时候维保？"),
+        (f"{community}垃圾定时定点投放时间为{garbage}，请按分类标准投放。",
+         f"{community}几点可以扔垃圾？"),
+        (f"{community}物业服务中心报修电话为{phone}，24小时受理紧急报修。",
+         f"{community}报修打哪个电话？"),
+        (f"{community}业主饲养宠物{pet}。",
+         f"{community}养狗有什么规定？"),
+    ]
+
+
+def build_property_corpus(
+    num_communities: int = 20,
+    boilerplate: bool = True,
+    seed: int = 7
+) -> BenchmarkCorpus:
+    """构建物业领域样例语料
+
+    Args:
+        num_communities: 小区数量（每个小区一篇文档、七个问题）
+        boilerplate: 是否添加公共页眉页脚（用于观察去重效果）
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    names = [p + s for p in _COMMUNITY_PREFIX for s in _COMMUNITY_SUFFIX]
+    rng.shuffle(names)
+
+    documents = []
+    qa_pairs = []
+    for doc_id in range(num_communities):
+        community = names[doc_id % len(names)]
+        if doc_id >= len(names):
+            community = f"{community}{doc_id // len(names) + 1}期"
+
+        facts = _property_facts(rng, community)
+        rng.shuffle(facts)
+        body = "".join(fact for fact, _ in facts)
+        documents.append(f"{_HEADER}{body}{_FOOTER}" if boilerplate else body)
+        for fact, question in facts:
+            qa_pairs.append(QAPair(question=question, answer=fact, doc_id=doc_id))
+
+    return BenchmarkCorpus(name=f"property-{num_communities}", documents=documents, qa_pairs=qa_pairs)
+
+
+__all__ = ["QAPair", "BenchmarkCorpus", "build_synthetic_corpus", "build_property_corpus"]
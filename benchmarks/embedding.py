@@ -0,0 +1,57 @@
+"""确定性本地向量化服务
+
+基准测试使用，避免调用外部 embedding API：
+对字符 1-gram/2-gram 做哈希分桶（hashing trick），再做 L2 归一化。
+同一文本在任何进程中得到相同向量。
+"""
+import math
+import zlib
+from typing import List
+from services import EmbeddingService
+
+
+class HashingEmbeddingService(EmbeddingService):
+    """哈希向量化服务（本地替身）"""
+
+    def __init__(self, dim: int = 256, ngram_range: tuple = (1, 2)):
+        super().__init__(provider="local", model=f"hashing-{dim}")
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.call_count = 0
+        self.text_count = 0
+
+    def _vectorize(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                if gram.isspace():
+                    continue
+                h = zlib.crc32(gram.encode("utf-8"))
+                # 用哈希的最高位决定符号，降低冲突带来的偏差
+                vector[h % self.dim] += -1.0 if h & 0x80000000 else 1.0
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm == 0:
+            return vector
+        return [v / norm for v in vector]
+
+    def embed(self, text: str) -> List[float]:
+        """获取文本向量"""
+        text = self._validate_text(text)
+        self.call_count += 1
+        self.text_count += 1
+        return self._vectorize(text)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量获取文本向量"""
+        texts = self._validate_texts(texts)
+        if not texts:
+            return []
+        self.call_count += 1
+        self.text_count += len(texts)
+        return [self._vectorize(text) for text in texts]
+
+
+__all__ = ["HashingEmbeddingService"]
@@ -0,0 +1,179 @@
+"""RAG 检索基准测试
+
+对给定语料和配置构建 RAGService，统计：
+- recall@k / MRR：检索质量
+- 索引构建耗时、索引内存占用（tracemalloc）
+- 查询延迟 p50 / p99
+- embedding 调用次数（观察去重效果）
+"""
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from services import RAGService
+from .corpus import BenchmarkCorpus
+from .embedding import HashingEmbeddingService
+
+
+@dataclass
+class BenchmarkConfig:
+    """基准测试配置"""
+    name: str = "default"
+    chunk_size: int = 500
+    chunk_overlap: int = 50
+    top_k: int = 3
+    deduplicate: bool = True
+    embedding_dim: int = 256
+
+
+@dataclass
+class BenchmarkResult:
+    """基准测试结果"""
+    config: str
+    corpus: str
+    num_docs: int
+    num_chunks: int
+    num_queries: int
+    recall_at_k: float
+    mrr: float
+    build_time_ms: float
+    index_memory_kb: float
+    peak_memory_kb: float
+    p50_latency_ms: float
+    p99_latency_ms: float
+    embedded_texts: int
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数（线性插值）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class RAGBenchmark:
+    """RAG 检索基准测试
+
+    Args:
+        corpus: 基准语料
+        max_queries: 最多评测的问题数（默认全部）
+        measure_memory: 是否统计内存（会额外构建一次索引）
+    """
+
+    def __init__(
+        self,
+        corpus: BenchmarkCorpus,
+        max_queries: Optional[int] = None,
+        measure_memory: bool = True
+    ):
+        self.corpus = corpus
+        self.qa_pairs = corpus.qa_pairs[:max_queries] if max_queries else corpus.qa_pairs
+        self.measure_memory = measure_memory
+
+    def _build(self, config: BenchmarkConfig, embedding: HashingEmbeddingService) -> RAGService:
+        return RAGService(
+            knowledge_base=self.corpus.documents,
+            embedding_service=embedding,
+            top_k=config.top_k,
+            deduplicate=config.deduplicate,
+            chunk_size=config.chunk_size,
+            chunk_overlap=config.chunk_overlap
+        )
+
+    def _measure_memory(self, config: BenchmarkConfig) -> tuple:
+        """返回 (索引常驻内存KB, 构建峰值内存KB)"""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            rag = self._build(config, HashingEmbeddingService(dim=config.embedding_dim))
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del rag
+        return (current - baseline) / 1024, (peak - baseline) / 1024
+
+    def run(self, config: BenchmarkConfig = None) -> BenchmarkResult:
+        """运行单个配置"""
+        config = config or BenchmarkConfig()
+        embedding = HashingEmbeddingService(dim=config.embedding_dim)
+
+        gc.collect()
+        start = time.perf_counter()
+        rag = self._build(config, embedding)
+        build_time_ms = (time.perf_counter() - start) * 1000
+        embedded_texts = embedding.text_count
+
+        hits = 0
+        reciprocal_ranks = 0.0
+        latencies = []
+        for pair in self.qa_pairs:
+            start = time.perf_counter()
+            results = rag.retrieve(pair.question, top_k=config.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            for rank, item in enumerate(results, 1):
+                if pair.answer in item["chunk"]:
+                    hits += 1
+                    reciprocal_ranks += 1.0 / rank
+                    break
+
+        index_kb, peak_kb = self._measure_memory(config) if self.measure_memory else (0.0, 0.0)
+        num_queries = len(self.qa_pairs)
+
+        return BenchmarkResult(
+            config=config.name,
+            corpus=self.corpus.name,
+            num_docs=len(self.corpus.documents),
+            num_chunks=len(rag._chunks),
+            num_queries=num_queries,
+            recall_at_k=hits / num_queries if num_queries else 0.0,
+            mrr=reciprocal_ranks / num_queries if num_queries else 0.0,
+            build_time_ms=build_time_ms,
+            index_memory_kb=index_kb,
+            peak_memory_kb=peak_kb,
+            p50_latency_ms=percentile(latencies, 50),
+            p99_latency_ms=percentile(latencies, 99),
+            embedded_texts=embedded_texts
+        )
+
+    def compare(self, configs: List[BenchmarkConfig]) -> List[BenchmarkResult]:
+        """对比多个配置"""
+        return [self.run(config) for config in configs]
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """格式化为对比表格"""
+    headers = [
+        ("config", "{}"), ("chunks", "{}"), ("embedded", "{}"),
+        ("recall@k", "{:.3f}"), ("mrr", "{:.3f}"), ("build_ms", "{:.1f}"),
+        ("index_kb", "{:.1f}"), ("peak_kb", "{:.1f}"), ("p50_ms", "{:.2f}"), ("p99_ms", "{:.2f}"),
+    ]
+    fields = {
+        "config": "config", "chunks": "num_chunks", "embedded": "embedded_texts",
+        "recall@k": "recall_at_k", "mrr": "mrr", "build_ms": "build_time_ms",
+        "index_kb": "index_memory_kb", "peak_kb": "peak_memory_kb",
+        "p50_ms": "p50_latency_ms", "p99_ms": "p99_latency_ms",
+    }
+
+    rows = [[fmt.format(getattr(r, fields[name])) for name, fmt in headers] for r in results]
+    widths = [
+        max(len(name), *(len(row[i]) for row in rows)) if rows else len(name)
+        for i, (name, _) in enumerate(headers)
+    ]
+    lines = ["  ".join(name.ljust(w) for (name, _), w in zip(headers, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in rows:
+        lines.append("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
+    return "\n".join(lines)
+
+
+__all__ = ["BenchmarkConfig", "BenchmarkResult", "RAGBenchmark", "format_results", "percentile"]
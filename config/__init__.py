@@ -5,7 +5,16 @@ from .model_config import (
     ModelProvider,
     ModelConfig,
     MODEL_MAPPING,
+    SCENARIO_CACHE_TTLS,
+    SCENARIO_ROUTE_TARGETS,
+    PROVIDER_FALLBACKS,
+    PROVIDER_RATE_LIMITS,
+    PRIORITY_CLASSES,
+    SCENARIO_PRIORITIES,
+    RESPONSE_FORMAT_SUPPORT,
+    PROVIDER_BATCH_SUPPORT,
     get_model_info,
+    get_response_format_support,
     get_default_config,
 )
 from .app_config import AppConfig, AppEnv, config
@@ -26,7 +35,16 @@ __all__ = [
     "ModelProvider",
     "ModelConfig",
     "MODEL_MAPPING",
+    "SCENARIO_CACHE_TTLS",
+    "SCENARIO_ROUTE_TARGETS",
+    "PROVIDER_FALLBACKS",
+    "PROVIDER_RATE_LIMITS",
+    "PRIORITY_CLASSES",
+    "SCENARIO_PRIORITIES",
+    "RESPONSE_FORMAT_SUPPORT",
+    "PROVIDER_BATCH_SUPPORT",
     "get_model_info",
+    "get_response_format_support",
     "get_default_config",
     # 应用配置
     "AppConfig",
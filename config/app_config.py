@@ -13,6 +13,14 @@ class AppEnv(str, Enum):
     PRODUCTION = "production"
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    """读取布尔型环境变量"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass
 class AppConfig:
     """应用配置"""
@@ -22,6 +30,79 @@ class AppConfig:
     api_timeout: int = 60
     max_retries: int = 3
     cache_ttl: int = 3600
+    # 重试退避与预算（max_retries 为不含首次请求的重试次数）
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 20.0
+    retry_budget_ratio: float = 0.2
+    # 单次LLM请求（含重试）的截止时长（秒）
+    llm_request_deadline: float = 120.0
+    # LLM响应缓存
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 1024
+    llm_cache_disk_path: Optional[str] = None
+    llm_cache_max_temperature: float = 0.3
+    # 合并相同的在途LLM请求
+    llm_coalesce_enabled: bool = True
+    # 客户端RPM/TPM限流（额度见 PROVIDER_RATE_LIMITS）
+    llm_rate_limit_enabled: bool = False
+    llm_rate_limit_max_wait: Optional[float] = None
+    # 限流存储：memory（进程内）/ sqlite（单机多进程）/ redis（多主机）
+    llm_rate_limit_backend: str = "memory"
+    llm_rate_limit_sqlite_path: Optional[str] = None
+    llm_rate_limit_redis_url: Optional[str] = None
+    # 按Provider自适应并发限制（AIMD）
+    llm_adaptive_concurrency_enabled: bool = False
+    llm_concurrency_initial: int = 20
+    llm_concurrency_max: int = 200
+    llm_concurrency_max_queue: Optional[int] = None
+    llm_concurrency_queue_timeout: Optional[float] = None
+    # 按场景优先级调度（类别见 PRIORITY_CLASSES / SCENARIO_PRIORITIES）
+    llm_scheduler_enabled: bool = False
+    llm_scheduler_capacity: int = 32
+    llm_scheduler_queue_timeout: Optional[float] = None
+    llm_scheduler_preempt_window: float = 4.0
+    # 流式接口合并小片段（可按请求关闭）
+    stream_coalesce_enabled: bool = True
+    stream_coalesce_max_bytes: int = 48
+    stream_coalesce_max_delay_ms: int = 40
+    stream_coalesce_sentence: bool = True
+    # JSON 输出场景在顶层对象完成后提前结束生成（请求带 stop_on_json 时生效）
+    llm_json_early_stop_enabled: bool = True
+    # 批量工单处理：单个批次的并发上限和工单数上限
+    workorder_batch_concurrency: int = 8
+    workorder_batch_max_items: int = 2000
+    # 离线批处理（Provider Batch API，支持的Provider见 PROVIDER_BATCH_SUPPORT）
+    llm_batch_provider: str = "qianwen"
+    llm_batch_model: str = "qwen-plus"
+    llm_batch_poll_interval: float = 60.0
+    llm_batch_max_wait: Optional[float] = None
+    # 多Provider路由（目标见 SCENARIO_ROUTE_TARGETS）
+    llm_router_enabled: bool = False
+    llm_router_weights: str = ""
+    llm_router_sticky_ttl: int = 1800
+    # 熔断与降级（降级链见 PROVIDER_FALLBACKS）
+    llm_breaker_enabled: bool = True
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_timeout_rate: float = 0.3
+    llm_breaker_min_requests: int = 5
+    llm_breaker_open_seconds: float = 30.0
+    llm_fallback_enabled: bool = True
+    # 对冲请求（逗号分隔的场景列表，"*" 表示全部场景，留空不启用）
+    llm_hedge_scenarios: str = ""
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_budget: float = 0.05
+    llm_hedge_alternate: bool = False
+    llm_hedge_max_workers: int = 32
+    # 智能客服语义缓存（需要配置 embedding 服务）
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_entries: int = 1000
+    semantic_cache_ttl: int = 3600
+
+    def hedge_enabled_for(self, scenario: str) -> bool:
+        """场景是否启用对冲请求"""
+        scenarios = {s.strip() for s in self.llm_hedge_scenarios.split(",") if s.strip()}
+        return "*" in scenarios or scenario in scenarios
 
     @classmethod
     def load(cls) -> "AppConfig":
@@ -36,6 +117,59 @@ class AppConfig:
             env=env,
             debug=debug,
             log_level=log_level,
+            max_retries=int(os.getenv("MAX_RETRIES", "3")),
+            retry_base_delay=float(os.getenv("RETRY_BASE_DELAY", "0.5")),
+            retry_max_delay=float(os.getenv("RETRY_MAX_DELAY", "20")),
+            retry_budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+            llm_request_deadline=float(os.getenv("LLM_REQUEST_DEADLINE", "120")),
+            llm_cache_enabled=_env_bool("LLM_CACHE_ENABLED", True),
+            llm_cache_max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            llm_cache_disk_path=os.getenv("LLM_CACHE_DISK_PATH") or None,
+            llm_cache_max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3")),
+            llm_coalesce_enabled=_env_bool("LLM_COALESCE_ENABLED", True),
+            llm_rate_limit_enabled=_env_bool("LLM_RATE_LIMIT_ENABLED", False),
+            llm_rate_limit_max_wait=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT")) if os.getenv("LLM_RATE_LIMIT_MAX_WAIT") else None,
+            llm_rate_limit_backend=os.getenv("LLM_RATE_LIMIT_BACKEND", "memory"),
+            llm_rate_limit_sqlite_path=os.getenv("LLM_RATE_LIMIT_SQLITE_PATH") or None,
+            llm_rate_limit_redis_url=os.getenv("LLM_RATE_LIMIT_REDIS_URL") or None,
+            llm_adaptive_concurrency_enabled=_env_bool("LLM_ADAPTIVE_CONCURRENCY_ENABLED", False),
+            llm_concurrency_initial=int(os.getenv("LLM_CONCURRENCY_INITIAL", "20")),
+            llm_concurrency_max=int(os.getenv("LLM_CONCURRENCY_MAX", "200")),
+            llm_concurrency_max_queue=int(os.getenv("LLM_CONCURRENCY_MAX_QUEUE")) if os.getenv("LLM_CONCURRENCY_MAX_QUEUE") else None,
+            llm_concurrency_queue_timeout=float(os.getenv("LLM_CONCURRENCY_QUEUE_TIMEOUT")) if os.getenv("LLM_CONCURRENCY_QUEUE_TIMEOUT") else None,
+            llm_scheduler_enabled=_env_bool("LLM_SCHEDULER_ENABLED", False),
+            llm_scheduler_capacity=int(os.getenv("LLM_SCHEDULER_CAPACITY", "32")),
+            llm_scheduler_queue_timeout=float(os.getenv("LLM_SCHEDULER_QUEUE_TIMEOUT")) if os.getenv("LLM_SCHEDULER_QUEUE_TIMEOUT") else None,
+            llm_scheduler_preempt_window=float(os.getenv("LLM_SCHEDULER_PREEMPT_WINDOW", "4")),
+            stream_coalesce_enabled=_env_bool("STREAM_COALESCE_ENABLED", True),
+            stream_coalesce_max_bytes=int(os.getenv("STREAM_COALESCE_MAX_BYTES", "48")),
+            stream_coalesce_max_delay_ms=int(os.getenv("STREAM_COALESCE_MAX_DELAY_MS", "40")),
+            stream_coalesce_sentence=_env_bool("STREAM_COALESCE_SENTENCE", True),
+            llm_json_early_stop_enabled=_env_bool("LLM_JSON_EARLY_STOP_ENABLED", True),
+            workorder_batch_concurrency=int(os.getenv("WORKORDER_BATCH_CONCURRENCY", "8")),
+            workorder_batch_max_items=int(os.getenv("WORKORDER_BATCH_MAX_ITEMS", "2000")),
+            llm_batch_provider=os.getenv("LLM_BATCH_PROVIDER", "qianwen"),
+            llm_batch_model=os.getenv("LLM_BATCH_MODEL", "qwen-plus"),
+            llm_batch_poll_interval=float(os.getenv("LLM_BATCH_POLL_INTERVAL", "60")),
+            llm_batch_max_wait=float(os.getenv("LLM_BATCH_MAX_WAIT")) if os.getenv("LLM_BATCH_MAX_WAIT") else None,
+            llm_router_enabled=_env_bool("LLM_ROUTER_ENABLED", False),
+            llm_router_weights=os.getenv("LLM_ROUTER_WEIGHTS", ""),
+            llm_router_sticky_ttl=int(os.getenv("LLM_ROUTER_STICKY_TTL", "1800")),
+            llm_breaker_enabled=_env_bool("LLM_BREAKER_ENABLED", True),
+            llm_breaker_failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            llm_breaker_timeout_rate=float(os.getenv("LLM_BREAKER_TIMEOUT_RATE", "0.3")),
+            llm_breaker_min_requests=int(os.getenv("LLM_BREAKER_MIN_REQUESTS", "5")),
+            llm_breaker_open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+            llm_fallback_enabled=_env_bool("LLM_FALLBACK_ENABLED", True),
+            llm_hedge_scenarios=os.getenv("LLM_HEDGE_SCENARIOS", ""),
+            llm_hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+            llm_hedge_budget=float(os.getenv("LLM_HEDGE_BUDGET", "0.05")),
+            llm_hedge_alternate=_env_bool("LLM_HEDGE_ALTERNATE", False),
+            llm_hedge_max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", "32")),
+            semantic_cache_enabled=_env_bool("SEMANTIC_CACHE_ENABLED", False),
+            semantic_cache_threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            semantic_cache_max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000")),
+            semantic_cache_ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
         )
 
 
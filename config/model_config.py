@@ -84,11 +84,108 @@ DEFAULT_SCENARIO_CONFIGS = {
 }
 
 
+# 各场景的LLM响应缓存TTL（秒），未配置的场景使用 AppConfig.cache_ttl
+SCENARIO_CACHE_TTLS = {
+    "property_chatbot": 600,
+    "work_order_ai": 3600,
+    "contract_audit": 86400,
+    "knowledge_qa": 1800,
+}
+
+
+# 各场景的多Provider路由目标（启用 LLM_ROUTER_ENABLED 后生效）
+# cost 为相对成本，只用于目标间比较；未配置Key的Provider会被跳过
+SCENARIO_ROUTE_TARGETS = {
+    "property_chatbot": [
+        {"provider": "deepseek", "model": "deepseek-chat", "cost": 1.0},
+        {"provider": "qianwen", "model": "qwen-turbo", "cost": 0.6},
+        {"provider": "openai", "model": "gpt-4o-mini", "cost": 1.5},
+    ],
+    "work_order_ai": [
+        {"provider": "deepseek", "model": "deepseek-chat", "cost": 1.0},
+        {"provider": "qianwen", "model": "qwen-plus", "cost": 1.6},
+    ],
+    "contract_audit": [
+        {"provider": "qianwen", "model": "qwen-max", "cost": 8.0},
+        {"provider": "deepseek", "model": "deepseek-chat", "cost": 1.0},
+    ],
+    "knowledge_qa": [
+        {"provider": "deepseek", "model": "deepseek-chat", "cost": 1.0},
+        {"provider": "qianwen", "model": "qwen-plus", "cost": 1.6},
+    ],
+}
+
+
+# 各Provider的降级链（主Provider熔断或故障时依次尝试）
+PROVIDER_FALLBACKS = {
+    "deepseek": [{"provider": "qianwen", "model": "qwen-plus"}],
+    "qianwen": [{"provider": "deepseek", "model": "deepseek-chat"}],
+    "openai": [{"provider": "deepseek", "model": "deepseek-chat"}],
+}
+
+
+# 各Provider账号的客户端限流额度（每分钟请求数/每分钟token数），启用 LLM_RATE_LIMIT_ENABLED 后生效
+PROVIDER_RATE_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200000},
+    "deepseek": {"rpm": 300, "tpm": 300000},
+    "qianwen": {"rpm": 600, "tpm": 1000000},
+}
+
+
+# 优先级类别（启用 LLM_SCHEDULER_ENABLED 后生效）：weight 为加权公平排队的权重，
+# preempt 类别的排队请求插到其它类别的排队请求之前
+PRIORITY_CLASSES = {
+    "interactive": {"weight": 8, "preempt": True},
+    "standard": {"weight": 3},
+    "batch": {"weight": 1},
+}
+
+
+# 各场景的优先级类别，未配置的场景归入 standard
+SCENARIO_PRIORITIES = {
+    "property_chatbot": "interactive",
+    "knowledge_qa": "standard",
+    "work_order_ai": "batch",
+    "contract_audit": "batch",
+}
+
+
+# 各Provider/模型支持的最高结构化输出格式（json_schema > json_object > None），
+# "*" 为该Provider未单独列出的模型的默认值，未列出的Provider不传 response_format
+RESPONSE_FORMAT_SUPPORT = {
+    "openai": {
+        "*": "json_schema",
+        "gpt-4-turbo": "json_object",
+        "gpt-3.5-turbo": "json_object",
+    },
+    "deepseek": {
+        "*": "json_object",
+    },
+    "qianwen": {
+        "*": "json_object",
+    },
+}
+
+
+# 支持异步批处理接口（Batch API）的Provider：endpoint 为 JSONL 中每个请求的 url，
+# completion_window 为任务完成时限
+PROVIDER_BATCH_SUPPORT = {
+    "openai": {"endpoint": "/v1/chat/completions", "completion_window": "24h"},
+    "qianwen": {"endpoint": "/v1/chat/completions", "completion_window": "24h"},
+}
+
+
 def get_model_info(provider: str, model: str) -> Optional[Dict]:
     """获取模型信息"""
     return MODEL_MAPPING.get(provider, {}).get(model)
 
 
+def get_response_format_support(provider: str, model: str) -> Optional[str]:
+    """获取模型支持的最高结构化输出格式"""
+    support = RESPONSE_FORMAT_SUPPORT.get(provider, {})
+    return support.get(model, support.get("*"))
+
+
 def get_default_config(scenario: str) -> ModelConfig:
     """获取场景的默认配置"""
     return DEFAULT_SCENARIO_CONFIGS.get(scenario, ModelConfig(
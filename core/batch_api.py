@@ -0,0 +1,273 @@
+"""Provider 批处理（Batch API）模块
+
+不要求实时返回的任务（如夜间重新分类历史工单）可以走 Provider 的异步批处理接口：
+不占用白天的实时调用额度，费用通常也低于同步调用。流程（OpenAI 兼容格式）：
+
+1. 每个请求写成一行 JSONL：{"custom_id", "method", "url", "body"}
+2. POST /files 上传文件（purpose=batch）
+3. POST /batches 创建任务，返回任务ID
+4. GET /batches/{id} 轮询，直到任务进入终态
+5. GET /files/{output_file_id}/content 下载结果，按 custom_id 对应回原请求
+
+支持的 Provider 见 config.PROVIDER_BATCH_SUPPORT。
+"""
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import requests
+from .llm_client import LLMFactory, LLMResponse
+from .openai_compatible_client import OpenAICompatibleClient
+from utils.metrics import default_metrics
+
+# 任务终态：completed 全部处理完；expired/cancelled 可能只有部分结果；failed 为校验失败等
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchJobError(Exception):
+    """批处理任务失败（任务失败或等待超时）"""
+
+
+@dataclass
+class BatchJob:
+    """批处理任务状态"""
+    id: str
+    status: str
+    input_file_id: Optional[str] = None
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_counts: Dict[str, int] = field(default_factory=dict)
+    raw: Dict = field(default_factory=dict)
+    # 提交的请求 custom_id（只有 submit() 返回的任务有，查询得到的任务为空）
+    custom_ids: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BatchJob":
+        return cls(
+            id=data["id"],
+            status=data.get("status", ""),
+            input_file_id=data.get("input_file_id"),
+            output_file_id=data.get("output_file_id"),
+            error_file_id=data.get("error_file_id"),
+            request_counts=data.get("request_counts") or {},
+            raw=data
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+@dataclass
+class BatchResult:
+    """单个请求的批处理结果"""
+    custom_id: str
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.response is not None
+
+
+class BatchAPIClient:
+    """Provider 批处理接口客户端
+
+    Args:
+        client: 目标 Provider/模型的客户端（用于请求体、鉴权和结果解析）
+        endpoint: JSONL 中每个请求的 url 字段
+        completion_window: 任务完成时限
+        poll_interval: 轮询间隔（秒）
+        timeout: 单次 HTTP 请求超时（秒）
+    """
+
+    def __init__(
+        self,
+        client: OpenAICompatibleClient,
+        endpoint: str = "/v1/chat/completions",
+        completion_window: str = "24h",
+        poll_interval: float = 60.0,
+        timeout: float = 60.0
+    ):
+        self.client = client
+        self.endpoint = endpoint
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    @property
+    def provider(self) -> str:
+        return self.client.provider_name
+
+    def _url(self, path: str) -> str:
+        return f"{self.client.base_url.rstrip('/')}{path}"
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        headers = self.client._build_headers()
+        if "files" in kwargs:
+            # multipart 上传由 requests 生成 Content-Type（含 boundary）
+            headers.pop("Content-Type", None)
+        response = requests.request(method, self._url(path), headers=headers, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def build_jsonl(
+        self,
+        items: Iterable[Tuple[str, List[Dict]]],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> bytes:
+        """把 (custom_id, messages) 序列写成批处理输入文件
+
+        请求体与同步调用相同（response_format 等参数按模型能力调整）。
+        """
+        lines = []
+        for custom_id, messages in items:
+            body = self.client._build_payload(messages, temperature, max_tokens, **kwargs)
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": self.endpoint,
+                "body": body,
+            }, ensure_ascii=False))
+        if not lines:
+            raise ValueError("Batch has no requests")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def upload(self, data: bytes, filename: str = "batch.jsonl") -> str:
+        """上传输入文件，返回文件ID"""
+        response = self._request(
+            "POST", "/files",
+            files={"file": (filename, data, "application/jsonl")},
+            data={"purpose": "batch"}
+        )
+        return response.json()["id"]
+
+    def create(self, input_file_id: str, metadata: Optional[Dict[str, str]] = None) -> BatchJob:
+        """创建批处理任务"""
+        payload = {
+            "input_file_id": input_file_id,
+            "endpoint": self.endpoint,
+            "completion_window": self.completion_window,
+        }
+        if metadata:
+            payload["metadata"] = metadata
+        job = BatchJob.from_dict(self._request("POST", "/batches", json=payload).json())
+        default_metrics.inc("llm_batch_jobs_submitted", provider=self.provider)
+        return job
+
+    def submit(
+        self,
+        items: Iterable[Tuple[str, List[Dict]]],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        metadata: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> BatchJob:
+        """写入 JSONL、上传并创建任务；返回的任务带有提交的 custom_id 列表"""
+        custom_ids: List[str] = []
+
+        def track():
+            for custom_id, messages in items:
+                custom_ids.append(custom_id)
+                yield custom_id, messages
+
+        data = self.build_jsonl(track(), temperature, max_tokens, **kwargs)
+        job = self.create(self.upload(data), metadata=metadata)
+        job.custom_ids = custom_ids
+        return job
+
+    def get(self, batch_id: str) -> BatchJob:
+        """查询任务状态"""
+        return BatchJob.from_dict(self._request("GET", f"/batches/{batch_id}").json())
+
+    def cancel(self, batch_id: str) -> BatchJob:
+        """取消任务（已完成的请求仍会写入结果文件）"""
+        return BatchJob.from_dict(self._request("POST", f"/batches/{batch_id}/cancel").json())
+
+    def wait(
+        self,
+        batch_id: str,
+        max_wait: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> BatchJob:
+        """轮询直到任务进入终态
+
+        Raises:
+            BatchJobError: 超过 max_wait 秒仍未结束
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            job = self.get(batch_id)
+            if job.done:
+                default_metrics.inc("llm_batch_jobs_finished", provider=self.provider, status=job.status)
+                return job
+            if deadline is not None and time.monotonic() + self.poll_interval > deadline:
+                raise BatchJobError(f"Batch {batch_id} still {job.status} after {max_wait}s")
+            sleep(self.poll_interval)
+
+    def download(self, file_id: str) -> str:
+        """下载文件内容"""
+        return self._request("GET", f"/files/{file_id}/content").content.decode("utf-8")
+
+    def results(self, job: BatchJob) -> Dict[str, BatchResult]:
+        """下载已结束任务的结果，按 custom_id 索引
+
+        Raises:
+            BatchJobError: 任务失败且没有任何结果文件
+        """
+        if job.status == "failed" and not (job.output_file_id or job.error_file_id):
+            errors = (job.raw.get("errors") or {}).get("data") or []
+            detail = "; ".join(e.get("message", "") for e in errors) or "unknown error"
+            raise BatchJobError(f"Batch {job.id} failed: {detail}")
+
+        results: Dict[str, BatchResult] = {}
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            for line in self.download(file_id).splitlines():
+                if line.strip():
+                    result = self._parse_line(json.loads(line))
+                    results[result.custom_id] = result
+        return results
+
+    def _parse_line(self, line: Dict) -> BatchResult:
+        custom_id = line.get("custom_id", "")
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error"):
+            error = line["error"]
+            return BatchResult(custom_id, error=error.get("message") if isinstance(error, dict) else str(error))
+        if response.get("status_code") != 200:
+            message = (body.get("error") or {}).get("message") if isinstance(body, dict) else None
+            return BatchResult(custom_id, error=message or f"HTTP {response.get('status_code')}")
+        try:
+            return BatchResult(custom_id, response=self.client._parse_response(body))
+        except (KeyError, IndexError, TypeError) as e:
+            return BatchResult(custom_id, error=f"Malformed batch response: {e}")
+
+
+def create_batch_client(provider: str, model: Optional[str] = None, **kwargs) -> BatchAPIClient:
+    """为支持批处理接口的 Provider 创建批处理客户端
+
+    Raises:
+        ValueError: Provider 不支持批处理接口
+    """
+    from config import PROVIDER_BATCH_SUPPORT
+
+    support = PROVIDER_BATCH_SUPPORT.get(provider)
+    if support is None:
+        raise ValueError(f"Provider {provider} does not support batch API. Available: {list(PROVIDER_BATCH_SUPPORT)}")
+    client = LLMFactory.create(provider, model)
+    return BatchAPIClient(client, **{**support, **kwargs})
+
+
+__all__ = [
+    "TERMINAL_STATUSES",
+    "BatchJobError",
+    "BatchJob",
+    "BatchResult",
+    "BatchAPIClient",
+    "create_batch_client",
+]
@@ -0,0 +1,54 @@
+"""协作式取消模块
+
+流式请求的调用方（如 SSE 连接）提前断开时，通过 CancellationToken 通知下游：
+各层在片段之间检查 cancelled 并尽快返回，持有网络连接的一层注册回调，
+在 cancel() 时立即关闭上游响应，打断仍在阻塞读取的线程。
+
+token 作为控制参数 cancel_token 随 stream_chat() 的参数向下传递。
+"""
+import threading
+from typing import Callable, List
+
+
+class CancellationToken:
+    """取消令牌（线程安全，可在任意线程调用 cancel()）"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """标记取消并执行已注册的回调（只执行一次）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # 取消回调只做资源清理，失败不影响其它回调
+                pass
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """注册取消回调，返回注销函数；已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+__all__ = ["CancellationToken"]
@@ -0,0 +1,352 @@
+"""熔断与降级模块
+
+按 (provider, model) 维护熔断器：
+
+- closed：正常放行，统计滑动窗口内的错误率与超时率
+- open：错误率或超时率超过阈值后打开，请求立即失败（不再等待超时）
+- half_open：打开一段时间后放行少量探测请求，成功则关闭，失败则重新打开
+
+CircuitBreakerLLMClient 在主客户端熔断或出现 Provider 侧故障时，
+依次尝试配置的降级客户端。
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Generator, List, Optional, Tuple
+from .errors import PROVIDER_FAILURES, RATE_LIMIT, TIMEOUT, classify_error
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse
+from utils.logger import default_logger
+from utils.metrics import default_metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器打开，请求被拒绝"""
+
+    def __init__(self, name: str, retry_after: float = 0.0):
+        super().__init__(f"Circuit breaker '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """熔断器
+
+    Args:
+        name: 名称（如 deepseek/deepseek-chat）
+        failure_rate_threshold: 窗口内失败率（含超时）阈值
+        timeout_rate_threshold: 窗口内超时率阈值
+        min_requests: 窗口内最少请求数，不足时不判定
+        window_seconds: 统计窗口（秒）
+        open_seconds: 打开状态持续时间（秒），之后进入半开
+        half_open_max_calls: 半开状态最多同时放行的探测请求数
+        clock: 时钟函数（测试用）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        timeout_rate_threshold: float = 0.3,
+        min_requests: int = 5,
+        window_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.timeout_rate_threshold = timeout_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        # (时间, 结果)；结果为 success / failure / timeout
+        self._outcomes: Deque[Tuple[float, str]] = deque()
+        default_metrics.set_gauge("llm_circuit_state", 0, breaker=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state != HALF_OPEN:
+            self._half_open_calls = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+        default_metrics.set_gauge("llm_circuit_state", _STATE_VALUES[state], breaker=self.name)
+        default_metrics.inc("llm_circuit_transitions", breaker=self.name, to=state)
+        log = default_logger.warning if state == OPEN else default_logger.info
+        log(f"Circuit breaker {self.name}: {previous} -> {state}")
+
+    def _refresh(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def allow_request(self) -> bool:
+        """是否放行请求（半开状态下会占用一个探测名额）"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """距离进入半开状态的剩余秒数"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def record_success(self):
+        self._record("success")
+
+    def record_failure(self, timeout: bool = False):
+        self._record(TIMEOUT if timeout else "failure")
+
+    def release(self):
+        """归还未产生结果的探测名额（如请求因客户端错误结束）"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def _record(self, outcome: str):
+        now = self._clock()
+        with self._lock:
+            self._refresh()
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED if outcome == "success" else OPEN)
+                return
+            if self._state == OPEN:
+                return
+
+            self._outcomes.append((now, outcome))
+            while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                self._outcomes.popleft()
+
+            total = len(self._outcomes)
+            if total < self.min_requests:
+                return
+            timeouts = sum(1 for _, o in self._outcomes if o == TIMEOUT)
+            failures = timeouts + sum(1 for _, o in self._outcomes if o == "failure")
+            if failures / total >= self.failure_rate_threshold or timeouts / total >= self.timeout_rate_threshold:
+                self._transition(OPEN)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            total = len(self._outcomes)
+            failures = sum(1 for _, o in self._outcomes if o != "success")
+            return {
+                "state": self._state,
+                "window_requests": total,
+                "window_failure_rate": failures / total if total else 0.0,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str, model: str, **kwargs) -> CircuitBreaker:
+    """获取或创建 (provider, model) 的全局熔断器"""
+    name = f"{provider}/{model}"
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            if not kwargs:
+                kwargs = _default_breaker_options()
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+
+def _default_breaker_options() -> Dict:
+    from config import config as app_config
+    return {
+        "failure_rate_threshold": app_config.llm_breaker_failure_rate,
+        "timeout_rate_threshold": app_config.llm_breaker_timeout_rate,
+        "min_requests": app_config.llm_breaker_min_requests,
+        "open_seconds": app_config.llm_breaker_open_seconds,
+    }
+
+
+def breaker_stats() -> Dict[str, Dict]:
+    """全部熔断器状态"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+class CircuitBreakerLLMClient(DelegatingLLMClient):
+    """带熔断和降级链的客户端
+
+    主客户端熔断、超时、连接失败、5xx 或限流时依次尝试降级客户端；
+    4xx 等请求本身的错误直接抛出，不降级也不计入熔断。
+
+    Args:
+        client: 主客户端
+        fallbacks: 降级客户端列表（按顺序尝试）
+        breaker: 主客户端的熔断器（默认按 provider/model 取全局实例）
+    """
+
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        fallbacks: Optional[List[BaseLLMClient]] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        super().__init__(client)
+        self.breaker = breaker or get_breaker(client.provider_name, client.model)
+        self.fallbacks = [
+            (fallback, get_breaker(fallback.provider_name, fallback.model))
+            for fallback in (fallbacks or [])
+        ]
+
+    def _chain(self) -> List[Tuple[BaseLLMClient, CircuitBreaker]]:
+        return [(self.client, self.breaker)] + self.fallbacks
+
+    def _should_fall_over(self, error: BaseException, breaker: CircuitBreaker) -> bool:
+        """记录结果并判断是否尝试下一个客户端"""
+        kind = classify_error(error)
+        if kind in PROVIDER_FAILURES:
+            breaker.record_failure(timeout=kind == TIMEOUT)
+            return True
+        breaker.release()
+        return kind == RATE_LIMIT
+
+    def _on_fallback(self, client: BaseLLMClient, index: int):
+        if index > 0:
+            default_metrics.inc(
+                "llm_fallbacks",
+                primary=self.breaker.name,
+                fallback=f"{client.provider_name}/{client.model}"
+            )
+
+    def _open_error(self) -> CircuitOpenError:
+        return CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        last_error: Optional[BaseException] = None
+        for index, (client, breaker) in enumerate(self._chain()):
+            if not breaker.allow_request():
+                default_metrics.inc("llm_circuit_rejected", breaker=breaker.name)
+                continue
+            self._on_fallback(client, index)
+            try:
+                response = client.chat(messages, temperature, max_tokens, **kwargs)
+            except Exception as e:
+                if not self._should_fall_over(e, breaker):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # 取消（CancelledError）、中断等不说明上游好坏，只归还探测名额
+                breaker.release()
+                raise
+            breaker.record_success()
+            return response
+        raise last_error or self._open_error()
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        last_error: Optional[BaseException] = None
+        for index, (client, breaker) in enumerate(self._chain()):
+            if not breaker.allow_request():
+                default_metrics.inc("llm_circuit_rejected", breaker=breaker.name)
+                continue
+            self._on_fallback(client, index)
+            try:
+                response = await client.achat(messages, temperature, max_tokens, **kwargs)
+            except Exception as e:
+                if not self._should_fall_over(e, breaker):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # 取消（CancelledError）、中断等不说明上游好坏，只归还探测名额
+                breaker.release()
+                raise
+            breaker.record_success()
+            return response
+        raise last_error or self._open_error()
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        """流式聊天：首个片段之前失败可降级，之后的失败只计入熔断"""
+        last_error: Optional[BaseException] = None
+        for index, (client, breaker) in enumerate(self._chain()):
+            if not breaker.allow_request():
+                default_metrics.inc("llm_circuit_rejected", breaker=breaker.name)
+                continue
+            self._on_fallback(client, index)
+            started = False
+            try:
+                for chunk in client.stream_chat(messages, temperature, max_tokens, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if not self._should_fall_over(e, breaker) or started:
+                    raise
+                last_error = e
+                continue
+            except GeneratorExit:
+                # 调用方提前关闭流：已收到片段说明上游正常，否则不记录结果
+                if started:
+                    breaker.record_success()
+                else:
+                    breaker.release()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return
+        raise last_error or self._open_error()
+
+
+__all__ = [
+    "CLOSED",
+    "OPEN",
+    "HALF_OPEN",
+    "CircuitOpenError",
+    "CircuitBreaker",
+    "CircuitBreakerLLMClient",
+    "get_breaker",
+    "breaker_stats",
+]
@@ -0,0 +1,255 @@
+"""自适应并发限制模块
+
+按 Provider 限制同时在途的请求数，限制值按 AIMD 动态调整：
+
+- 基线时延：按输出长度分桶（token 数按 2 的幂分档），每个桶取最近样本窗口内的
+  最小时延（近似无排队时的响应时间）。首 token 时延基本固定、每 token 时延与长度
+  成正比，只有同一长度档内的时延才可比；同档内长度最多差一倍，健康时的时延比
+  始终小于 2，不会把短回答误判为过载
+- 加性增：响应时延不超过本档基线的 tolerance 倍时，每个请求把限制提高 1/limit
+  （约每轮并发 +1）；本档样本不足 min_samples 时只积累样本、按正常处理
+- 乘性减：时延超过阈值或出现 429/5xx/超时时，限制乘以 backoff；每次拥塞只减一次，
+  在上次减小之前就已发出的请求再报告过载时不重复减小（同一波 429 只算一次）
+
+超出限制的调用方排队等待；队列已满或等待超时时直接拒绝（shed）。
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from utils.metrics import default_metrics
+
+
+class ConcurrencyLimitExceeded(RuntimeError):
+    """并发已满且无法排队（按 429 处理，可触发降级；重试会抵消削峰，不重试）"""
+
+    status_code = 429
+    retryable = False
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 自适应并发限制器
+
+    Args:
+        name: 名称（指标标签）
+        initial_limit: 初始并发限制
+        min_limit: 最小并发限制
+        max_limit: 最大并发限制
+        tolerance: 时延超过基线多少倍视为过载
+        backoff: 过载时的乘性减系数
+        window: 每个长度档基线时延的样本窗口
+        min_samples: 长度档参与时延判断前至少需要的样本数
+        max_queue: 最大排队数（为空不限制）
+        queue_timeout: 最长排队时间（秒，为空一直等待）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        tolerance: float = 2.0,
+        backoff: float = 0.7,
+        window: int = 100,
+        min_samples: int = 5,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiting = 0
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[int, Deque[float]] = {}
+        # 已发出的名额序号，以及上次减小限制时的序号
+        self._issued = 0
+        self._decreased_at = 0
+        self._cond = threading.Condition()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @staticmethod
+    def _bucket(size: Optional[int]) -> int:
+        """输出长度档：0, 1, 2-3, 4-7, 8-15 ..."""
+        return max(0, int(size or 0)).bit_length()
+
+    def baseline(self, size: Optional[int] = None) -> Optional[float]:
+        """输出长度为 size 的请求的基线时延（样本不足时为 None）"""
+        samples = self._samples.get(self._bucket(size))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return min(samples)
+
+    def _publish(self):
+        default_metrics.set_gauge("llm_concurrency_limit", self.limit, provider=self.name)
+        default_metrics.set_gauge("llm_concurrency_in_flight", self._in_flight, provider=self.name)
+        default_metrics.set_gauge("llm_concurrency_queue", self._waiting, provider=self.name)
+
+    def _shed(self, reason: str):
+        default_metrics.inc("llm_concurrency_shed", provider=self.name, reason=reason)
+        raise ConcurrencyLimitExceeded(f"Concurrency limit for '{self.name}' exceeded ({reason})")
+
+    def _enter_queue(self) -> bool:
+        """占用一个并发名额，或登记为排队者；返回是否已获得名额"""
+        if self._in_flight < self.limit and not self._waiting:
+            self._in_flight += 1
+            self._issued += 1
+            self._publish()
+            return True
+        if self.max_queue is not None and self._waiting >= self.max_queue:
+            self._shed("queue_full")
+        self._waiting += 1
+        self._publish()
+        return False
+
+    def _try_leave_queue(self) -> bool:
+        if self._in_flight < self.limit:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._issued += 1
+            self._publish()
+            return True
+        return False
+
+    def _abandon_queue(self):
+        self._waiting -= 1
+        self._publish()
+        self._cond.notify_all()
+
+    def acquire(self) -> int:
+        """获取并发名额（超出限制时排队），返回名额序号（交给 release()）"""
+        with self._cond:
+            if self._enter_queue():
+                return self._issued
+            deadline = None if self.queue_timeout is None else time.monotonic() + self.queue_timeout
+            while not self._try_leave_queue():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._abandon_queue()
+                    self._shed("queue_timeout")
+                self._cond.wait(timeout=remaining)
+            return self._issued
+
+    async def aacquire(self) -> int:
+        """异步获取并发名额，排队期间不阻塞事件循环；返回名额序号"""
+        with self._cond:
+            if self._enter_queue():
+                return self._issued
+        deadline = None if self.queue_timeout is None else time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                with self._cond:
+                    if self._try_leave_queue():
+                        return self._issued
+                    if deadline is not None and time.monotonic() >= deadline:
+                        self._abandon_queue()
+                        self._shed("queue_timeout")
+                await asyncio.sleep(0.005)
+        except asyncio.CancelledError:
+            with self._cond:
+                self._abandon_queue()
+            raise
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        overloaded: bool = False,
+        size: Optional[int] = None,
+        ticket: Optional[int] = None
+    ):
+        """归还名额并调整限制
+
+        Args:
+            latency: 本次请求时延（秒），为空则不参与时延判断（如流式请求）
+            overloaded: 是否出现 429/5xx/超时等过载信号
+            size: 输出长度（token 数），只与同一长度档的基线比较
+            ticket: acquire() 返回的名额序号；为空时每个过载信号都减小限制
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease(ticket)
+            elif latency is not None:
+                baseline = self.baseline(size)
+                bucket = self._bucket(size)
+                if bucket not in self._samples:
+                    self._samples[bucket] = deque(maxlen=self.window)
+                self._samples[bucket].append(latency)
+                if baseline is not None and latency > baseline * self.tolerance:
+                    self._decrease(ticket)
+                else:
+                    self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+            self._publish()
+            self._cond.notify_all()
+
+    def _decrease(self, ticket: Optional[int] = None):
+        if ticket is not None and ticket <= self._decreased_at:
+            # 请求在上次减小之前发出，属于同一次拥塞
+            return
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._decreased_at = self._issued
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": self._waiting,
+                "baseline_ms": {
+                    f"<{1 << bucket}": min(samples) * 1000
+                    for bucket, samples in sorted(self._samples.items())
+                    if len(samples) >= self.min_samples
+                },
+            }
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(provider: str, **kwargs) -> AdaptiveConcurrencyLimiter:
+    """获取或创建 Provider 的全局并发限制器"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            if not kwargs:
+                from config import config as app_config
+                kwargs = {
+                    "initial_limit": app_config.llm_concurrency_initial,
+                    "max_limit": app_config.llm_concurrency_max,
+                    "max_queue": app_config.llm_concurrency_max_queue,
+                    "queue_timeout": app_config.llm_concurrency_queue_timeout,
+                }
+            limiter = _limiters[provider] = AdaptiveConcurrencyLimiter(provider, **kwargs)
+        return limiter
+
+
+def concurrency_stats() -> Dict[str, Dict]:
+    """全部 Provider 的并发限制状态"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+__all__ = [
+    "ConcurrencyLimitExceeded",
+    "AdaptiveConcurrencyLimiter",
+    "get_concurrency_limiter",
+    "concurrency_stats",
+]
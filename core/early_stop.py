@@ -0,0 +1,153 @@
+"""结构化输出提前结束模块
+
+工单、合同审核等场景要求模型只输出一个 JSON 对象，但模型常在对象结束后继续
+输出说明文字，这部分同样占用时间并计费。请求带上控制参数 stop_on_json=True 时，
+本包装层在顶层 JSON 对象闭合且可解析、且其后确实出现了非空白文本时关闭上游流
+（连接随之中止，Provider 停止生成），对象之后的文本不再输出。
+
+- stream_chat：输出到对象闭合为止；传入 stream_info 时写入结束原因
+- chat：内部改走流式请求；只有丢弃了对象之后的文本时 finish_reason 才为
+  "json_complete"，否则沿用上游的结束原因（"stop"/"length"）和用量
+
+只在确实截掉尾部时统计：丢弃的尾部 token 数为实测值；节省 token 数为
+max_tokens 减去已生成数（上限估计），节省时间按本次流的平均出字速度折算。
+"""
+import time
+from typing import Dict, Generator, List, Optional
+from .llm_client import DelegatingLLMClient, LLMResponse, StreamInfo
+from .token_counter import TokenCounter
+from utils.json_stream import IncrementalJSONParser
+from utils.metrics import default_metrics
+
+# 截掉顶层 JSON 对象之后的文本而提前结束时的 finish_reason
+JSON_COMPLETE = "json_complete"
+
+
+class EarlyStopState:
+    """单次请求的提前结束状态"""
+
+    def __init__(self, info: Optional[StreamInfo] = None):
+        self.info = info or StreamInfo()
+        self.stopped = False
+        self.output_tokens = 0
+        self.dropped_tokens = 0
+        self.saved_tokens = 0
+        self.saved_ms = 0.0
+
+    @property
+    def finish_reason(self) -> str:
+        if self.stopped:
+            return JSON_COMPLETE
+        return self.info.finish_reason or "stop"
+
+
+class JSONEarlyStopLLMClient(DelegatingLLMClient):
+    """顶层 JSON 对象完成后提前结束生成的包装客户端（stop_on_json=True 时生效）
+
+    Args:
+        client: 内部客户端
+        scenario: 场景名称（用于统计）
+    """
+
+    def __init__(self, client, scenario: Optional[str] = None):
+        super().__init__(client)
+        self.scenario = scenario or "default"
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        if not kwargs.pop("stop_on_json", False):
+            return self.client.chat(messages, temperature, max_tokens, **kwargs)
+
+        state = EarlyStopState(kwargs.pop("stream_info", None))
+        content = "".join(self._stream(messages, temperature, max_tokens, state, **kwargs))
+        usage = state.info.usage
+        if not usage or state.stopped:
+            # 连接提前关闭时上游不会返回用量，按已输出文本估算
+            prompt_tokens = TokenCounter.count_messages_tokens(messages)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": state.output_tokens,
+                "total_tokens": prompt_tokens + state.output_tokens,
+            }
+        return LLMResponse(
+            content=content,
+            model=self.model,
+            usage=usage,
+            raw_response=None,
+            finish_reason=state.finish_reason
+        )
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        if not kwargs.pop("stop_on_json", False) or kwargs.get("raw_stream"):
+            yield from self.client.stream_chat(messages, temperature, max_tokens, **kwargs)
+            return
+        state = EarlyStopState(kwargs.pop("stream_info", None))
+        yield from self._stream(messages, temperature, max_tokens, state, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[Dict],
+        temperature: float,
+        max_tokens: int,
+        state: EarlyStopState,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        parser = IncrementalJSONParser()
+        emitted = 0
+        start = time.perf_counter()
+        stream = self.client.stream_chat(messages, temperature, max_tokens, stream_info=state.info, **kwargs)
+        try:
+            for chunk in stream:
+                parser.feed(chunk)
+                if not parser.complete or parser.result() is None:
+                    # 对象未闭合，或闭合但无法解析（按普通输出继续）
+                    emitted += len(chunk)
+                    yield chunk
+                    continue
+                head = parser.text[emitted:parser.end_offset]
+                if head:
+                    emitted += len(head)
+                    yield head
+                if parser.text[parser.end_offset:].strip():
+                    state.stopped = True
+                    break
+                # 对象之后暂时只有空白，继续读取，确认是否还有尾部文本
+            if not state.stopped and emitted < len(parser.text):
+                yield parser.text[emitted:]
+        finally:
+            # 关闭内部生成器会逐层关闭上游响应，Provider 随连接断开停止生成
+            stream.close()
+
+        if state.stopped:
+            state.info.finish_reason = JSON_COMPLETE
+            output = parser.text[:parser.end_offset]
+            state.output_tokens = max(1, TokenCounter.estimate_tokens(output))
+            state.dropped_tokens = TokenCounter.estimate_tokens(parser.text[parser.end_offset:])
+            self._record(state, max_tokens, time.perf_counter() - start)
+        else:
+            output = parser.text
+            state.output_tokens = max(1, TokenCounter.estimate_tokens(output)) if output else 0
+
+    def _record(self, state: EarlyStopState, max_tokens: int, elapsed: float):
+        state.saved_tokens = max(0, max_tokens - state.output_tokens - state.dropped_tokens)
+        if state.output_tokens:
+            state.saved_ms = elapsed * 1000 * state.saved_tokens / (state.output_tokens + state.dropped_tokens)
+        labels = {"scenario": self.scenario}
+        default_metrics.inc("llm_json_early_stop", **labels)
+        default_metrics.inc("llm_json_early_stop_dropped_tokens", state.dropped_tokens, **labels)
+        default_metrics.inc("llm_json_early_stop_saved_tokens", state.saved_tokens, **labels)
+        default_metrics.observe("llm_json_early_stop_saved_ms", state.saved_ms, **labels)
+
+
+__all__ = ["JSON_COMPLETE", "EarlyStopState", "JSONEarlyStopLLMClient"]
@@ -0,0 +1,81 @@
+"""Provider调用错误分类
+
+统一识别 requests、openai SDK 等抛出的异常，供熔断、重试等策略判断
+错误是否由 Provider 侧引起、是否值得重试。
+"""
+import socket
+from typing import Optional
+
+import requests
+
+# 错误类别
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+RATE_LIMIT = "rate_limit"
+SERVER = "server"
+CLIENT = "client"
+UNKNOWN = "unknown"
+
+# Provider侧故障（计入熔断）
+PROVIDER_FAILURES = frozenset({TIMEOUT, CONNECTION, SERVER, UNKNOWN})
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    """提取异常携带的 HTTP 状态码"""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException) -> str:
+    """错误分类
+
+    Returns:
+        str: timeout / connection / rate_limit / server / client / unknown
+    """
+    status = error_status_code(error)
+    if status is not None:
+        if status == 429:
+            return RATE_LIMIT
+        if status == 408:
+            return TIMEOUT
+        if status >= 500:
+            return SERVER
+        if 400 <= status < 500:
+            return CLIENT
+
+    if isinstance(error, (requests.Timeout, socket.timeout, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (requests.ConnectionError, ConnectionError)):
+        return CONNECTION
+
+    # openai SDK 异常不依赖 requests，按类名识别
+    name = type(error).__name__
+    if "Timeout" in name:
+        return TIMEOUT
+    if "Connection" in name:
+        return CONNECTION
+    if isinstance(error, (ValueError, TypeError)):
+        return CLIENT
+    return UNKNOWN
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """是否为 Provider 侧故障（超时、连接失败、5xx 等）"""
+    return classify_error(error) in PROVIDER_FAILURES
+
+
+__all__ = [
+    "TIMEOUT",
+    "CONNECTION",
+    "RATE_LIMIT",
+    "SERVER",
+    "CLIENT",
+    "UNKNOWN",
+    "error_status_code",
+    "classify_error",
+    "is_provider_failure",
+]
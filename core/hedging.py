@@ -0,0 +1,375 @@
+"""对冲请求模块
+
+请求在按历史分位数计算的时延内仍未返回（流式为首个片段）时，向同一或备用
+Provider 再发一次相同请求，取先成功的结果，另一个请求被取消。
+
+- 对冲延迟：最近时延样本的指定分位数（默认 p95），样本不足时不对冲
+- 对冲预算：每个请求积累 ratio 个令牌，发出一次对冲消耗一个，
+  额外请求量不会超过 ratio（默认 5%）
+- 取消：异步请求直接取消任务；流式请求关闭落后的流；同步请求无法中断已
+  发出的 HTTP 调用，落后的结果在后台完成后被丢弃
+- 线程：同步请求在预算允许对冲时才放入线程池（大小由 LLM_HEDGE_MAX_WORKERS 配置），
+  否则在调用线程中直接执行；流式读取持续到流结束，每个流使用独立线程，不占用线程池
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, Generator, List, Optional, Tuple
+from .cancellation import CancellationToken
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse, StreamInfo
+from utils.metrics import default_metrics
+
+
+class HedgeBudget:
+    """对冲预算
+
+    Args:
+        ratio: 允许的额外请求比例
+        max_tokens: 令牌上限（允许的短时突发对冲数）
+    """
+
+    def __init__(self, ratio: float = 0.05, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        """每个原始请求积累预算"""
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def available(self) -> bool:
+        """当前预算是否足够发出一次对冲（不消耗）"""
+        with self._lock:
+            return self._tokens >= 1.0
+
+    def try_acquire(self) -> bool:
+        """尝试消耗一次对冲预算"""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class LatencyTracker:
+    """最近时延样本，用于计算对冲延迟"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """分位数（秒），样本不足时返回 None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """同步对冲请求使用的线程池（按应用配置延迟创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from config import config as app_config
+            _executor = ThreadPoolExecutor(
+                max_workers=app_config.llm_hedge_max_workers, thread_name_prefix="llm-hedge"
+            )
+        return _executor
+
+
+_DONE = object()
+
+
+class _StreamReader:
+    """在独立的后台线程中读取流，片段写入共享队列
+
+    每个流有自己的取消令牌（随调用方的令牌一起取消）和 StreamInfo：cancel() 立即
+    关闭该流的上游连接，不必等到下一个片段；结束信息只在胜出后复制给调用方。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        client: BaseLLMClient,
+        args: Tuple,
+        kwargs: Dict,
+        out: "queue.Queue",
+        parent: Optional[CancellationToken] = None
+    ):
+        self.name = name
+        self.token = CancellationToken()
+        self.info = StreamInfo()
+        self._unlink = parent.register(self.token.cancel) if parent is not None else None
+        self._stream = client.stream_chat(
+            *args, **{**kwargs, "cancel_token": self.token, "stream_info": self.info}
+        )
+        self._out = out
+        threading.Thread(target=self._run, name=f"llm-hedge-{name}", daemon=True).start()
+
+    def _run(self):
+        try:
+            for chunk in self._stream:
+                if self.token.cancelled:
+                    break
+                self._out.put((self.name, chunk))
+            self._out.put((self.name, _DONE))
+        except Exception as e:
+            self._out.put((self.name, e))
+        finally:
+            self._stream.close()
+            if self._unlink is not None:
+                self._unlink()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def copy_info(self, target: Optional[StreamInfo]):
+        if target is not None:
+            target.finish_reason = self.info.finish_reason
+            target.usage = self.info.usage
+
+
+class HedgingLLMClient(DelegatingLLMClient):
+    """对冲请求客户端
+
+    chat()/achat()/stream_chat() 的额外参数：
+        hedge: False 时不对冲
+
+    Args:
+        client: 主客户端
+        hedge_client: 对冲请求使用的客户端（默认与主客户端相同）
+        percentile: 对冲延迟的时延分位数
+        budget: 对冲预算
+        min_delay: 最小对冲延迟（秒）
+        latency: 非流式时延样本（可在多个实例间共享）
+        ttft: 流式首片段时延样本
+    """
+
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        hedge_client: Optional[BaseLLMClient] = None,
+        percentile: float = 95.0,
+        budget: Optional[HedgeBudget] = None,
+        min_delay: float = 0.05,
+        latency: Optional[LatencyTracker] = None,
+        ttft: Optional[LatencyTracker] = None
+    ):
+        super().__init__(client)
+        self.hedge_client = hedge_client or client
+        self.percentile = percentile
+        self.budget = budget or HedgeBudget()
+        self.min_delay = min_delay
+        self.latency = latency or LatencyTracker()
+        self.ttft = ttft or LatencyTracker()
+
+    @property
+    def _labels(self) -> Dict[str, str]:
+        return {"provider": self.provider_name}
+
+    def hedge_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        """当前对冲延迟（秒），样本不足时返回 None"""
+        value = tracker.percentile(self.percentile)
+        return None if value is None else max(self.min_delay, value)
+
+    def _start_hedge(self) -> bool:
+        if self.budget.try_acquire():
+            default_metrics.inc("llm_hedges_sent", **self._labels)
+            return True
+        default_metrics.inc("llm_hedge_budget_exhausted", **self._labels)
+        return False
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        delay = self.hedge_delay(self.latency) if kwargs.pop("hedge", True) else None
+        self.budget.on_request()
+        start = time.perf_counter()
+        if delay is None or not self.budget.available():
+            # 无法对冲时在调用线程中直接请求
+            response = self.client.chat(messages, temperature, max_tokens, **kwargs)
+            self.latency.observe(time.perf_counter() - start)
+            return response
+
+        executor = get_hedge_executor()
+        primary = executor.submit(self.client.chat, messages, temperature, max_tokens, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._start_hedge():
+            response = primary.result()
+            self.latency.observe(time.perf_counter() - start)
+            return response
+
+        hedge = executor.submit(self.hedge_client.chat, messages, temperature, max_tokens, **kwargs)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        # 已发出的同步请求无法中断，结果在后台完成后丢弃
+                        loser.cancel()
+                    if future is hedge:
+                        default_metrics.inc("llm_hedge_wins", **self._labels)
+                    self.latency.observe(time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        delay = self.hedge_delay(self.latency) if kwargs.pop("hedge", True) else None
+        self.budget.on_request()
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self.client.achat(messages, temperature, max_tokens, **kwargs))
+        if delay is None:
+            response = await primary
+            self.latency.observe(time.perf_counter() - start)
+            return response
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._start_hedge():
+            response = await primary
+            self.latency.observe(time.perf_counter() - start)
+            return response
+
+        hedge = asyncio.ensure_future(self.hedge_client.achat(messages, temperature, max_tokens, **kwargs))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            default_metrics.inc("llm_hedge_wins", **self._labels)
+                        self.latency.observe(time.perf_counter() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        """流式聊天：首个片段超过对冲延迟仍未到达时发出对冲流，先出片段的流胜出"""
+        delay = self.hedge_delay(self.ttft) if kwargs.pop("hedge", True) else None
+        self.budget.on_request()
+        if delay is None:
+            start = time.perf_counter()
+            first = True
+            for chunk in self.client.stream_chat(messages, temperature, max_tokens, **kwargs):
+                if first:
+                    self.ttft.observe(time.perf_counter() - start)
+                    first = False
+                yield chunk
+            return
+
+        out: "queue.Queue" = queue.Queue()
+        start = time.perf_counter()
+        args = (messages, temperature, max_tokens)
+        parent = kwargs.pop("cancel_token", None)
+        info = kwargs.pop("stream_info", None)
+        readers = {"primary": _StreamReader("primary", self.client, args, kwargs, out, parent)}
+        winner = None
+        can_hedge = True
+        error: Optional[BaseException] = None
+        try:
+            while winner is None:
+                timeout = None
+                if can_hedge:
+                    timeout = max(0.0, delay - (time.perf_counter() - start))
+                try:
+                    name, item = out.get(timeout=timeout)
+                except queue.Empty:
+                    can_hedge = False
+                    if self._start_hedge():
+                        readers["hedge"] = _StreamReader("hedge", self.hedge_client, args, kwargs, out, parent)
+                    continue
+
+                if isinstance(item, BaseException) or item is _DONE:
+                    reader = readers.pop(name)
+                    reader.cancel()
+                    can_hedge = False
+                    if isinstance(item, BaseException):
+                        error = item
+                    if not readers:
+                        if error is not None:
+                            raise error
+                        reader.copy_info(info)
+                        return
+                    if item is _DONE and error is None:
+                        reader.copy_info(info)
+                        return
+                    continue
+
+                winner = name
+                self.ttft.observe(time.perf_counter() - start)
+                if name == "hedge":
+                    default_metrics.inc("llm_hedge_wins", **self._labels)
+                for other, reader in readers.items():
+                    if other != name:
+                        reader.cancel()
+                yield item
+
+            while True:
+                name, item = out.get()
+                if name != winner:
+                    continue
+                if item is _DONE:
+                    readers[winner].copy_info(info)
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            for reader in readers.values():
+                reader.cancel()
+
+
+_hedge_states: Dict[str, Tuple[HedgeBudget, LatencyTracker, LatencyTracker]] = {}
+_hedge_states_lock = threading.Lock()
+
+
+def get_hedge_state(name: str, ratio: float = 0.05) -> Tuple[HedgeBudget, LatencyTracker, LatencyTracker]:
+    """获取命名的 (对冲预算, 时延样本, 首片段时延样本)，同名客户端共享"""
+    with _hedge_states_lock:
+        state = _hedge_states.get(name)
+        if state is None:
+            state = _hedge_states[name] = (HedgeBudget(ratio), LatencyTracker(), LatencyTracker())
+        return state
+
+
+__all__ = ["HedgeBudget", "LatencyTracker", "HedgingLLMClient", "get_hedge_executor", "get_hedge_state"]
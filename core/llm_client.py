@@ -1,4 +1,5 @@
 """大模型客户端封装模块"""
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any, Generator
 from dataclasses import dataclass
@@ -15,6 +16,18 @@ class LLMResponse:
     usage: Dict[str, int]
     raw_response: Any
     finish_reason: Optional[str] = None
+    cached: bool = False
+
+
+@dataclass
+class StreamInfo:
+    """流式响应的结束信息
+
+    通过控制参数 stream_info 传入 stream_chat()，由最内层的 Provider 客户端在流结束时
+    填写；包装层可以改写（如提前结束时 finish_reason 为 json_complete）。
+    """
+    finish_reason: Optional[str] = None
+    usage: Optional[Dict[str, int]] = None
 
 
 @dataclass
@@ -46,6 +59,21 @@ class Message:
 class BaseLLMClient(ABC):
     """大模型客户端基类"""
 
+    # 客户端控制参数：由包装层消费，不会透传给 Provider 的请求体
+    CONTROL_PARAMS = frozenset({
+        "cache",
+        "scenario",
+        "coalesce",
+        "session_id",
+        "hedge",
+        "deadline",
+        "priority",
+        "cancel_token",
+        "raw_stream",
+        "stop_on_json",
+        "stream_info",
+    })
+
     def __init__(
         self,
         model: str,
@@ -71,6 +99,16 @@ class BaseLLMClient(ABC):
         """发送聊天请求"""
         pass
 
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        """异步发送聊天请求（默认在线程池中执行 chat()）"""
+        return await asyncio.to_thread(self.chat, messages, temperature, max_tokens, **kwargs)
+
     @abstractmethod
     def stream_chat(
         self,
@@ -99,6 +137,63 @@ class BaseLLMClient(ABC):
         messages.append({"role": "user", "content": user_message})
         return self.chat(messages, temperature, max_tokens)
 
+    @property
+    def provider_name(self) -> str:
+        """提供商名称"""
+        return getattr(self, "_provider", None) or self.__class__.__name__.lower().replace("client", "")
+
+    @classmethod
+    def strip_control_params(cls, kwargs: Dict) -> Dict:
+        """移除客户端控制参数"""
+        return {k: v for k, v in kwargs.items() if k not in cls.CONTROL_PARAMS}
+
+
+class DelegatingLLMClient(BaseLLMClient):
+    """包装客户端基类
+
+    持有一个内部客户端并转发调用，用于在 chat()/stream_chat() 前后叠加
+    缓存、合并、路由等能力。未覆盖的属性访问会转发给内部客户端。
+    achat() 默认在线程池中调用本层的 chat()，需要原生异步的包装层自行覆盖。
+    """
+
+    def __init__(self, client: BaseLLMClient):
+        super().__init__(
+            model=client.model,
+            api_key=client.api_key,
+            base_url=client.base_url,
+            timeout=client.timeout
+        )
+        self.client = client
+
+    @property
+    def provider_name(self) -> str:
+        return self.client.provider_name
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        return self.client.chat(messages, temperature, max_tokens, **kwargs)
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        return self.client.stream_chat(messages, temperature, max_tokens, **kwargs)
+
+    def __getattr__(self, name: str):
+        # 仅在常规属性查找失败时调用
+        client = self.__dict__.get("client")
+        if client is None:
+            raise AttributeError(name)
+        return getattr(client, name)
+
 
 class LLMFactory:
     """大模型工厂 - 创建不同Provider的客户端"""
@@ -114,7 +209,7 @@ class LLMFactory:
     @classmethod
     def create(cls, provider: str, model: str = None, **kwargs) -> BaseLLMClient:
         """创建大模型客户端"""
-        from ..config.key_config import KeyManager
+        from config.key_config import KeyManager
 
         if provider not in cls._clients:
             available = list(cls._clients.keys())
@@ -137,6 +232,155 @@ class LLMFactory:
             **kwargs
         )
 
+    @classmethod
+    def create_for_scenario(
+        cls,
+        scenario: str,
+        provider: str = None,
+        model: str = None,
+        **kwargs
+    ) -> BaseLLMClient:
+        """为业务场景创建客户端，并按应用配置叠加包装层
+
+        Args:
+            scenario: 场景名称（如 work_order_ai），用于缓存TTL等按场景的策略
+            provider: 提供商（默认取场景默认配置）
+            model: 模型名称
+        """
+        from config import config as app_config, get_default_config
+
+        if not provider:
+            default = get_default_config(scenario)
+            provider, model = default.provider, model or default.model
+
+        client = None
+        if app_config.llm_router_enabled:
+            client = cls._create_router(scenario, provider, model)
+        if client is None:
+            client = cls._create_upstream(provider, model, **kwargs)
+            if app_config.llm_breaker_enabled:
+                client = cls._with_breaker(client, fallback=app_config.llm_fallback_enabled)
+
+        if app_config.hedge_enabled_for(scenario):
+            client = cls._with_hedging(client, scenario)
+
+        if app_config.llm_json_early_stop_enabled:
+            from .early_stop import JSONEarlyStopLLMClient
+            client = JSONEarlyStopLLMClient(client, scenario=scenario)
+
+        if app_config.llm_scheduler_enabled:
+            from config import SCENARIO_PRIORITIES
+            from .scheduler import ScheduledLLMClient, get_scheduler
+            client = ScheduledLLMClient(client, get_scheduler(), priority=SCENARIO_PRIORITIES.get(scenario))
+
+        if app_config.llm_coalesce_enabled:
+            from .single_flight import SingleFlightLLMClient
+            client = SingleFlightLLMClient(client)
+
+        if app_config.llm_cache_enabled:
+            from .response_cache import CachedLLMClient, get_response_cache
+            client = CachedLLMClient(client, cache=get_response_cache(), scenario=scenario)
+
+        return client
+
+    @classmethod
+    def _create_upstream(cls, provider: str, model: str = None, **kwargs) -> BaseLLMClient:
+        """创建单个Provider客户端，按应用配置叠加限流和重试（每次重试都重新排队取额度）"""
+        from config import PROVIDER_RATE_LIMITS, config as app_config
+        from .retry import RetryingLLMClient, RetryPolicy
+
+        client = cls.create(provider, model, **kwargs)
+        limits = PROVIDER_RATE_LIMITS.get(provider)
+        if app_config.llm_rate_limit_enabled and limits:
+            from .rate_limiter import RateLimitedLLMClient, get_rate_limiter
+            limiter = get_rate_limiter(
+                provider,
+                client.api_key,
+                rpm=limits.get("rpm"),
+                tpm=limits.get("tpm"),
+                max_wait=app_config.llm_rate_limit_max_wait
+            )
+            client = RateLimitedLLMClient(client, limiter)
+
+        if app_config.max_retries <= 0:
+            return client
+        policy = RetryPolicy(
+            max_retries=app_config.max_retries,
+            base_delay=app_config.retry_base_delay,
+            max_delay=app_config.retry_max_delay,
+            name=f"{client.provider_name}/{client.model}"
+        )
+        return RetryingLLMClient(client, policy, deadline_seconds=app_config.llm_request_deadline)
+
+    @classmethod
+    def _create_router(cls, scenario: str, provider: str, model: str = None) -> Optional[BaseLLMClient]:
+        """创建场景路由；场景未配置多个可用目标或指定的模型不在目标中时返回 None"""
+        from config import KeyManager, SCENARIO_ROUTE_TARGETS, config as app_config
+        from .router import RouteTarget, RouterWeights, find_router, get_router
+
+        targets = [
+            RouteTarget(**item) for item in SCENARIO_ROUTE_TARGETS.get(scenario, [])
+            if item["provider"] in cls._clients and KeyManager.is_provider_available(item["provider"])
+        ]
+        requested = [t for t in targets if t.provider == provider and (not model or t.model == model)]
+        if len(targets) < 2 or not requested:
+            return None
+
+        # 路由按场景缓存，已存在时不再重复创建目标客户端
+        router = find_router(scenario)
+        if router is not None:
+            return router
+
+        for target in targets:
+            target.client = cls._create_upstream(target.provider, target.model)
+            if app_config.llm_breaker_enabled:
+                target.client = cls._with_breaker(target.client)
+
+        return get_router(
+            scenario,
+            targets,
+            weights=RouterWeights.parse(app_config.llm_router_weights),
+            sticky_ttl=app_config.llm_router_sticky_ttl
+        )
+
+    @classmethod
+    def _with_breaker(cls, client: BaseLLMClient, fallback: bool = False) -> BaseLLMClient:
+        """叠加熔断器，可选按 PROVIDER_FALLBACKS 配置降级链"""
+        from config import KeyManager, PROVIDER_FALLBACKS
+        from .circuit_breaker import CircuitBreakerLLMClient
+
+        fallbacks = []
+        if fallback:
+            for item in PROVIDER_FALLBACKS.get(client.provider_name, []):
+                if item["provider"] in cls._clients and KeyManager.is_provider_available(item["provider"]):
+                    fallbacks.append(cls._create_upstream(item["provider"], item.get("model")))
+        return CircuitBreakerLLMClient(client, fallbacks=fallbacks)
+
+    @classmethod
+    def _with_hedging(cls, client: BaseLLMClient, scenario: str) -> BaseLLMClient:
+        """叠加对冲请求；同场景共享时延样本和对冲预算"""
+        from config import KeyManager, PROVIDER_FALLBACKS, config as app_config
+        from .hedging import HedgingLLMClient, get_hedge_state
+
+        hedge_client = None
+        if app_config.llm_hedge_alternate:
+            for item in PROVIDER_FALLBACKS.get(client.provider_name, []):
+                if item["provider"] in cls._clients and KeyManager.is_provider_available(item["provider"]):
+                    hedge_client = cls._create_upstream(item["provider"], item.get("model"))
+                    if app_config.llm_breaker_enabled:
+                        hedge_client = cls._with_breaker(hedge_client)
+                    break
+
+        budget, latency, ttft = get_hedge_state(scenario, ratio=app_config.llm_hedge_budget)
+        return HedgingLLMClient(
+            client,
+            hedge_client=hedge_client,
+            percentile=app_config.llm_hedge_percentile,
+            budget=budget,
+            latency=latency,
+            ttft=ttft
+        )
+
     @classmethod
     def _get_default_model(cls, provider: str) -> str:
         """获取Provider的默认模型"""
@@ -167,5 +411,6 @@ __all__ = [
     "LLMResponse",
     "Message",
     "BaseLLMClient",
+    "DelegatingLLMClient",
     "LLMFactory",
 ]
@@ -4,9 +4,19 @@
 都可以继承此基类，只需配置少量参数即可。
 """
 import json
+import time
 import requests
 from typing import List, Dict, Generator, Optional
-from .llm_client import BaseLLMClient, LLMResponse, LLMFactory
+from .concurrency import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from .cancellation import CancellationToken
+from .errors import RATE_LIMIT, SERVER, TIMEOUT, classify_error
+from .llm_client import BaseLLMClient, LLMResponse, LLMFactory, StreamInfo
+from .response_format import adapt_response_format
+from .sse import extract_delta_content, iter_sse_events
+from utils.metrics import default_metrics
+
+# 视为 Provider 过载的错误类别（触发并发限制下调）
+OVERLOAD_ERRORS = frozenset({RATE_LIMIT, SERVER, TIMEOUT})
 
 
 class OpenAICompatibleClient(BaseLLMClient):
@@ -18,19 +28,29 @@ class OpenAICompatibleClient(BaseLLMClient):
         model: 模型名称
         provider: 提供商标识（用于获取配置）
         extra_headers: 额外的请求头（如 OpenAI 的 Organization）
+        concurrency_limiter: 并发限制器（默认按应用配置使用 Provider 的全局自适应限制器）
         **kwargs: 其他参数传递给基类
     """
 
+    # 流式响应单次读取的最大字节数
+    STREAM_READ_SIZE = 65536
+
     def __init__(
         self,
         model: str,
         provider: str = None,
         extra_headers: Optional[Dict[str, str]] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
         **kwargs
     ):
         super().__init__(model, **kwargs)
         self._provider = provider or self._get_provider_name()
         self._extra_headers = extra_headers or {}
+        if concurrency_limiter is None:
+            from config import config as app_config
+            if app_config.llm_adaptive_concurrency_enabled:
+                concurrency_limiter = get_concurrency_limiter(self._provider)
+        self.concurrency_limiter = concurrency_limiter
 
     def _get_provider_name(self) -> str:
         """获取提供商名称（子类可覆盖）"""
@@ -53,14 +73,31 @@ class OpenAICompatibleClient(BaseLLMClient):
         stream: bool = False,
         **kwargs
     ) -> Dict:
-        """构建请求体"""
+        """构建请求体
+
+        response_format 按本模型支持的结构化输出格式调整（见 RESPONSE_FORMAT_SUPPORT）
+        """
+        response_format = kwargs.pop("response_format", None)
         payload = {
             "model": self.model,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
-            **kwargs
+            **self.strip_control_params(kwargs)
         }
+        if response_format:
+            from config import get_response_format_support
+            adapted = adapt_response_format(response_format, get_response_format_support(self._provider, self.model))
+            if adapted is not response_format:
+                default_metrics.inc(
+                    "llm_response_format_downgraded",
+                    provider=self._provider,
+                    model=self.model,
+                    requested=response_format.get("type"),
+                    sent=(adapted or {}).get("type", "none")
+                )
+            if adapted:
+                payload["response_format"] = adapted
         if stream:
             payload["stream"] = True
         return payload
@@ -98,11 +135,23 @@ class OpenAICompatibleClient(BaseLLMClient):
         headers = self._build_headers()
         payload = self._build_payload(messages, temperature, max_tokens, **kwargs)
 
-        response = requests.post(url, headers=headers, json=payload, timeout=self.timeout)
-        response.raise_for_status()
-        data = response.json()
+        limiter = self.concurrency_limiter
+        ticket = limiter.acquire() if limiter is not None else None
+        start = time.perf_counter()
+        try:
+            response = requests.post(url, headers=headers, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            result = self._parse_response(response.json())
+        except Exception as e:
+            if limiter is not None:
+                limiter.release(overloaded=classify_error(e) in OVERLOAD_ERRORS, ticket=ticket)
+            raise
 
-        return self._parse_response(data)
+        if limiter is not None:
+            # 时延只与输出长度相近的请求比较（首 token 时延固定，不能按 token 数直接归一化）
+            completion_tokens = (result.usage or {}).get("completion_tokens") or 0
+            limiter.release(latency=time.perf_counter() - start, size=completion_tokens, ticket=ticket)
+        return result
 
     def stream_chat(
         self,
@@ -118,29 +167,121 @@ class OpenAICompatibleClient(BaseLLMClient):
             temperature: 温度参数
             max_tokens: 最大 token 数
             **kwargs: 其他参数
+                cancel_token: 取消令牌，取消后立即关闭上游响应并结束流
+                raw_stream: 为 True 时原样输出上游 SSE 字节块，不做解码
+                stream_info: StreamInfo，流结束时写入 finish_reason 和 usage
 
         Yields:
-            str: 文本片段
+            str: 文本片段（raw_stream 时为 bytes）
         """
         url = f"{self.base_url}/chat/completions"
         headers = self._build_headers()
+        cancel_token = kwargs.pop("cancel_token", None)
+        raw = kwargs.pop("raw_stream", False)
+        info = kwargs.pop("stream_info", None)
         payload = self._build_payload(messages, temperature, max_tokens, stream=True, **kwargs)
+        if info is not None and not raw:
+            payload["stream_options"] = {"include_usage": True}
+
+        chunks = self._stream_bytes(url, headers, payload, cancel_token)
+        source = chunks if raw else self._iter_deltas(chunks, info)
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            yield from source
+            return
+
+        # 流式请求在整个流期间占用名额；时延随输出长度变化，只反馈过载信号
+        ticket = limiter.acquire()
+        overloaded = False
+        try:
+            yield from source
+        except Exception as e:
+            overloaded = classify_error(e) in OVERLOAD_ERRORS
+            raise
+        finally:
+            limiter.release(overloaded=overloaded, ticket=ticket)
+
+    @staticmethod
+    def _iter_deltas(
+        chunks: Generator[bytes, None, None],
+        info: Optional[StreamInfo] = None
+    ) -> Generator[str, None, None]:
+        """增量解码 SSE 事件并提取增量文本；传入 info 时记录结束原因和用量"""
+        try:
+            for event in iter_sse_events(chunks):
+                content = extract_delta_content(event.data)
+                if info is not None:
+                    # 结束原因和用量只出现在最后的少数事件中，先按字符串过滤再解析
+                    OpenAICompatibleClient._record_stream_end(event.data, info)
+                if content:
+                    yield content
+        finally:
+            chunks.close()
+
+    @staticmethod
+    def _record_stream_end(data: str, info: StreamInfo):
+        if '"finish_reason"' not in data and '"usage"' not in data:
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            return
+        choices = chunk.get("choices") or []
+        if choices and choices[0].get("finish_reason"):
+            info.finish_reason = choices[0]["finish_reason"]
+        if chunk.get("usage"):
+            info.usage = chunk["usage"]
 
+    def _stream_bytes(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[bytes, None, None]:
+        """发送流式请求并输出原始字节块；流结束、被关闭或被取消时都会关闭上游响应"""
+        if cancel_token is not None and cancel_token.cancelled:
+            self._record_cancel()
+            return
         response = requests.post(url, headers=headers, json=payload, stream=True, timeout=self.timeout)
-        response.raise_for_status()
-
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data_str = line[6:]
-                    if data_str == '[DONE]':
-                        break
-                    try:
-                        chunk = json.loads(data_str)
-                        content = chunk["choices"][0].get("delta", {}).get("content", "")
-                        if content:
-                            yield content
-                    except (json.JSONDecodeError, KeyError):
-                        # 忽略解析错误的行
-                        continue
+        unregister = cancel_token.register(lambda: self._abort(response)) if cancel_token is not None else None
+        try:
+            response.raise_for_status()
+            yield from self._iter_bytes(response, cancel_token)
+        except Exception:
+            # 取消时关闭响应会打断正在进行的读取，此时的读取错误不再向上抛出
+            if cancel_token is None or not cancel_token.cancelled:
+                raise
+        finally:
+            if unregister is not None:
+                unregister()
+            response.close()
+        if cancel_token is not None and cancel_token.cancelled:
+            self._record_cancel()
+
+    def _iter_bytes(
+        self,
+        response: requests.Response,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[bytes, None, None]:
+        """按到达顺序读取原始字节块（read1 有多少读多少，不等凑满固定大小）"""
+        read1 = getattr(response.raw, "read1", None)
+        if read1 is None:
+            yield from response.iter_content(chunk_size=512)
+            return
+        while cancel_token is None or not cancel_token.cancelled:
+            data = read1(self.STREAM_READ_SIZE)
+            if not data:
+                return
+            yield data
+
+    @staticmethod
+    def _abort(response: requests.Response):
+        """从其它线程中止响应：先关闭底层 socket 打断阻塞中的读取，再释放连接"""
+        shutdown = getattr(response.raw, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+        response.close()
+
+    def _record_cancel(self):
+        default_metrics.inc("llm_stream_cancelled", provider=self._provider, model=self.model)
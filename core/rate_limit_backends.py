@@ -0,0 +1,215 @@
+"""跨进程限流存储
+
+多个 uvicorn worker 或多台主机共享同一 Provider 账号的 RPM/TPM 额度时，
+令牌桶状态需要放在进程外：
+
+- SQLiteRateLimitBackend：单机多进程，SQLite WAL + BEGIN IMMEDIATE 保证原子扣减
+- RedisRateLimitBackend：跨主机，基于 WATCH/MULTI/EXEC 乐观事务，
+  兼容 redis-py 客户端接口，时间取 Redis 服务端时间避免主机时钟偏差
+
+排队公平性只在进程内保证，进程之间按各自的取额度顺序竞争。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+from .rate_limiter import BucketSpec, MemoryRateLimitBackend, RateLimitBackend, _refill, _wait_time
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """SQLite 令牌桶存储（单机多进程共享）
+
+    Args:
+        path: 数据库文件路径
+        busy_timeout: 等待其它进程释放写锁的时长（毫秒）
+    """
+
+    def __init__(self, path: str, busy_timeout: int = 5000):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite 连接不能跨线程使用，每个线程各自持有一个；fork 后重新连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _levels(self, conn: sqlite3.Connection, specs: List[BucketSpec], now: float) -> List[float]:
+        levels = []
+        for spec in specs:
+            row = conn.execute(
+                "SELECT level, updated_at FROM rate_limit_buckets WHERE key = ?", (spec.key,)
+            ).fetchone()
+            levels.append(spec.capacity if row is None else _refill(row[0], row[1], spec, now))
+        return levels
+
+    def _write(self, conn: sqlite3.Connection, spec: BucketSpec, level: float, now: float):
+        conn.execute(
+            "INSERT OR REPLACE INTO rate_limit_buckets (key, level, updated_at) VALUES (?, ?, ?)",
+            (spec.key, level, now)
+        )
+
+    def take(self, requests: List[Tuple[BucketSpec, float]]) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            levels = self._levels(conn, [spec for spec, _ in requests], now)
+            wait = max(_wait_time(level, amount, spec) for level, (spec, amount) in zip(levels, requests))
+            if wait == 0:
+                for level, (spec, amount) in zip(levels, requests):
+                    self._write(conn, spec, level - amount, now)
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def adjust(self, spec: BucketSpec, amount: float):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            level = self._levels(conn, [spec], now)[0]
+            self._write(conn, spec, min(spec.capacity, level + amount), now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def peek(self, spec: BucketSpec) -> float:
+        return self._levels(self._conn(), [spec], time.time())[0]
+
+
+def _is_watch_error(error: BaseException) -> bool:
+    # 不强制依赖 redis 包，按类名识别 redis.exceptions.WatchError
+    return type(error).__name__ == "WatchError"
+
+
+def _decode(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    return float(value.decode() if isinstance(value, bytes) else value)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Redis 令牌桶存储（跨主机共享）
+
+    Args:
+        client: redis-py 兼容客户端（需支持 pipeline/watch/multi/execute/hmget/hset/expire/time）
+        prefix: 键前缀
+        max_attempts: 乐观事务冲突时的最大重试次数
+    """
+
+    def __init__(self, client: Any, prefix: str = "llm:ratelimit:", max_attempts: int = 50):
+        self.client = client
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+
+    def _key(self, spec: BucketSpec) -> str:
+        return self.prefix + spec.key
+
+    def _now(self) -> float:
+        seconds, micros = self.client.time()
+        return float(seconds) + float(micros) / 1e6
+
+    @staticmethod
+    def _ttl(spec: BucketSpec) -> int:
+        # 桶补满之后的状态与不存在等价，过期后自动清理
+        if spec.refill_per_second <= 0:
+            return 86400
+        return int(spec.capacity / spec.refill_per_second) + 60
+
+    def _level(self, pipe: Any, spec: BucketSpec, now: float) -> float:
+        level, updated_at = pipe.hmget(self._key(spec), "level", "updated_at")
+        level, updated_at = _decode(level), _decode(updated_at)
+        if level is None or updated_at is None:
+            return spec.capacity
+        return _refill(level, updated_at, spec, now)
+
+    def _transact(self, specs: List[BucketSpec], compute) -> Any:
+        keys = [self._key(spec) for spec in specs]
+        for _ in range(self.max_attempts):
+            pipe = self.client.pipeline()
+            try:
+                pipe.watch(*keys)
+                now = self._now()
+                levels = [self._level(pipe, spec, now) for spec in specs]
+                result, updates = compute(levels)
+                if updates is None:
+                    pipe.unwatch()
+                    return result
+                pipe.multi()
+                for spec, level in zip(specs, updates):
+                    pipe.hset(self._key(spec), mapping={"level": level, "updated_at": now})
+                    pipe.expire(self._key(spec), self._ttl(spec))
+                pipe.execute()
+                return result
+            except Exception as e:
+                if not _is_watch_error(e):
+                    raise
+            finally:
+                pipe.reset()
+        raise RuntimeError(f"Rate limit transaction on {keys} kept conflicting")
+
+    def take(self, requests: List[Tuple[BucketSpec, float]]) -> float:
+        specs = [spec for spec, _ in requests]
+
+        def compute(levels):
+            wait = max(_wait_time(level, amount, spec) for level, (spec, amount) in zip(levels, requests))
+            if wait > 0:
+                return wait, None
+            return 0.0, [level - amount for level, (_, amount) in zip(levels, requests)]
+
+        return self._transact(specs, compute)
+
+    def adjust(self, spec: BucketSpec, amount: float):
+        self._transact([spec], lambda levels: (None, [min(spec.capacity, levels[0] + amount)]))
+
+    def peek(self, spec: BucketSpec) -> float:
+        return self._level(self.client, spec, self._now())
+
+
+def create_rate_limit_backend(kind: str = "memory", path: str = None, url: str = None) -> RateLimitBackend:
+    """按配置创建限流存储
+
+    Args:
+        kind: memory / sqlite / redis
+        path: SQLite 文件路径
+        url: Redis 连接地址（如 redis://localhost:6379/0）
+    """
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return MemoryRateLimitBackend()
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("SQLite rate limit backend requires a database path")
+        return SQLiteRateLimitBackend(path)
+    if kind == "redis":
+        if not url:
+            raise ValueError("Redis rate limit backend requires a connection url")
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("Redis rate limit backend requires the 'redis' package: pip install redis") from e
+        return RedisRateLimitBackend(redis.Redis.from_url(url))
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+__all__ = [
+    "SQLiteRateLimitBackend",
+    "RedisRateLimitBackend",
+    "create_rate_limit_backend",
+]
@@ -0,0 +1,411 @@
+"""客户端限流模块
+
+按 (provider, API Key) 维护每分钟请求数（RPM）和每分钟 token 数（TPM）两个
+令牌桶，在请求发出前排队等待额度，避免触发 Provider 的 429：
+
+- TPM 预占：提示词按 TokenCounter 估算，加上 max_tokens 作为输出上限；
+  响应返回后按 usage 实际值修正（多退少补）
+- 公平排队：同一限流器的调用方按到达顺序获得额度，不会被拒绝
+- 指标：排队深度（llm_rate_limit_queue_depth）与等待时长（llm_rate_limit_wait_ms）
+
+令牌桶状态保存在 RateLimitBackend 中，默认为进程内存；多进程部署时可换成
+SQLite 或 Redis 存储（见 rate_limit_backends）。
+"""
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Generator, List, Optional, Tuple
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse, StreamInfo
+from .sse import SSEUsageTap
+from .token_counter import TokenCounter
+from utils.metrics import default_metrics
+
+
+class RateLimitTimeout(TimeoutError):
+    """排队等待额度超时（按 429 处理，可触发降级）
+
+    本地额度已排满，立即重试只会再次排队，因此不重试。
+    """
+
+    status_code = 429
+    retryable = False
+
+
+@dataclass
+class BucketSpec:
+    """令牌桶参数"""
+    key: str
+    capacity: float
+    refill_per_second: float
+
+
+class RateLimitBackend:
+    """令牌桶存储接口
+
+    实现需保证 take() 对多个桶的检查和扣减是原子的。blocking 为 True 的实现
+    （访问数据库、网络）在异步调用中会放到线程中执行，避免阻塞事件循环。
+    """
+
+    blocking = True
+
+    def take(self, requests: List[Tuple[BucketSpec, float]]) -> float:
+        """尝试从多个桶中同时扣减
+
+        Returns:
+            float: 0 表示已扣减；否则为需要等待的秒数（未扣减任何桶）
+        """
+        raise NotImplementedError
+
+    def adjust(self, spec: BucketSpec, amount: float):
+        """修正桶余量（正数归还，负数追加扣减，允许透支）"""
+        raise NotImplementedError
+
+    def peek(self, spec: BucketSpec) -> float:
+        """当前余量"""
+        raise NotImplementedError
+
+
+def _refill(level: float, updated_at: float, spec: BucketSpec, now: float) -> float:
+    return min(spec.capacity, level + (now - updated_at) * spec.refill_per_second)
+
+
+def _wait_time(level: float, amount: float, spec: BucketSpec) -> float:
+    if level >= amount:
+        return 0.0
+    if spec.refill_per_second <= 0:
+        return float("inf")
+    return (amount - level) / spec.refill_per_second
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """进程内令牌桶存储"""
+
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _level(self, spec: BucketSpec, now: float) -> float:
+        level, updated_at = self._buckets.get(spec.key, (spec.capacity, now))
+        return _refill(level, updated_at, spec, now)
+
+    def take(self, requests: List[Tuple[BucketSpec, float]]) -> float:
+        now = time.time()
+        with self._lock:
+            levels = [self._level(spec, now) for spec, _ in requests]
+            wait = max(_wait_time(level, amount, spec) for level, (spec, amount) in zip(levels, requests))
+            if wait > 0:
+                return wait
+            for level, (spec, amount) in zip(levels, requests):
+                self._buckets[spec.key] = (level - amount, now)
+            return 0.0
+
+    def adjust(self, spec: BucketSpec, amount: float):
+        now = time.time()
+        with self._lock:
+            level = self._level(spec, now)
+            self._buckets[spec.key] = (min(spec.capacity, level + amount), now)
+
+    def peek(self, spec: BucketSpec) -> float:
+        with self._lock:
+            return self._level(spec, time.time())
+
+
+class RateLimiter:
+    """RPM/TPM 限流器
+
+    Args:
+        name: 名称（指标标签与存储键前缀）
+        rpm: 每分钟请求数上限（为空不限制）
+        tpm: 每分钟 token 数上限（为空不限制）
+        backend: 令牌桶存储
+        max_wait: 单个请求最长排队时间（秒），为空则一直等待
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        backend: Optional[RateLimitBackend] = None,
+        max_wait: Optional[float] = None
+    ):
+        self.name = name
+        self.backend = backend or MemoryRateLimitBackend()
+        self.max_wait = max_wait
+        self.rpm_bucket = BucketSpec(f"{name}:rpm", rpm, rpm / 60.0) if rpm else None
+        self.tpm_bucket = BucketSpec(f"{name}:tpm", tpm, tpm / 60.0) if tpm else None
+        self._queue: Deque[int] = deque()
+        self._tickets = itertools.count()
+        self._cond = threading.Condition()
+
+    def _requests(self, tokens: float) -> List[Tuple[BucketSpec, float]]:
+        requests = []
+        if self.rpm_bucket is not None:
+            requests.append((self.rpm_bucket, 1))
+        if self.tpm_bucket is not None:
+            # 超过桶容量的请求按容量扣减，避免永远等待
+            requests.append((self.tpm_bucket, min(tokens, self.tpm_bucket.capacity)))
+        return requests
+
+    def _enqueue(self) -> int:
+        with self._cond:
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            default_metrics.set_gauge("llm_rate_limit_queue_depth", len(self._queue), limiter=self.name)
+            return ticket
+
+    def _dequeue(self, ticket: int):
+        with self._cond:
+            self._queue.remove(ticket)
+            default_metrics.set_gauge("llm_rate_limit_queue_depth", len(self._queue), limiter=self.name)
+            self._cond.notify_all()
+
+    def _try(self, ticket: int, requests: List[Tuple[BucketSpec, float]]) -> Optional[float]:
+        """队首时尝试扣减；返回 0 表示成功，None 表示尚未轮到"""
+        with self._cond:
+            if self._queue[0] != ticket:
+                return None
+        return self.backend.take(requests) if requests else 0.0
+
+    def _check_timeout(self, start: float):
+        if self.max_wait is not None and time.monotonic() - start > self.max_wait:
+            raise RateLimitTimeout(f"Rate limiter '{self.name}' wait exceeded {self.max_wait}s")
+
+    def _record_wait(self, start: float):
+        default_metrics.observe("llm_rate_limit_wait_ms", (time.monotonic() - start) * 1000, limiter=self.name)
+
+    def acquire(self, tokens: float = 0) -> float:
+        """排队获取一个请求和 tokens 个 token 的额度
+
+        Returns:
+            float: 实际扣减的 token 数（用于之后修正）
+        """
+        requests = self._requests(tokens)
+        start = time.monotonic()
+        ticket = self._enqueue()
+        try:
+            while True:
+                wait = self._try(ticket, requests)
+                if wait == 0:
+                    break
+                self._check_timeout(start)
+                with self._cond:
+                    # 未轮到时等待前面的请求出队，轮到时等待令牌补充
+                    self._cond.wait(timeout=0.05 if wait is None else min(wait, 1.0))
+        finally:
+            self._dequeue(ticket)
+        self._record_wait(start)
+        return requests[-1][1] if self.tpm_bucket is not None else 0
+
+    async def aacquire(self, tokens: float = 0) -> float:
+        """异步排队获取额度，等待期间不阻塞事件循环"""
+        requests = self._requests(tokens)
+        start = time.monotonic()
+        ticket = self._enqueue()
+        try:
+            while True:
+                if self.backend.blocking:
+                    wait = await asyncio.to_thread(self._try, ticket, requests)
+                else:
+                    wait = self._try(ticket, requests)
+                if wait == 0:
+                    break
+                self._check_timeout(start)
+                await asyncio.sleep(0.01 if wait is None else min(wait, 1.0))
+        finally:
+            self._dequeue(ticket)
+        self._record_wait(start)
+        return requests[-1][1] if self.tpm_bucket is not None else 0
+
+    def correct(self, reserved: float, actual: float):
+        """按实际 token 用量修正 TPM 桶"""
+        if self.tpm_bucket is not None and actual >= 0 and actual != reserved:
+            self.backend.adjust(self.tpm_bucket, reserved - actual)
+
+    async def acorrect(self, reserved: float, actual: float):
+        """异步修正 TPM 桶"""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.correct, reserved, actual)
+        else:
+            self.correct(reserved, actual)
+
+    @property
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> Dict:
+        """排队深度和各桶当前余量"""
+        result = {"queue_depth": self.queue_depth}
+        if self.rpm_bucket is not None:
+            result["rpm_available"] = self.backend.peek(self.rpm_bucket)
+        if self.tpm_bucket is not None:
+            result["tpm_available"] = self.backend.peek(self.tpm_bucket)
+        return result
+
+
+def estimate_request_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """估算请求占用的 token 数（提示词估算值 + 输出上限）"""
+    return TokenCounter.count_messages_tokens(messages) + (max_tokens or 0)
+
+
+def _usage_total(usage: Optional[Dict]) -> Optional[int]:
+    usage = usage or {}
+    total = usage.get("total_tokens")
+    if total is None and "prompt_tokens" in usage:
+        total = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return total
+
+
+class RateLimitedLLMClient(DelegatingLLMClient):
+    """带 RPM/TPM 限流的客户端"""
+
+    def __init__(self, client: BaseLLMClient, limiter: RateLimiter):
+        super().__init__(client)
+        self.limiter = limiter
+
+    def _settle(self, reserved: float, response: LLMResponse):
+        actual = _usage_total(response.usage)
+        if actual is not None:
+            self.limiter.correct(reserved, actual)
+
+    def _refund(self, reserved: float):
+        """调用失败时退还预留的 TPM 额度"""
+        self.limiter.correct(reserved, 0)
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        reserved = self.limiter.acquire(estimate_request_tokens(messages, max_tokens))
+        try:
+            response = self.client.chat(messages, temperature, max_tokens, **kwargs)
+        except BaseException:
+            self._refund(reserved)
+            raise
+        self._settle(reserved, response)
+        return response
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        reserved = await self.limiter.aacquire(estimate_request_tokens(messages, max_tokens))
+        try:
+            response = await self.client.achat(messages, temperature, max_tokens, **kwargs)
+        except BaseException:
+            await self.limiter.acorrect(reserved, 0)
+            raise
+        actual = _usage_total(response.usage)
+        if actual is not None:
+            await self.limiter.acorrect(reserved, actual)
+        return response
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        """流式聊天：流结束后按上游返回的 usage 修正预留额度
+
+        没有 usage 时按提示词估算值加输出估算值修正：解码后的流按已输出文本估算，
+        raw_stream 按透传的 SSE 事件数估算（每个事件约一个 token）。
+        """
+        reserved = self.limiter.acquire(estimate_request_tokens(messages, max_tokens))
+        info = kwargs.get("stream_info")
+        if info is None:
+            info = kwargs["stream_info"] = StreamInfo()
+        raw = kwargs.get("raw_stream", False)
+        tap = SSEUsageTap() if raw else None
+        output: List[str] = []
+        try:
+            for chunk in self.client.stream_chat(messages, temperature, max_tokens, **kwargs):
+                if raw:
+                    tap.feed(chunk)
+                else:
+                    output.append(chunk)
+                yield chunk
+        finally:
+            if raw:
+                tap.close()
+            actual = _usage_total(info.usage or (tap.usage if raw else None))
+            if actual is None:
+                completion = tap.events if raw else TokenCounter.estimate_tokens("".join(output))
+                actual = TokenCounter.count_messages_tokens(messages) + completion
+            self.limiter.correct(reserved, actual)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_name(provider: str, api_key: str) -> str:
+    """限流器名称（API Key 只保留哈希前缀）"""
+    digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+    return f"{provider}:{digest}"
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """获取全局限流存储（按应用配置延迟创建）"""
+    global _backend
+    with _limiters_lock:
+        if _backend is None:
+            from config import config as app_config
+            from .rate_limit_backends import create_rate_limit_backend
+            _backend = create_rate_limit_backend(
+                app_config.llm_rate_limit_backend,
+                path=app_config.llm_rate_limit_sqlite_path,
+                url=app_config.llm_rate_limit_redis_url
+            )
+        return _backend
+
+
+def get_rate_limiter(provider: str, api_key: str, **kwargs) -> RateLimiter:
+    """获取或创建 (provider, API Key) 的全局限流器（默认使用全局限流存储）"""
+    name = limiter_name(provider, api_key)
+    if "backend" not in kwargs:
+        kwargs["backend"] = get_rate_limit_backend()
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = RateLimiter(name, **kwargs)
+        return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict]:
+    """全部限流器状态"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+__all__ = [
+    "RateLimitTimeout",
+    "BucketSpec",
+    "RateLimitBackend",
+    "MemoryRateLimitBackend",
+    "RateLimiter",
+    "RateLimitedLLMClient",
+    "estimate_request_tokens",
+    "limiter_name",
+    "get_rate_limit_backend",
+    "get_rate_limiter",
+    "rate_limiter_stats",
+]
@@ -0,0 +1,300 @@
+"""LLM响应缓存模块
+
+对完全相同的请求（provider、model、messages、temperature、max_tokens 及其它
+请求参数）直接返回缓存结果，避免重复调用 Provider。
+
+- 内存层：LRU，带过期时间
+- 磁盘层（可选）：SQLite，进程重启后仍可命中
+- 只对确定性设置（低温度）自动启用，单次请求可通过 cache=False 绕过
+"""
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse
+from utils.metrics import default_metrics
+
+
+def _normalize_message(message: Dict) -> Dict:
+    """规范化消息：统一换行并去除首尾空白，其它字段保持不变"""
+    normalized = dict(message)
+    content = normalized.get("content")
+    if isinstance(content, str):
+        normalized["content"] = content.replace("\r\n", "\n").strip()
+    return normalized
+
+
+def make_request_key(
+    provider: str,
+    model: str,
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: int,
+    **params
+) -> str:
+    """计算请求的规范化哈希键"""
+    canonical = {
+        "provider": provider,
+        "model": model,
+        "messages": [_normalize_message(m) for m in messages],
+        "temperature": round(float(temperature), 4),
+        "max_tokens": max_tokens,
+        "params": params,
+    }
+    data = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _dump_response(response: LLMResponse) -> str:
+    return json.dumps({
+        "content": response.content,
+        "model": response.model,
+        "usage": response.usage,
+        "raw_response": response.raw_response,
+        "finish_reason": response.finish_reason,
+    }, ensure_ascii=False, default=str)
+
+
+def _load_response(data: str) -> LLMResponse:
+    return LLMResponse(cached=True, **json.loads(data))
+
+
+class ResponseCache:
+    """两级LLM响应缓存
+
+    Args:
+        max_entries: 内存层最大条目数
+        default_ttl: 默认过期时间（秒）
+        scenario_ttls: 各场景的过期时间
+        disk_path: SQLite 文件路径（为空则不启用磁盘层）
+        max_temperature: 自动启用缓存的最高温度
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: int = 3600,
+        scenario_ttls: Optional[Dict[str, int]] = None,
+        disk_path: Optional[str] = None,
+        max_temperature: float = 0.3
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.scenario_ttls = scenario_ttls or {}
+        self.max_temperature = max_temperature
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_tokens = 0
+
+        self._disk = None
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expire_at REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+    def ttl_for(self, scenario: Optional[str]) -> int:
+        """获取场景的过期时间"""
+        return self.scenario_ttls.get(scenario, self.default_ttl)
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """是否为确定性设置"""
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """读取缓存（先内存后磁盘，磁盘命中会回填内存）"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expire_at = entry
+                if expire_at > now:
+                    self._memory.move_to_end(key)
+                    return _load_response(value)
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expire_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expire_at = row
+                    if expire_at > now:
+                        self._put_memory(key, value, expire_at)
+                        return _load_response(value)
+                    self._disk.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._disk.commit()
+        return None
+
+    def _put_memory(self, key: str, value: str, expire_at: float):
+        self._memory[key] = (value, expire_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set(self, key: str, response: LLMResponse, ttl: Optional[int] = None):
+        """写入缓存"""
+        value = _dump_response(response)
+        expire_at = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            self._put_memory(key, value, expire_at)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expire_at) VALUES (?, ?, ?)",
+                    (key, value, expire_at)
+                )
+                self._disk.commit()
+
+    def delete(self, key: str):
+        """删除缓存"""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._disk.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+                self._disk.commit()
+
+    def record(self, hit: bool, saved_tokens: int = 0):
+        """记录命中统计"""
+        with self._lock:
+            if hit:
+                self._hits += 1
+                self._saved_tokens += saved_tokens
+            else:
+                self._misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else 0.0,
+            "saved_tokens": self._saved_tokens,
+            "memory_entries": len(self._memory),
+        }
+
+
+class CachedLLMClient(DelegatingLLMClient):
+    """带响应缓存的客户端
+
+    chat() 的额外参数：
+        cache: True 强制使用缓存，False 绕过缓存，None（默认）按温度自动判断
+    """
+
+    def __init__(self, client: BaseLLMClient, cache: ResponseCache, scenario: Optional[str] = None):
+        super().__init__(client)
+        self.cache = cache
+        self.scenario = scenario
+
+    def _lookup(self, messages: List[Dict], temperature: float, max_tokens: int, kwargs: Dict):
+        """查缓存，返回 (命中的响应, 缓存键, 场景)；不使用缓存时键为 None"""
+        use_cache = kwargs.pop("cache", None)
+        scenario = kwargs.pop("scenario", None) or self.scenario
+        if use_cache is None:
+            use_cache = self.cache.is_cacheable(temperature)
+
+        labels = {"provider": self.provider_name, "scenario": scenario or "default"}
+        if not use_cache:
+            default_metrics.inc("llm_cache_bypass", **labels)
+            return None, None, scenario
+
+        key = make_request_key(
+            self.provider_name,
+            self.model,
+            messages,
+            temperature,
+            max_tokens,
+            **self.strip_control_params(kwargs)
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            saved = int((cached.usage or {}).get("total_tokens", 0))
+            self.cache.record(hit=True, saved_tokens=saved)
+            default_metrics.inc("llm_cache_hits", **labels)
+            default_metrics.inc("llm_cache_saved_tokens", saved, **labels)
+            return cached, key, scenario
+
+        self.cache.record(hit=False)
+        default_metrics.inc("llm_cache_misses", **labels)
+        return None, key, scenario
+
+    def _store(self, key: str, scenario: Optional[str], response: LLMResponse):
+        # 被截断或空的响应不缓存；json_complete 只截掉了对象之后的说明文字，结果完整
+        if response.content and response.finish_reason in (None, "stop", "json_complete"):
+            self.cache.set(key, response, ttl=self.cache.ttl_for(scenario))
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        cached, key, scenario = self._lookup(messages, temperature, max_tokens, kwargs)
+        if cached is not None:
+            return cached
+
+        response = self.client.chat(messages, temperature, max_tokens, **kwargs)
+        if key is not None:
+            self._store(key, scenario, response)
+        return response
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        cached, key, scenario = self._lookup(messages, temperature, max_tokens, kwargs)
+        if cached is not None:
+            return cached
+
+        response = await self.client.achat(messages, temperature, max_tokens, **kwargs)
+        if key is not None:
+            self._store(key, scenario, response)
+        return response
+
+    def stream_chat(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 2048, **kwargs):
+        kwargs.pop("cache", None)
+        return self.client.stream_chat(messages, temperature, max_tokens, **kwargs)
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取全局响应缓存（按应用配置延迟创建）"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                from config import config as app_config, SCENARIO_CACHE_TTLS
+                _response_cache = ResponseCache(
+                    max_entries=app_config.llm_cache_max_entries,
+                    default_ttl=app_config.cache_ttl,
+                    scenario_ttls=SCENARIO_CACHE_TTLS,
+                    disk_path=app_config.llm_cache_disk_path,
+                    max_temperature=app_config.llm_cache_max_temperature,
+                )
+    return _response_cache
+
+
+__all__ = ["ResponseCache", "CachedLLMClient", "make_request_key", "get_response_cache"]
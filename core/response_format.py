@@ -0,0 +1,50 @@
+"""结构化输出格式模块
+
+OpenAI 兼容接口通过 response_format 约束输出：
+- json_object：JSON 模式，保证输出是合法的 JSON 对象（提示词中需要出现 "json"）
+- json_schema：按给定 JSON Schema 约束输出结构（strict 时字段和类型都严格匹配）
+
+各 Provider/模型的支持情况不同（见 config.RESPONSE_FORMAT_SUPPORT），请求的格式会按
+目标模型的能力降级：json_schema → json_object → 不传，避免不支持的参数导致请求失败。
+"""
+from typing import Dict, Optional
+
+JSON_OBJECT = "json_object"
+JSON_SCHEMA = "json_schema"
+
+# 能力等级，数值越大约束越强
+_LEVELS = {None: 0, JSON_OBJECT: 1, JSON_SCHEMA: 2}
+
+
+def json_schema_format(name: str, schema: Dict, strict: bool = True) -> Dict:
+    """构造 json_schema 类型的 response_format"""
+    return {
+        "type": JSON_SCHEMA,
+        "json_schema": {"name": name, "schema": schema, "strict": strict},
+    }
+
+
+def adapt_response_format(response_format: Optional[Dict], supported: Optional[str]) -> Optional[Dict]:
+    """按模型支持的最高格式调整 response_format
+
+    Args:
+        response_format: 请求的格式
+        supported: 模型支持的最高格式（json_schema / json_object / None）
+
+    Returns:
+        调整后的格式；模型不支持任何结构化输出时返回 None（不传该参数）
+    """
+    if not response_format:
+        return None
+    requested = response_format.get("type")
+    if requested not in (JSON_OBJECT, JSON_SCHEMA):
+        return response_format
+    level = min(_LEVELS[requested], _LEVELS.get(supported, 0))
+    if level == _LEVELS[requested]:
+        return response_format
+    if level == _LEVELS[JSON_OBJECT]:
+        return {"type": JSON_OBJECT}
+    return None
+
+
+__all__ = ["JSON_OBJECT", "JSON_SCHEMA", "json_schema_format", "adapt_response_format"]
@@ -0,0 +1,275 @@
+"""重试策略模块
+
+所有 Provider 调用共用的重试引擎：
+
+- 错误分类：只重试 429、5xx、超时和连接错误，4xx 等请求错误直接抛出
+- 退避：优先使用响应的 Retry-After，否则为全抖动指数退避
+  （在 [0, min(max_delay, base_delay * 2^n)] 内均匀随机）
+- 截止时间：剩余时间不足以等待下一次重试时不再重试
+- 重试预算：全局令牌桶，每个请求积累 ratio 个令牌，每次重试消耗一个，
+  Provider 大面积故障时限制重试放大的流量
+- 异步路径使用 asyncio.sleep，不阻塞事件循环
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Generator, List, Optional, TypeVar
+from .errors import CONNECTION, RATE_LIMIT, SERVER, TIMEOUT, classify_error
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse
+from utils.logger import default_logger
+from utils.metrics import default_metrics
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = frozenset({RATE_LIMIT, SERVER, TIMEOUT, CONNECTION})
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """解析异常响应中的 Retry-After（秒数或 HTTP 日期）"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """全局重试预算
+
+    Args:
+        ratio: 重试请求占原始请求的比例上限
+        min_tokens: 初始令牌数（低流量时允许的少量重试）
+        max_tokens: 令牌上限
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class RetryPolicy:
+    """重试策略
+
+    Args:
+        max_retries: 最大重试次数（不含首次请求）
+        base_delay: 退避基数（秒）
+        max_delay: 单次退避上限（秒）
+        budget: 重试预算（默认使用全局预算）
+        retry_on: 可重试的错误类别
+        name: 指标标签
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        budget: Optional[RetryBudget] = None,
+        retry_on: frozenset = RETRYABLE_ERRORS,
+        name: str = "default"
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or get_retry_budget()
+        self.retry_on = retry_on
+        self.name = name
+        self._rng = random.Random()
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """第 attempt 次重试前的等待时间（秒）"""
+        if error is not None:
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                return retry_after
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return self._rng.uniform(0, cap)
+
+    def next_delay(self, attempt: int, error: BaseException, deadline: Optional[float] = None) -> Optional[float]:
+        """判断是否重试，返回等待时间；不重试返回 None
+
+        Args:
+            attempt: 已重试次数
+            error: 本次失败的异常
+            deadline: 截止时间（time.monotonic() 时间戳）
+        """
+        kind = classify_error(error)
+        if kind not in self.retry_on or getattr(error, "retryable", True) is False:
+            return None
+        if attempt >= self.max_retries:
+            default_metrics.inc("llm_retry_giveups", policy=self.name, reason="max_retries")
+            return None
+
+        delay = self.backoff(attempt, error)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            default_metrics.inc("llm_retry_giveups", policy=self.name, reason="deadline")
+            return None
+        if not self.budget.try_acquire():
+            default_metrics.inc("llm_retry_budget_exhausted", policy=self.name)
+            return None
+
+        default_metrics.inc("llm_retries", policy=self.name, reason=kind)
+        default_logger.warning(
+            f"Retrying {self.name} in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}, {kind}): {error}"
+        )
+        return delay
+
+    def call(self, fn: Callable[[], T], deadline: Optional[float] = None) -> T:
+        """同步执行，失败时按策略重试"""
+        self.budget.on_request()
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                delay = self.next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """异步执行，退避期间不阻塞事件循环"""
+        self.budget.on_request()
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self.next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+_retry_budget: Optional[RetryBudget] = None
+_retry_budget_lock = threading.Lock()
+
+
+def get_retry_budget() -> RetryBudget:
+    """获取全局重试预算（按应用配置延迟创建）"""
+    global _retry_budget
+    if _retry_budget is None:
+        with _retry_budget_lock:
+            if _retry_budget is None:
+                from config import config as app_config
+                _retry_budget = RetryBudget(ratio=app_config.retry_budget_ratio)
+    return _retry_budget
+
+
+class RetryingLLMClient(DelegatingLLMClient):
+    """带重试的客户端
+
+    chat()/achat()/stream_chat() 的额外参数：
+        deadline: 请求截止时间（time.monotonic() 时间戳），默认按策略的 deadline_seconds 计算
+
+    Args:
+        client: 内部客户端
+        policy: 重试策略
+        deadline_seconds: 默认请求截止时长（秒），为空不限制
+    """
+
+    def __init__(
+        self,
+        client: BaseLLMClient,
+        policy: Optional[RetryPolicy] = None,
+        deadline_seconds: Optional[float] = None
+    ):
+        super().__init__(client)
+        self.policy = policy or RetryPolicy(name=f"{client.provider_name}/{client.model}")
+        self.deadline_seconds = deadline_seconds
+
+    def _deadline(self, kwargs: Dict) -> Optional[float]:
+        deadline = kwargs.pop("deadline", None)
+        if deadline is None and self.deadline_seconds:
+            deadline = time.monotonic() + self.deadline_seconds
+        return deadline
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        deadline = self._deadline(kwargs)
+        return self.policy.call(
+            lambda: self.client.chat(messages, temperature, max_tokens, **kwargs), deadline
+        )
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        deadline = self._deadline(kwargs)
+        return await self.policy.acall(
+            lambda: self.client.achat(messages, temperature, max_tokens, **kwargs), deadline
+        )
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        """流式聊天：只在首个片段之前重试，已输出内容后的错误直接抛出"""
+        deadline = self._deadline(kwargs)
+        self.policy.budget.on_request()
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self.client.stream_chat(messages, temperature, max_tokens, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else self.policy.next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+
+__all__ = [
+    "RETRYABLE_ERRORS",
+    "retry_after_seconds",
+    "RetryBudget",
+    "RetryPolicy",
+    "RetryingLLMClient",
+    "get_retry_budget",
+]
@@ -0,0 +1,348 @@
+"""多Provider路由模块
+
+在一组 (provider, model) 目标之间按健康评分分配请求：
+
+- 时延、首token时延（TTFT）、错误率均为指数滑动平均（EWMA）
+- 各维度按目标间最大值归一化后加权求和，得分越低越优先
+- 尚无观测数据的维度按已观测目标的最小值估计，保证新目标能被尝试
+- 同一会话在目标健康时固定路由到同一目标（sticky），保持上下文风格一致
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Dict, Generator, List, Optional, Tuple
+from .llm_client import BaseLLMClient, LLMResponse
+from utils.metrics import default_metrics
+
+
+@dataclass
+class RouteTarget:
+    """路由目标
+
+    Args:
+        provider: 提供商
+        model: 模型名称
+        cost: 相对成本（如每千token单价，只用于目标间比较）
+        client: 已创建的客户端（为空则按 provider/model 通过工厂创建）
+    """
+    provider: str
+    model: str
+    cost: float = 1.0
+    client: Optional[BaseLLMClient] = field(default=None, repr=False, compare=False)
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+@dataclass
+class RouterWeights:
+    """评分权重"""
+    latency: float = 1.0
+    error_rate: float = 2.0
+    ttft: float = 0.5
+    cost: float = 0.3
+
+    @classmethod
+    def parse(cls, text: str) -> "RouterWeights":
+        """从 "latency=1,error_rate=2" 形式的字符串解析，未指定的项使用默认值"""
+        weights = cls()
+        names = {f.name for f in fields(cls)}
+        for item in (text or "").split(","):
+            if "=" not in item:
+                continue
+            key, value = (part.strip() for part in item.split("=", 1))
+            if key in names:
+                setattr(weights, key, float(value))
+        return weights
+
+
+class TargetHealth:
+    """目标健康统计"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency_ms: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else self.alpha * value + (1 - self.alpha) * current
+
+    def record_success(self, latency_ms: float, ttft_ms: Optional[float] = None):
+        self.requests += 1
+        self.latency_ms = self._ewma(self.latency_ms, latency_ms)
+        if ttft_ms is not None:
+            self.ttft_ms = self._ewma(self.ttft_ms, ttft_ms)
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+
+    def record_failure(self):
+        self.requests += 1
+        self.errors += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+
+
+class RouterLLMClient(BaseLLMClient):
+    """延迟感知的多Provider路由客户端
+
+    chat()/stream_chat() 的额外参数：
+        session_id: 会话ID，同一会话优先路由到同一目标
+
+    Args:
+        targets: 路由目标列表
+        weights: 评分权重
+        alpha: EWMA 平滑系数
+        sticky_ttl: 会话粘滞时长（秒）
+        max_sessions: 最多记录的会话数
+        unhealthy_error_rate: 错误率超过该值时会话不再粘滞在该目标上
+        explore_ratio: 随机选择非最优目标的概率（用于刷新其它目标的统计）
+        name: 路由名称（用于指标标签）
+    """
+
+    def __init__(
+        self,
+        targets: List[RouteTarget],
+        weights: Optional[RouterWeights] = None,
+        alpha: float = 0.3,
+        sticky_ttl: int = 1800,
+        max_sessions: int = 10000,
+        unhealthy_error_rate: float = 0.5,
+        explore_ratio: float = 0.0,
+        name: str = "router"
+    ):
+        if not targets:
+            raise ValueError("RouterLLMClient requires at least one target")
+        super().__init__(model=targets[0].model, api_key="")
+        self._provider = "router"
+        self.targets = targets
+        self.weights = weights or RouterWeights()
+        self.sticky_ttl = sticky_ttl
+        self.max_sessions = max_sessions
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.explore_ratio = explore_ratio
+        self.name = name
+        self._health = [TargetHealth(alpha) for _ in targets]
+        self._sessions: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    def _client(self, index: int) -> BaseLLMClient:
+        target = self.targets[index]
+        if target.client is None:
+            from .llm_client import LLMFactory
+            target.client = LLMFactory.create(target.provider, target.model)
+        return target.client
+
+    @staticmethod
+    def _normalize(values: List[Optional[float]]) -> List[float]:
+        """按最大值归一化到 [0, 1]，缺失值按已观测的最小值估计"""
+        observed = [v for v in values if v is not None]
+        if not observed:
+            return [0.0] * len(values)
+        low, high = min(observed), max(observed)
+        if high <= 0:
+            return [0.0] * len(values)
+        return [(low if v is None else v) / high for v in values]
+
+    def _scores(self) -> List[float]:
+        health = self._health
+        latency = self._normalize([h.latency_ms for h in health])
+        ttft = self._normalize([h.ttft_ms for h in health])
+        cost = self._normalize([t.cost for t in self.targets])
+        w = self.weights
+        return [
+            w.latency * latency[i] + w.ttft * ttft[i] + w.error_rate * health[i].error_rate + w.cost * cost[i]
+            for i in range(len(self.targets))
+        ]
+
+    def select(self, session_id: Optional[str] = None, exclude: Tuple[int, ...] = ()) -> int:
+        """选择目标，返回目标下标"""
+        now = time.time()
+        with self._lock:
+            if session_id:
+                sticky = self._sessions.get(session_id)
+                if sticky is not None:
+                    index, expire_at = sticky
+                    healthy = self._health[index].error_rate < self.unhealthy_error_rate and not self._is_open(index)
+                    if expire_at > now and healthy and index not in exclude:
+                        self._sessions.move_to_end(session_id)
+                        self._sessions[session_id] = (index, now + self.sticky_ttl)
+                        return index
+
+            scores = self._scores()
+            candidates = [i for i in range(len(self.targets)) if i not in exclude] or list(range(len(self.targets)))
+            # 熔断打开的目标不参与选择（全部打开时保留原候选，由熔断器快速失败）
+            candidates = [i for i in candidates if not self._is_open(i)] or candidates
+            index = min(candidates, key=lambda i: (scores[i], self._health[i].in_flight))
+            if len(candidates) > 1 and self._rng.random() < self.explore_ratio:
+                index = self._rng.choice([i for i in candidates if i != index])
+
+            if session_id:
+                self._sessions[session_id] = (index, now + self.sticky_ttl)
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return index
+
+    def _begin(self, index: int):
+        with self._lock:
+            self._health[index].in_flight += 1
+        default_metrics.inc("llm_router_requests", router=self.name, target=self.targets[index].name)
+
+    def _finish(self, index: int, start: float, ttft: Optional[float] = None, error: bool = False):
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            health = self._health[index]
+            health.in_flight -= 1
+            if error:
+                health.record_failure()
+            else:
+                health.record_success(latency_ms, None if ttft is None else (ttft - start) * 1000)
+        if error:
+            default_metrics.inc("llm_router_errors", router=self.name, target=self.targets[index].name)
+
+    def _is_open(self, index: int) -> bool:
+        """目标的熔断器是否打开（目标客户端带熔断包装时）"""
+        breaker = getattr(self.targets[index].client, "breaker", None)
+        return breaker is not None and breaker.state == "open"
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        session_id = kwargs.pop("session_id", None)
+        tried: Tuple[int, ...] = ()
+        while True:
+            index = self.select(session_id, exclude=tried)
+            self._begin(index)
+            start = time.perf_counter()
+            try:
+                response = self._client(index).chat(messages, temperature, max_tokens, **kwargs)
+            except Exception as e:
+                self._finish(index, start, error=True)
+                tried += (index,)
+                if self._can_skip(e, tried):
+                    continue
+                raise
+            self._finish(index, start)
+            return response
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        session_id = kwargs.pop("session_id", None)
+        tried: Tuple[int, ...] = ()
+        while True:
+            index = self.select(session_id, exclude=tried)
+            self._begin(index)
+            start = time.perf_counter()
+            try:
+                response = await self._client(index).achat(messages, temperature, max_tokens, **kwargs)
+            except Exception as e:
+                self._finish(index, start, error=True)
+                tried += (index,)
+                if self._can_skip(e, tried):
+                    continue
+                raise
+            self._finish(index, start)
+            return response
+
+    def _can_skip(self, error: Exception, tried: Tuple[int, ...]) -> bool:
+        """熔断拒绝的请求立即换其它目标（未实际发出，不增加 Provider 负载）"""
+        from .circuit_breaker import CircuitOpenError
+        return isinstance(error, CircuitOpenError) and len(tried) < len(self.targets)
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        index = self.select(kwargs.pop("session_id", None))
+        self._begin(index)
+        start = time.perf_counter()
+        first_chunk_at = None
+        try:
+            for chunk in self._client(index).stream_chat(messages, temperature, max_tokens, **kwargs):
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                yield chunk
+        except Exception:
+            self._finish(index, start, error=True)
+            raise
+        except GeneratorExit:
+            # 调用方提前关闭流，不计入错误
+            self._finish(index, start, ttft=first_chunk_at)
+            raise
+        self._finish(index, start, ttft=first_chunk_at)
+
+    def scores(self) -> List[Dict]:
+        """各目标的实时评分和健康统计（得分越低越优先）"""
+        with self._lock:
+            scores = self._scores()
+            return [
+                {
+                    "target": target.name,
+                    "provider": target.provider,
+                    "model": target.model,
+                    "score": round(scores[i], 4),
+                    "latency_ms": health.latency_ms,
+                    "ttft_ms": health.ttft_ms,
+                    "error_rate": round(health.error_rate, 4),
+                    "cost": target.cost,
+                    "requests": health.requests,
+                    "errors": health.errors,
+                    "in_flight": health.in_flight,
+                }
+                for i, (target, health) in enumerate(zip(self.targets, self._health))
+            ]
+
+
+_routers: Dict[str, RouterLLMClient] = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(name: str, targets: List[RouteTarget], **kwargs) -> RouterLLMClient:
+    """获取或创建命名路由（同名路由共享健康统计）"""
+    with _routers_lock:
+        router = _routers.get(name)
+        if router is None:
+            router = _routers[name] = RouterLLMClient(targets, name=name, **kwargs)
+        return router
+
+
+def find_router(name: str) -> Optional[RouterLLMClient]:
+    """获取已创建的命名路由（不存在时返回 None）"""
+    with _routers_lock:
+        return _routers.get(name)
+
+
+def router_scores() -> Dict[str, List[Dict]]:
+    """全部命名路由的实时评分"""
+    with _routers_lock:
+        routers = dict(_routers)
+    return {name: router.scores() for name, router in routers.items()}
+
+
+__all__ = [
+    "RouteTarget",
+    "RouterWeights",
+    "TargetHealth",
+    "RouterLLMClient",
+    "get_router",
+    "find_router",
+    "router_scores",
+]
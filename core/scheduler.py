@@ -0,0 +1,330 @@
+"""优先级调度模块
+
+交互式对话和批量工单/合同审核共用同一份 Provider 并发容量。调度器在客户端之前
+限制同时在途的调用数，排队的调用按优先级类别调度：
+
+- 加权公平排队（WFQ）：每个排队请求带虚拟完成时间 max(V, 类别上次完成时间) + 1/weight，
+  空出名额时取虚拟时间最小的请求，各类别按权重比例分享容量，低权重类别也不会饿死
+- 抢占：preempt 类别（如 interactive）有请求排队时，插到其它类别的排队请求之前，
+  但最多领先 preempt_window 个虚拟时间单位：持续的抢占流量使其虚拟时间超出窗口后，
+  落后的类别照常按 WFQ 调度，因此抢占不会让低权重类别饿死；已经在途的调用不会被打断
+- 名额在释放时直接交给选中的排队者，不存在唤醒后再竞争的问题
+
+各类别的排队等待时间记录在 llm_scheduler_wait_ms 分布指标中。
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Generator, List, Optional
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse
+from utils.metrics import default_metrics
+
+
+class SchedulerQueueTimeout(TimeoutError):
+    """排队超时（按 429 处理，可触发降级）"""
+
+    status_code = 429
+
+
+@dataclass
+class PriorityClass:
+    """优先级类别
+
+    Attributes:
+        name: 类别名称
+        weight: WFQ 权重，越大分到的容量越多
+        preempt: 是否插到非抢占类别的排队请求之前
+    """
+    name: str
+    weight: float = 1.0
+    preempt: bool = False
+
+
+class _Waiter:
+    """排队者；名额由释放方直接移交"""
+
+    def __init__(self, cls: str, tag: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.cls = cls
+        self.tag = tag
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.event = threading.Event()
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+
+    def grant(self):
+        self.granted = True
+        if self.future is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class PriorityScheduler:
+    """按优先级类别调度的并发闸门
+
+    Args:
+        capacity: 同时在途的调用数上限
+        classes: 优先级类别
+        default_class: 未知类别的调用归入的类别
+        queue_timeout: 最长排队时间（秒，为空一直等待）
+        preempt_window: 抢占类别最多领先的虚拟时间（权重为 1 的类别每个请求占 1 个单位）
+        name: 指标标签
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        classes: List[PriorityClass],
+        default_class: str = "standard",
+        queue_timeout: Optional[float] = None,
+        preempt_window: float = 4.0,
+        name: str = "default"
+    ):
+        if capacity < 1:
+            raise ValueError("Scheduler capacity must be at least 1")
+        self.capacity = capacity
+        self.classes = {c.name: c for c in classes}
+        if default_class not in self.classes:
+            raise ValueError(f"Default priority class '{default_class}' is not configured")
+        self.default_class = default_class
+        self.queue_timeout = queue_timeout
+        self.preempt_window = preempt_window
+        self.name = name
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {c: 0.0 for c in self.classes}
+        self._queues: Dict[str, Deque[_Waiter]] = {c: deque() for c in self.classes}
+        self._dispatched: Dict[str, int] = {c: 0 for c in self.classes}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def resolve(self, cls: Optional[str]) -> str:
+        return cls if cls in self.classes else self.default_class
+
+    def queued(self, cls: Optional[str] = None) -> int:
+        if cls is not None:
+            return len(self._queues[cls])
+        return sum(len(q) for q in self._queues.values())
+
+    def _publish(self):
+        default_metrics.set_gauge("llm_scheduler_in_flight", self._in_flight, scheduler=self.name)
+        for cls, queue in self._queues.items():
+            default_metrics.set_gauge("llm_scheduler_queue", len(queue), scheduler=self.name, priority=cls)
+
+    def _record(self, cls: str, wait: float):
+        self._dispatched[cls] += 1
+        default_metrics.observe("llm_scheduler_wait_ms", wait * 1000, scheduler=self.name, priority=cls)
+
+    def _enqueue(self, cls: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """有空闲名额且无人排队时直接占用并返回 None，否则登记为排队者"""
+        if self._in_flight < self.capacity and not self.queued():
+            self._in_flight += 1
+            self._record(cls, 0.0)
+            self._publish()
+            return None
+        tag = max(self._virtual_time, self._last_tag[cls]) + 1.0 / self.classes[cls].weight
+        self._last_tag[cls] = tag
+        waiter = _Waiter(cls, tag, loop)
+        self._queues[cls].append(waiter)
+        self._publish()
+        return waiter
+
+    def _next(self) -> Optional[_Waiter]:
+        heads = [q[0] for q in self._queues.values() if q]
+        if not heads:
+            return None
+        fair = min(heads, key=lambda w: w.tag)
+        preempting = [w for w in heads if self.classes[w.cls].preempt]
+        if not preempting:
+            return fair
+        first = min(preempting, key=lambda w: w.tag)
+        # 抢占类别领先太多时让位给按 WFQ 应当先调度的请求
+        return first if first.tag - fair.tag <= self.preempt_window else fair
+
+    def _dispatch(self):
+        while self._in_flight < self.capacity:
+            waiter = self._next()
+            if waiter is None:
+                break
+            self._queues[waiter.cls].popleft()
+            self._virtual_time = max(self._virtual_time, waiter.tag)
+            self._in_flight += 1
+            self._record(waiter.cls, time.monotonic() - waiter.enqueued_at)
+            waiter.grant()
+        self._publish()
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """放弃排队；返回 False 表示名额已经移交（调用方已持有名额）"""
+        if waiter.granted:
+            return False
+        self._queues[waiter.cls].remove(waiter)
+        default_metrics.inc("llm_scheduler_timeouts", scheduler=self.name, priority=waiter.cls)
+        self._publish()
+        return True
+
+    def _timeout_error(self, cls: str) -> SchedulerQueueTimeout:
+        return SchedulerQueueTimeout(
+            f"Queued '{cls}' call on scheduler '{self.name}' exceeded {self.queue_timeout}s"
+        )
+
+    def acquire(self, cls: Optional[str] = None) -> str:
+        """获取名额（排队直到被调度），返回实际使用的类别"""
+        cls = self.resolve(cls)
+        with self._lock:
+            waiter = self._enqueue(cls)
+        if waiter is None or waiter.event.wait(self.queue_timeout):
+            return cls
+        with self._lock:
+            if self._abandon(waiter):
+                raise self._timeout_error(cls)
+        return cls
+
+    async def aacquire(self, cls: Optional[str] = None) -> str:
+        """异步获取名额，排队期间不阻塞事件循环"""
+        cls = self.resolve(cls)
+        with self._lock:
+            waiter = self._enqueue(cls, asyncio.get_running_loop())
+        if waiter is None:
+            return cls
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            return cls
+        except asyncio.TimeoutError:
+            with self._lock:
+                if self._abandon(waiter):
+                    raise self._timeout_error(cls)
+            return cls
+        except asyncio.CancelledError:
+            with self._lock:
+                if not self._abandon(waiter):
+                    self._release_locked()
+            raise
+
+    def _release_locked(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def release(self):
+        """归还名额，并移交给下一个排队者"""
+        with self._lock:
+            self._release_locked()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            classes = {
+                cls: {
+                    "weight": self.classes[cls].weight,
+                    "preempt": self.classes[cls].preempt,
+                    "queued": len(self._queues[cls]),
+                    "dispatched": self._dispatched[cls],
+                }
+                for cls in self.classes
+            }
+            in_flight = self._in_flight
+        for cls, item in classes.items():
+            wait = default_metrics.get_timing("llm_scheduler_wait_ms", scheduler=self.name, priority=cls)
+            item["wait_ms"] = {"avg": wait["avg"], "p50": wait["p50"], "p99": wait["p99"], "max": wait["max"]}
+        return {"capacity": self.capacity, "in_flight": in_flight, "classes": classes}
+
+
+class ScheduledLLMClient(DelegatingLLMClient):
+    """经过优先级调度的客户端
+
+    chat()/achat()/stream_chat() 的额外参数：
+        priority: 本次调用的优先级类别，默认使用场景的类别
+
+    Args:
+        client: 内部客户端
+        scheduler: 调度器
+        priority: 默认优先级类别
+    """
+
+    def __init__(self, client: BaseLLMClient, scheduler: PriorityScheduler, priority: Optional[str] = None):
+        super().__init__(client)
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        self.scheduler.acquire(kwargs.pop("priority", self.priority))
+        try:
+            return self.client.chat(messages, temperature, max_tokens, **kwargs)
+        finally:
+            self.scheduler.release()
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        await self.scheduler.aacquire(kwargs.pop("priority", self.priority))
+        try:
+            return await self.client.achat(messages, temperature, max_tokens, **kwargs)
+        finally:
+            self.scheduler.release()
+
+    def stream_chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> Generator[str, None, None]:
+        """流式聊天：整个流期间占用名额"""
+        self.scheduler.acquire(kwargs.pop("priority", self.priority))
+        try:
+            yield from self.client.stream_chat(messages, temperature, max_tokens, **kwargs)
+        finally:
+            self.scheduler.release()
+
+
+_scheduler: Optional[PriorityScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PriorityScheduler:
+    """获取全局调度器（按应用配置延迟创建）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from config import PRIORITY_CLASSES, config as app_config
+                _scheduler = PriorityScheduler(
+                    capacity=app_config.llm_scheduler_capacity,
+                    classes=[PriorityClass(name=name, **spec) for name, spec in PRIORITY_CLASSES.items()],
+                    queue_timeout=app_config.llm_scheduler_queue_timeout,
+                    preempt_window=app_config.llm_scheduler_preempt_window
+                )
+    return _scheduler
+
+
+def scheduler_stats() -> Optional[Dict]:
+    """全局调度器状态（未启用时为空）"""
+    return _scheduler.stats() if _scheduler is not None else None
+
+
+__all__ = [
+    "SchedulerQueueTimeout",
+    "PriorityClass",
+    "PriorityScheduler",
+    "ScheduledLLMClient",
+    "get_scheduler",
+    "scheduler_stats",
+]
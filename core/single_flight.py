@@ -0,0 +1,170 @@
+"""请求合并（single-flight）模块
+
+同一时刻规范化键相同的请求只向 Provider 发起一次调用，其余请求等待并共享
+该调用的结果（或异常）。适用于大面积故障时大量相同工单、客户端重试等
+同时在途的重复请求。
+
+- 同步路径：按键登记 concurrent.futures.Future，跟随者阻塞等待
+- 异步路径：按事件循环和键登记 asyncio.Task，跟随者 await 同一任务
+"""
+import asyncio
+import dataclasses
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .llm_client import DelegatingLLMClient, BaseLLMClient, LLMResponse
+from .response_cache import make_request_key
+from utils.metrics import default_metrics
+
+
+class SingleFlight:
+    """同步/异步请求合并组"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行或加入同键调用
+
+        Returns:
+            (结果, 是否为合并的请求)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                future = self._calls[key] = Future()
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result(), False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """异步执行或加入同键调用
+
+        调用在独立任务中执行，单个等待方被取消不会影响其它等待方。
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            if task is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                task = self._tasks[loop_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget_task(loop_key, task))
+                self._leaders += 1
+                leader = True
+
+        return await asyncio.shield(task), not leader
+
+    def _forget_task(self, loop_key: Tuple[int, str], task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
+
+    def in_flight(self) -> int:
+        """在途调用数"""
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+    def stats(self) -> Dict[str, int]:
+        """合并统计"""
+        with self._lock:
+            return {
+                "upstream_calls": self._leaders,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+class SingleFlightLLMClient(DelegatingLLMClient):
+    """合并相同在途请求的客户端
+
+    chat()/achat() 的额外参数：
+        coalesce: False 时不参与合并（默认参与）
+    """
+
+    def __init__(self, client: BaseLLMClient, group: Optional[SingleFlight] = None):
+        super().__init__(client)
+        self.group = group or get_single_flight()
+
+    def _key(self, messages: List[Dict], temperature: float, max_tokens: int, kwargs: Dict) -> str:
+        return make_request_key(
+            self.provider_name,
+            self.model,
+            messages,
+            temperature,
+            max_tokens,
+            **self.strip_control_params(kwargs)
+        )
+
+    def _share(self, response: LLMResponse, coalesced: bool) -> LLMResponse:
+        if not coalesced:
+            return response
+        default_metrics.inc("llm_coalesced_requests", provider=self.provider_name)
+        # 每个等待方拿到独立的响应对象，避免相互修改
+        return dataclasses.replace(response)
+
+    def chat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        if not kwargs.pop("coalesce", True):
+            return self.client.chat(messages, temperature, max_tokens, **kwargs)
+
+        key = self._key(messages, temperature, max_tokens, kwargs)
+        response, coalesced = self.group.do(
+            key, lambda: self.client.chat(messages, temperature, max_tokens, **kwargs)
+        )
+        return self._share(response, coalesced)
+
+    async def achat(
+        self,
+        messages: List[Dict],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        **kwargs
+    ) -> LLMResponse:
+        if not kwargs.pop("coalesce", True):
+            return await self.client.achat(messages, temperature, max_tokens, **kwargs)
+
+        key = self._key(messages, temperature, max_tokens, kwargs)
+        response, coalesced = await self.group.do_async(
+            key, lambda: self.client.achat(messages, temperature, max_tokens, **kwargs)
+        )
+        return self._share(response, coalesced)
+
+    def stream_chat(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 2048, **kwargs):
+        kwargs.pop("coalesce", None)
+        return self.client.stream_chat(messages, temperature, max_tokens, **kwargs)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取全局合并组（跨客户端实例共享）"""
+    return _single_flight
+
+
+__all__ = ["SingleFlight", "SingleFlightLLMClient", "get_single_flight"]
@@ -0,0 +1,226 @@
+"""增量 SSE 解码模块
+
+按 Server-Sent Events 规范解析 Provider 的流式响应：
+
+- 直接处理原始字节块：不完整的行和事件留在缓冲区，与网络分块方式无关；
+  整行凑齐后才解码 UTF-8，多字节字符跨块也不会出错
+- 支持 \\n、\\r\\n、\\r 三种换行（\\r\\n 跨块时不会多出空行）
+- 支持 event:/id:/retry: 字段、注释行和多行 data:（按 \\n 拼接）
+- data 为 [DONE] 时标记流结束
+
+提取增量文本时只解析 "content" 字段的字符串值，不对整个 chunk 做 json.loads；
+字段缺失或格式不符合预期时回退到完整解析。
+"""
+import json
+from dataclasses import dataclass
+from json.decoder import scanstring
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DONE = "[DONE]"
+
+_CONTENT_KEY = '"content":'
+_WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class SSEEvent:
+    """SSE 事件"""
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.data == DONE
+
+
+class SSEDecoder:
+    """增量 SSE 解码器
+
+    用法：
+        decoder = SSEDecoder()
+        for chunk in byte_chunks:
+            for event in decoder.feed(chunk):
+                ...
+        for event in decoder.flush():
+            ...
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._skip_lf = False
+        self._data: List[str] = []
+        self._event = ""
+        self._last_id: Optional[str] = None
+        self._retry: Optional[int] = None
+
+    @property
+    def last_event_id(self) -> Optional[str]:
+        return self._last_id
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """输入一个字节块，返回其中已完整的事件"""
+        if self._skip_lf:
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in buffer:
+            # 末尾的 \r 已经结束了一行，下一块开头的 \n 属于同一个换行
+            self._skip_lf = buffer.endswith(b"\r")
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        lines = buffer.split(b"\n")
+        self._buffer = lines.pop()
+
+        events = []
+        data = self._data
+        for line in lines:
+            # 绝大多数行都是 data 字段或事件间的空行，跳过通用的字段拆分
+            if line.startswith(b"data: "):
+                data.append(line[6:].decode("utf-8", errors="replace"))
+                continue
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+                data = self._data
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """流结束时处理剩余内容（缺少结尾空行的最后一个事件也会分发）"""
+        events = []
+        if self._buffer:
+            line, self._buffer = self._buffer, b""
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line[:1] == b":":
+            return None
+        text = line.decode("utf-8", errors="replace")
+        name, sep, value = text.partition(":")
+        if sep and value[:1] == " ":
+            value = value[1:]
+        if name == "data":
+            self._data.append(value)
+        elif name == "event":
+            self._event = value
+        elif name == "id":
+            if "\0" not in value:
+                self._last_id = value
+        elif name == "retry":
+            if value.isdigit():
+                self._retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._data:
+            self._event = ""
+            return None
+        event = SSEEvent(
+            data="\n".join(self._data),
+            event=self._event or "message",
+            id=self._last_id,
+            retry=self._retry
+        )
+        self._data = []
+        self._event = ""
+        return event
+
+
+def iter_sse_events(chunks: Iterable[bytes]) -> Iterator[SSEEvent]:
+    """把字节块序列解码为事件序列，遇到 [DONE] 结束"""
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        for event in decoder.feed(chunk):
+            if event.done:
+                return
+            yield event
+    for event in decoder.flush():
+        if event.done:
+            return
+        yield event
+
+
+class SSEUsageTap:
+    """透传字节流时的用量旁路统计
+
+    不改动也不复制转发的数据：只在缓冲区中定位事件边界并计数 data 行；
+    出现 "usage" 字段时才解码对应事件，取 Provider 返回的 token 用量。
+    """
+
+    _BOUNDARIES = (b"\n\n", b"\r\n\r\n", b"\r\r")
+
+    def __init__(self):
+        self._pending = b""
+        self.events = 0
+        self.usage: Optional[Dict] = None
+
+    def feed(self, chunk: bytes):
+        buffer = self._pending + chunk if self._pending else chunk
+        end = max(buffer.rfind(sep) + len(sep) if sep in buffer else 0 for sep in self._BOUNDARIES)
+        complete, self._pending = buffer[:end], buffer[end:]
+        if complete:
+            self._scan(complete)
+
+    def close(self):
+        if self._pending:
+            self._scan(self._pending)
+            self._pending = b""
+
+    def _scan(self, data: bytes):
+        self.events += data.count(b"data:")
+        if b'"usage"' not in data:
+            return
+        for event in iter_sse_events([data]):
+            if '"usage"' not in event.data:
+                continue
+            try:
+                usage = json.loads(event.data).get("usage")
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(usage, dict):
+                self.usage = usage
+
+
+def extract_delta_content(data: str) -> str:
+    """提取 chat.completion.chunk 中 choices[0].delta.content 的文本
+
+    只扫描 "content" 字段的 JSON 字符串值；找不到字段或值不是字符串（如 null）时
+    返回空串，快速路径失败时回退到完整的 JSON 解析。
+    """
+    index = data.find(_CONTENT_KEY)
+    if index < 0:
+        return ""
+    index += len(_CONTENT_KEY)
+    length = len(data)
+    while index < length and data[index] in _WHITESPACE:
+        index += 1
+    if index >= length or data[index] != '"':
+        return ""
+    try:
+        return scanstring(data, index + 1)[0]
+    except ValueError:
+        pass
+    try:
+        chunk = json.loads(data)
+        return chunk["choices"][0].get("delta", {}).get("content") or ""
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return ""
+
+
+__all__ = [
+    "DONE",
+    "SSEEvent",
+    "SSEDecoder",
+    "iter_sse_events",
+    "SSEUsageTap",
+    "extract_delta_content",
+]
@@ -32,4 +32,40 @@ SYSTEM_PROMPT = """你是一个合同审核助手，负责审核物业合同。
 }"""
 
 
-__all__ = ["SYSTEM_PROMPT"]
+def _check(list_field: str) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            "passed": {"type": "boolean"},
+            list_field: {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["passed", list_field],
+        "additionalProperties": False,
+    }
+
+
+# 输出结构（与上面的输出格式一致），支持的模型按此 JSON Schema 约束输出
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "legality": _check("issues"),
+        "completeness": _check("missing"),
+        "risk": {
+            "type": "object",
+            "properties": {
+                "level": {"type": "string", "enum": ["高", "中", "低"]},
+                "issues": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["level", "issues"],
+            "additionalProperties": False,
+        },
+        "fairness": _check("issues"),
+        "summary": {"type": "string"},
+        "suggestions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["legality", "completeness", "risk", "fairness", "summary", "suggestions"],
+    "additionalProperties": False,
+}
+
+
+__all__ = ["SYSTEM_PROMPT", "OUTPUT_SCHEMA"]
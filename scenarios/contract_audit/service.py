@@ -1,14 +1,20 @@
 """合同审核服务"""
-import json
-from typing import Dict
+from typing import Any, Dict, Generator, Optional, Tuple
+from core.cancellation import CancellationToken
+from core.llm_client import StreamInfo
+from core.response_format import json_schema_format
 from services import ChatService
-from .prompt import SYSTEM_PROMPT
+from .prompt import OUTPUT_SCHEMA, SYSTEM_PROMPT
 from utils import default_logger
+from utils.json_stream import IncrementalJSONParser, loads_tolerant
 
 
 class ContractAuditService:
     """合同审核服务"""
 
+    # 输出结构约束（按模型能力降级为 JSON 模式或仅靠提示词）
+    RESPONSE_FORMAT = json_schema_format("contract_audit_report", OUTPUT_SCHEMA)
+
     def __init__(
         self,
         provider: str = "qianwen",
@@ -18,14 +24,23 @@ class ContractAuditService:
             provider=provider,
             model=model,
             system_prompt=SYSTEM_PROMPT,
-            temperature=0.5
+            temperature=0.5,
+            scenario="contract_audit"
         )
 
-    def audit(self, contract_content: str) -> Dict:
-        """审核合同"""
+    def audit(self, contract_content: str, use_cache: Optional[bool] = None) -> Dict:
+        """审核合同
+
+        Args:
+            contract_content: 合同内容
+            use_cache: 是否使用响应缓存（None 表示按温度自动判断，False 强制重新生成）
+        """
         try:
             response = self.chat_service.chat(
-                user_message=f"请审核以下合同：\n{contract_content}"
+                user_message=f"请审核以下合同：\n{contract_content}",
+                cache=use_cache,
+                stop_on_json=True,
+                response_format=self.RESPONSE_FORMAT
             )
 
             result = self._parse_response(response.content)
@@ -33,7 +48,8 @@ class ContractAuditService:
             return {
                 "success": True,
                 "result": result,
-                "raw_response": response.content
+                "raw_response": response.content,
+                "finish_reason": response.finish_reason
             }
 
         except Exception as e:
@@ -43,15 +59,51 @@ class ContractAuditService:
                 "error": str(e)
             }
 
-    def _parse_response(self, response: str) -> Dict:
-        """解析响应"""
+    def audit_stream(
+        self,
+        contract_content: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        """流式审核合同
+
+        依次产出 (事件名, 数据)：progress 进度、delta 增量文本、field 已完成的
+        顶层字段，最后一个事件为 result，数据与 audit() 的返回值相同。
+        JSON 对象完成后即结束生成，不等待其后的说明文字。
+        """
+        yield "progress", {"stage": "auditing"}
+        parser = IncrementalJSONParser()
+        info = StreamInfo()
         try:
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            if start >= 0 and end > start:
-                return json.loads(response[start:end])
-        except json.JSONDecodeError:
-            pass
+            for chunk in self.chat_service.stream_chat(
+                f"请审核以下合同：\n{contract_content}",
+                cancel_token=cancel_token,
+                stop_on_json=True,
+                stream_info=info,
+                response_format=self.RESPONSE_FORMAT
+            ):
+                yield "delta", {"text": chunk}
+                for name, value in parser.feed(chunk).items():
+                    yield "field", {"name": name, "value": value}
+            content = parser.text
+            yield "result", {
+                "success": True,
+                "result": self._parse_response(content),
+                "raw_response": content,
+                "finish_reason": info.finish_reason or "stop"
+            }
+        except Exception as e:
+            default_logger.error(f"Contract audit stream error: {str(e)}")
+            yield "result", {"success": False, "error": str(e)}
+
+    def _parse_response(self, response: str) -> Dict:
+        """解析响应（容错解析，可修复常见的 JSON 格式错误和截断）"""
+        if "{" in response:
+            try:
+                result = loads_tolerant(response)
+                if isinstance(result, dict):
+                    return result
+            except ValueError:
+                pass
 
         return {"summary": response, "raw": True}
 
@@ -1,5 +1,6 @@
 """知识库问答服务"""
-from typing import Dict, List
+from typing import Any, Dict, Generator, List, Optional, Tuple
+from core.cancellation import CancellationToken
 from services import ChatService, RAGService
 from .prompt import SYSTEM_PROMPT
 from utils import default_logger
@@ -18,7 +19,8 @@ class KnowledgeQAService:
             provider=provider,
             model=model,
             system_prompt=SYSTEM_PROMPT,
-            temperature=0.5
+            temperature=0.5,
+            scenario="knowledge_qa"
         )
 
         # 初始化RAG服务
@@ -47,5 +49,32 @@ class KnowledgeQAService:
                 "error": str(e)
             }
 
+    def query_stream(
+        self,
+        question: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        """流式问答
+
+        依次产出 (事件名, 数据)：progress 进度（检索、生成）、delta 增量文本，
+        最后一个事件为 result，数据与 query() 的返回值相同。
+        """
+        try:
+            yield "progress", {"stage": "retrieving"}
+            retrieved = self.rag_service.retrieve(question)
+            yield "progress", {"stage": "generating", "documents": len(retrieved)}
+            output = []
+            for chunk in self.rag_service.stream_query(question, retrieved, cancel_token=cancel_token):
+                output.append(chunk)
+                yield "delta", {"text": chunk}
+            yield "result", {
+                "success": True,
+                "answer": "".join(output),
+                "question": question
+            }
+        except Exception as e:
+            default_logger.error(f"Knowledge QA stream error: {str(e)}")
+            yield "result", {"success": False, "error": str(e)}
+
 
 __all__ = ["KnowledgeQAService"]
@@ -1,7 +1,9 @@
 """智能客服场景服务"""
-from typing import Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from core import ScenarioConfig, LLMFactory
-from services import ChatService, ConversationManager
+from core.cancellation import CancellationToken
+from services import ChatService, ConversationManager, SemanticCache
 from .prompt import SYSTEM_PROMPT
 from utils import default_logger
 
@@ -14,7 +16,8 @@ class PropertyChatbotService:
         provider: str = "deepseek",
         model: str = "deepseek-chat",
         temperature: float = 0.7,
-        max_history: int = 20
+        max_history: int = 20,
+        semantic_cache: Optional[SemanticCache] = None
     ):
         self.config = ScenarioConfig(
             name="property_chatbot",
@@ -28,25 +31,41 @@ class PropertyChatbotService:
             provider=provider,
             model=model,
             system_prompt=SYSTEM_PROMPT,
-            temperature=temperature
+            temperature=temperature,
+            scenario="property_chatbot"
         )
 
         self.conversation_manager = ConversationManager(max_history=max_history)
 
+        # 语义缓存（可选）：只用于首轮、无上下文的问题
+        self.semantic_cache = semantic_cache
+        self._llm_latency_ms: Optional[float] = None
+
     def chat(self, user_message: str, session_id: str = "default") -> Dict:
         """处理用户对话"""
         # 获取历史
         history = self.conversation_manager.get_history(session_id)
+        first_turn = not history
+
+        # 未命中时保留查找算出的问题向量，写入缓存时不再重复向量化
+        question_vector = None
+        if self.semantic_cache and first_turn:
+            cached, question_vector = self._lookup_semantic_cache(user_message, session_id)
+            if cached is not None:
+                return cached
 
         # 添加用户消息到历史
         self.conversation_manager.add_message(session_id, "user", user_message)
 
         try:
             # 调用LLM
+            start = time.perf_counter()
             response = self.chat_service.chat(
                 user_message=user_message,
-                history=history
+                history=history,
+                session_id=session_id
             )
+            elapsed_ms = (time.perf_counter() - start) * 1000
 
             # 添加助手消息到历史
             self.conversation_manager.add_message(
@@ -55,6 +74,10 @@ class PropertyChatbotService:
                 response.content
             )
 
+            if self.semantic_cache and first_turn and response.content:
+                self._update_llm_latency(elapsed_ms)
+                self.semantic_cache.store(user_message, response.content, vector=question_vector)
+
             return {
                 "success": True,
                 "message": response.content,
@@ -70,13 +93,56 @@ class PropertyChatbotService:
                 "session_id": session_id
             }
 
-    def stream_chat(self, user_message: str, session_id: str = "default"):
-        """流式对话"""
+    def _lookup_semantic_cache(self, user_message: str, session_id: str) -> Tuple[Optional[Dict], Any]:
+        """查询语义缓存，命中时写入会话历史
+
+        Returns:
+            Tuple: (命中时的返回结果, 查找时算出的问题向量)
+        """
+        start = time.perf_counter()
+        hit, vector = self.semantic_cache.lookup_with_vector(user_message)
+        if hit is None:
+            return None, vector
+
+        lookup_ms = (time.perf_counter() - start) * 1000
+        if self._llm_latency_ms is not None:
+            self.semantic_cache.record_saved_latency(max(0.0, self._llm_latency_ms - lookup_ms))
+
+        self.conversation_manager.add_message(session_id, "user", user_message)
+        self.conversation_manager.add_message(session_id, "assistant", hit["answer"])
+        return {
+            "success": True,
+            "message": hit["answer"],
+            "session_id": session_id,
+            "usage": {},
+            "cached": True
+        }, None
+
+    def _update_llm_latency(self, elapsed_ms: float, alpha: float = 0.2):
+        """更新 LLM 调用时延的指数滑动平均（用于估算缓存节省的时延）"""
+        if self._llm_latency_ms is None:
+            self._llm_latency_ms = elapsed_ms
+        else:
+            self._llm_latency_ms = alpha * elapsed_ms + (1 - alpha) * self._llm_latency_ms
+
+    def stream_chat(
+        self,
+        user_message: str,
+        session_id: str = "default",
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        """流式对话
+
+        Args:
+            cancel_token: 取消令牌（客户端断开时取消，上游流随之关闭）
+        """
         history = self.conversation_manager.get_history(session_id)
         self.conversation_manager.add_message(session_id, "user", user_message)
 
         try:
-            for chunk in self.chat_service.stream_chat(user_message, history):
+            for chunk in self.chat_service.stream_chat(
+                user_message, history, session_id=session_id, cancel_token=cancel_token
+            ):
                 yield chunk
         except Exception as e:
             default_logger.error(f"Stream chat error: {str(e)}")
@@ -29,4 +29,27 @@ SYSTEM_PROMPT = """你是一个工单智能处理助手，负责分析和处理
 }"""
 
 
-__all__ = ["SYSTEM_PROMPT"]
+# 输出结构（与上面的输出格式一致），支持的模型按此 JSON Schema 约束输出
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "enum": ["维修", "投诉", "建议", "咨询", "紧急"]},
+        "urgency": {"type": "string", "enum": ["高", "中", "低"]},
+        "key_info": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string"},
+                "contact": {"type": "string"},
+                "description": {"type": "string"},
+            },
+            "required": ["location", "contact", "description"],
+            "additionalProperties": False,
+        },
+        "suggestion": {"type": "string"},
+    },
+    "required": ["type", "urgency", "key_info", "suggestion"],
+    "additionalProperties": False,
+}
+
+
+__all__ = ["SYSTEM_PROMPT", "OUTPUT_SCHEMA"]
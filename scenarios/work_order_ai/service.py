@@ -1,14 +1,23 @@
 """工单智能处理服务"""
-import json
-from typing import Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Generator, Iterable, Optional, Tuple
+from core.batch_api import BatchAPIClient, BatchJob, create_batch_client
+from core.cancellation import CancellationToken
+from core.llm_client import StreamInfo
+from core.response_format import json_schema_format
 from services import ChatService
-from .prompt import SYSTEM_PROMPT
-from utils import default_logger
+from .prompt import OUTPUT_SCHEMA, SYSTEM_PROMPT
+from utils import default_logger, default_metrics
+from utils.json_stream import IncrementalJSONParser, loads_tolerant
 
 
 class WorkOrderAIService:
     """工单智能处理服务"""
 
+    # 输出结构约束（按模型能力降级为 JSON 模式或仅靠提示词）
+    RESPONSE_FORMAT = json_schema_format("work_order_analysis", OUTPUT_SCHEMA)
+    TEMPERATURE = 0.3
+
     def __init__(
         self,
         provider: str = "deepseek",
@@ -18,14 +27,23 @@ class WorkOrderAIService:
             provider=provider,
             model=model,
             system_prompt=SYSTEM_PROMPT,
-            temperature=0.3
+            temperature=self.TEMPERATURE,
+            scenario="work_order_ai"
         )
 
-    def process(self, work_order_content: str) -> Dict:
-        """处理工单"""
+    def process(self, work_order_content: str, use_cache: Optional[bool] = None) -> Dict:
+        """处理工单
+
+        Args:
+            work_order_content: 工单内容
+            use_cache: 是否使用响应缓存（None 表示按温度自动判断，False 强制重新生成）
+        """
         try:
             response = self.chat_service.chat(
-                user_message=f"请分析以下工单：\n{work_order_content}"
+                user_message=f"请分析以下工单：\n{work_order_content}",
+                cache=use_cache,
+                stop_on_json=True,
+                response_format=self.RESPONSE_FORMAT
             )
 
             # 尝试解析JSON
@@ -34,7 +52,8 @@ class WorkOrderAIService:
             return {
                 "success": True,
                 "result": result,
-                "raw_response": response.content
+                "raw_response": response.content,
+                "finish_reason": response.finish_reason
             }
 
         except Exception as e:
@@ -44,19 +63,192 @@ class WorkOrderAIService:
                 "error": str(e)
             }
 
-    def _parse_response(self, response: str) -> Dict:
-        """解析响应"""
-        # 尝试提取JSON
+    def process_stream(
+        self,
+        work_order_content: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        """流式处理工单
+
+        依次产出 (事件名, 数据)：progress 进度、delta 增量文本、field 已完成的
+        顶层字段（如 type/urgency 先于 suggestion 产出），最后一个事件为 result，
+        数据与 process() 的返回值相同。JSON 对象完成后即结束生成，不等待其后的说明文字。
+        """
+        yield "progress", {"stage": "analyzing"}
+        parser = IncrementalJSONParser()
+        info = StreamInfo()
         try:
-            # 查找JSON块
-            start = response.find("{")
-            end = response.rfind("}") + 1
-
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
+            for chunk in self.chat_service.stream_chat(
+                f"请分析以下工单：\n{work_order_content}",
+                cancel_token=cancel_token,
+                stop_on_json=True,
+                stream_info=info,
+                response_format=self.RESPONSE_FORMAT
+            ):
+                yield "delta", {"text": chunk}
+                for name, value in parser.feed(chunk).items():
+                    yield "field", {"name": name, "value": value}
+            content = parser.text
+            yield "result", {
+                "success": True,
+                "result": self._parse_response(content),
+                "raw_response": content,
+                "finish_reason": info.finish_reason or "stop"
+            }
+        except Exception as e:
+            default_logger.error(f"Work order stream error: {str(e)}")
+            yield "result", {"success": False, "error": str(e)}
+
+    def process_many(
+        self,
+        items: Iterable[Tuple[str, str]],
+        concurrency: int = 8,
+        use_cache: Optional[bool] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Dict, None, None]:
+        """批量处理工单，按完成顺序产出结果
+
+        同时在途的工单不超过 concurrency 个，完成一个再提交下一个；Provider 限流和
+        优先级调度由场景客户端的包装层负责。单个工单失败只体现在它自己的结果中。
+
+        Args:
+            items: (工单ID, 工单内容) 序列，按需读取
+            concurrency: 并发处理的工单数上限
+            use_cache: 是否使用响应缓存
+            cancel_token: 取消后不再提交新的工单（已在处理中的工单会完成）
+
+        Yields:
+            Dict: process() 的返回值加上 id 字段
+        """
+        pending = iter(items)
+        running: Dict[Future, str] = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="workorder-batch")
+
+        def submit_next() -> bool:
+            if cancel_token is not None and cancel_token.cancelled:
+                return False
+            item = next(pending, None)
+            if item is None:
+                return False
+            item_id, content = item
+            running[executor.submit(self.process, content, use_cache=use_cache)] = item_id
+            return True
+
+        try:
+            while len(running) < concurrency and submit_next():
+                pass
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item_id = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        default_logger.error(f"Work order batch item {item_id} error: {str(e)}")
+                        result = {"success": False, "error": str(e)}
+                    default_metrics.inc("workorder_batch_items", status="success" if result.get("success") else "error")
+                    yield {"id": item_id, **result}
+                    submit_next()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit_offline(
+        self,
+        items: Iterable[Tuple[str, str]],
+        batch_client: Optional[BatchAPIClient] = None
+    ) -> BatchJob:
+        """提交离线批处理任务（Provider Batch API）
+
+        适合不要求实时返回的大批量工单（如夜间重新分类历史工单），不占用实时调用额度。
+        返回任务的 id 和 custom_ids（提交的工单ID）交给 collect_offline() 取结果。
+
+        Args:
+            items: (工单ID, 工单内容) 序列，工单ID作为请求的 custom_id
+            batch_client: 批处理客户端（默认按 LLM_BATCH_PROVIDER/LLM_BATCH_MODEL 创建）
+        """
+        from config import get_default_config
+
+        batch_client = batch_client or self._batch_client()
+        return batch_client.submit(
+            (
+                (item_id, [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": f"请分析以下工单：\n{content}"}
+                ])
+                for item_id, content in items
+            ),
+            temperature=self.TEMPERATURE,
+            max_tokens=get_default_config("work_order_ai").max_tokens,
+            metadata={"scenario": "work_order_ai"},
+            response_format=self.RESPONSE_FORMAT
+        )
+
+    def collect_offline(
+        self,
+        batch_id: str,
+        batch_client: Optional[BatchAPIClient] = None,
+        max_wait: Optional[float] = None,
+        ids: Optional[Iterable[str]] = None
+    ) -> Generator[Dict, None, None]:
+        """等待离线批处理任务结束并按工单ID产出结果
+
+        任务过期（expired）或被取消（cancelled）时只有部分工单有结果；传入 ids 时
+        没有结果的工单各产出一条失败记录，带上任务状态 batch_status。
+
+        Args:
+            batch_id: submit_offline() 返回的任务ID
+            batch_client: 批处理客户端（需与提交时一致）
+            max_wait: 最长等待时间（秒），默认一直等到任务结束
+            ids: 提交的工单ID（submit_offline() 返回任务的 custom_ids）
+
+        Yields:
+            Dict: 与 process_many() 相同，process() 的返回值加上 id 字段
+
+        Raises:
+            BatchJobError: 任务失败或等待超时
+        """
+        batch_client = batch_client or self._batch_client()
+        job = batch_client.wait(batch_id, max_wait=max_wait)
+        results = batch_client.results(job)
+        for item_id in ids or ():
+            if item_id not in results:
+                yield {
+                    "id": item_id,
+                    "success": False,
+                    "error": f"No result in batch {job.id} (status: {job.status})",
+                    "batch_status": job.status
+                }
+        for item_id, item in results.items():
+            if not item.success:
+                yield {"id": item_id, "success": False, "error": item.error}
+                continue
+            content = item.response.content
+            yield {
+                "id": item_id,
+                "success": True,
+                "result": self._parse_response(content),
+                "raw_response": content,
+                "finish_reason": item.response.finish_reason
+            }
+
+    @staticmethod
+    def _batch_client() -> BatchAPIClient:
+        from config import config as app_config
+        return create_batch_client(
+            app_config.llm_batch_provider,
+            app_config.llm_batch_model,
+            poll_interval=app_config.llm_batch_poll_interval
+        )
+
+    def _parse_response(self, response: str) -> Dict:
+        """解析响应（容错解析，可修复常见的 JSON 格式错误和截断）"""
+        if "{" in response:
+            try:
+                result = loads_tolerant(response)
+                if isinstance(result, dict):
+                    return result
+            except ValueError:
+                pass
 
         # 如果无法解析，返回原始内容
         return {
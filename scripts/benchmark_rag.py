@@ -0,0 +1,74 @@
+"""RAG检索基准测试脚本
+
+示例：
+    python scripts/benchmark_rag.py --corpus property --size 50
+    python scripts/benchmark_rag.py --corpus synthetic --size 500 --compare
+"""
+import os
+import sys
+import json
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RAG检索基准测试")
+    parser.add_argument("--corpus", choices=["property", "synthetic"], default="property", help="语料类型")
+    parser.add_argument("--size", type=int, default=20, help="语料规模（小区数/文档数）")
+    parser.add_argument("--queries", type=int, default=None, help="最多评测的问题数")
+    parser.add_argument("--chunk-size", type=int, default=500, help="分块大小")
+    parser.add_argument("--overlap", type=int, default=50, help="分块重叠")
+    parser.add_argument("--top-k", type=int, default=3, help="检索数量")
+    parser.add_argument("--no-dedup", action="store_true", help="关闭分块去重")
+    parser.add_argument("--compare", action="store_true", help="对比多组预设配置")
+    parser.add_argument("--no-memory", action="store_true", help="不统计内存")
+    parser.add_argument("--json", action="store_true", help="以JSON输出")
+
+    args = parser.parse_args()
+
+    from benchmarks import (
+        BenchmarkConfig,
+        RAGBenchmark,
+        build_property_corpus,
+        build_synthetic_corpus,
+        format_results,
+    )
+
+    if args.corpus == "property":
+        corpus = build_property_corpus(num_communities=args.size)
+    else:
+        corpus = build_synthetic_corpus(num_docs=args.size)
+
+    benchmark = RAGBenchmark(corpus, max_queries=args.queries, measure_memory=not args.no_memory)
+
+    if args.compare:
+        configs = [
+            BenchmarkConfig(name="chunk200", chunk_size=200, chunk_overlap=40, top_k=args.top_k),
+            BenchmarkConfig(name="chunk500", chunk_size=500, chunk_overlap=50, top_k=args.top_k),
+            BenchmarkConfig(name="chunk500-nodedup", chunk_size=500, chunk_overlap=50,
+                            top_k=args.top_k, deduplicate=False),
+            BenchmarkConfig(name="chunk1000", chunk_size=1000, chunk_overlap=100, top_k=args.top_k),
+        ]
+    else:
+        configs = [BenchmarkConfig(
+            name="custom",
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.overlap,
+            top_k=args.top_k,
+            deduplicate=not args.no_dedup
+        )]
+
+    results = benchmark.compare(configs)
+
+    if args.json:
+        print(json.dumps([r.to_dict() for r in results], ensure_ascii=False, indent=2))
+    else:
+        print(f"语料: {corpus.name}  文档数: {len(corpus.documents)}  问题数: {len(benchmark.qa_pairs)}")
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""SSE 流解析基准测试脚本
+
+对比逐行解码 + 整块 json.loads 的旧解析方式与增量 SSE 解码器，
+在本地生成的长流上统计每个 token 的 CPU 耗时。
+
+示例：
+    python scripts/benchmark_sse.py --tokens 20000 --chunk-size 256
+"""
+import os
+import sys
+import json
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_stream(num_tokens: int) -> bytes:
+    """生成 OpenAI 格式的 chat.completion.chunk 流"""
+    events = []
+    for i in range(num_tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "deepseek-chat",
+            "choices": [{"index": 0, "delta": {"content": f"物业{i % 10}"}, "finish_reason": None}],
+        }
+        events.append(b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n")
+    events.append(b"data: [DONE]\n\n")
+    return b"".join(events)
+
+
+class _ChunkedRaw:
+    """按给定的字节块返回数据的原始响应替身"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, amt=None):
+        return next(self._chunks, b"")
+
+
+def legacy_parse(chunks):
+    """旧实现：requests 的 iter_lines() 拆行，再逐行解码、前缀判断、整块 json.loads"""
+    import requests
+
+    response = requests.Response()
+    response.raw = _ChunkedRaw(chunks)
+    for line in response.iter_lines():
+        if not line:
+            continue
+        line = line.decode("utf-8")
+        if line.startswith("data: "):
+            data = line[6:]
+            if data == "[DONE]":
+                return
+            try:
+                content = json.loads(data)["choices"][0].get("delta", {}).get("content", "")
+                if content:
+                    yield content
+            except (json.JSONDecodeError, KeyError):
+                continue
+
+
+def incremental_parse(chunks):
+    """新实现：增量 SSE 解码 + 只解析 content 字段"""
+    from core.sse import extract_delta_content, iter_sse_events
+
+    for event in iter_sse_events(chunks):
+        content = extract_delta_content(event.data)
+        if content:
+            yield content
+
+
+def measure(parser, chunks, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in parser(chunks):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SSE 流解析基准测试")
+    parser.add_argument("--tokens", type=int, default=20000, help="流中的 token 数")
+    parser.add_argument("--chunk-size", type=int, default=256, help="网络字节块大小")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    stream = build_stream(args.tokens)
+    chunks = [stream[i:i + args.chunk_size] for i in range(0, len(stream), args.chunk_size)]
+    assert list(legacy_parse(chunks)) == list(incremental_parse(chunks))
+
+    print(f"tokens: {args.tokens}  bytes: {len(stream)}  chunks: {len(chunks)}")
+    results = [("legacy", measure(legacy_parse, chunks, args.repeat)),
+               ("incremental", measure(incremental_parse, chunks, args.repeat))]
+    for name, seconds in results:
+        print(f"{name:<12} total {seconds * 1000:8.1f} ms   per token {seconds / args.tokens * 1e6:6.2f} us")
+    print(f"speedup: {results[0][1] / results[1][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
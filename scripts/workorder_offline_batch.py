@@ -0,0 +1,82 @@
+"""工单离线批处理脚本
+
+通过 Provider 的批处理接口（Batch API）处理大批量历史工单，不占用实时调用额度。
+输入为 JSONL 文件，每行 {"id": "工单ID", "content": "工单内容"}；
+结果按工单ID写入 JSONL 文件，每行格式与 /workorder/batch 相同。
+
+示例：
+    # 提交任务，输出任务ID
+    python scripts/workorder_offline_batch.py submit backlog.jsonl
+    # 等待任务结束并写出结果；--input 传入提交时的文件，任务过期或取消时未处理的工单也会写出失败记录
+    python scripts/workorder_offline_batch.py collect batch_abc123 --input backlog.jsonl -o results.jsonl
+"""
+import os
+import sys
+import json
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def read_items(path: str):
+    """读取待处理工单"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield str(item["id"]), item["content"]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="工单离线批处理（Provider Batch API）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    submit = sub.add_parser("submit", help="提交批处理任务")
+    submit.add_argument("input", help="输入 JSONL 文件（每行 id/content）")
+    collect = sub.add_parser("collect", help="等待任务结束并写出结果")
+    collect.add_argument("batch_id", help="任务ID")
+    collect.add_argument("-o", "--output", default="-", help="结果 JSONL 文件（默认输出到标准输出）")
+    collect.add_argument("--max-wait", type=float, default=None, help="最长等待时间（秒）")
+    collect.add_argument("--input", default=None, help="提交时的输入 JSONL 文件（用于列出没有结果的工单）")
+
+    args = parser.parse_args()
+
+    from config import config as app_config
+    from scenarios import WorkOrderAIService
+
+    service = WorkOrderAIService(provider=app_config.llm_batch_provider, model=app_config.llm_batch_model)
+    if args.command == "submit":
+        job = service.submit_offline(read_items(args.input))
+        print(f"batch: {job.id}  status: {job.status}  requests: {len(job.custom_ids)}  "
+              f"provider: {app_config.llm_batch_provider}")
+        return
+
+    max_wait = args.max_wait if args.max_wait is not None else app_config.llm_batch_max_wait
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    ids = [item_id for item_id, _ in read_items(args.input)] if args.input else None
+    succeeded = failed = 0
+    try:
+        for result in service.collect_offline(args.batch_id, max_wait=max_wait, ids=ids):
+            line = {
+                "id": result["id"],
+                "success": result["success"],
+                "result": result.get("result"),
+                "error": result.get("error"),
+                "finish_reason": result.get("finish_reason"),
+            }
+            if "batch_status" in result:
+                line["batch_status"] = result["batch_status"]
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            if result["success"]:
+                succeeded += 1
+            else:
+                failed += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"succeeded: {succeeded}  failed: {failed}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
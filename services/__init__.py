@@ -2,10 +2,14 @@
 from .chat_service import ChatService, ConversationManager
 from .embedding_service import EmbeddingService
 from .rag_service import RAGService
+from .dedup_service import ChunkDeduplicator
+from .semantic_cache import SemanticCache
 
 __all__ = [
     "ChatService",
     "ConversationManager",
     "EmbeddingService",
     "RAGService",
+    "ChunkDeduplicator",
+    "SemanticCache",
 ]
@@ -13,9 +13,14 @@ class ChatService:
         model: str = None,
         system_prompt: str = None,
         temperature: float = 0.7,
-        max_tokens: int = 2048
+        max_tokens: int = 2048,
+        scenario: str = None
     ):
-        self.llm = LLMFactory.create(provider, model)
+        self.scenario = scenario
+        if scenario:
+            self.llm = LLMFactory.create_for_scenario(scenario, provider, model)
+        else:
+            self.llm = LLMFactory.create(provider, model)
         self.system_prompt = system_prompt
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -33,8 +38,9 @@ class ChatService:
 
         response = self.llm.chat(
             messages=messages,
-            temperature=kwargs.get("temperature", self.temperature),
-            max_tokens=kwargs.get("max_tokens", self.max_tokens)
+            temperature=kwargs.pop("temperature", self.temperature),
+            max_tokens=kwargs.pop("max_tokens", self.max_tokens),
+            **kwargs
         )
 
         default_logger.info(f"Chat response: {response.content[:50]}...")
@@ -47,14 +53,21 @@ class ChatService:
         history: List[Dict] = None,
         **kwargs
     ):
-        """流式对话"""
+        """流式对话
+
+        kwargs 中的 cancel_token 会传给底层客户端，取消后不再输出片段
+        """
         messages = self._build_messages(user_message, history)
+        cancel_token = kwargs.get("cancel_token")
 
         for chunk in self.llm.stream_chat(
             messages=messages,
-            temperature=kwargs.get("temperature", self.temperature),
-            max_tokens=kwargs.get("max_tokens", self.max_tokens)
+            temperature=kwargs.pop("temperature", self.temperature),
+            max_tokens=kwargs.pop("max_tokens", self.max_tokens),
+            **kwargs
         ):
+            if cancel_token is not None and cancel_token.cancelled:
+                break
             yield chunk
 
     def _build_messages(
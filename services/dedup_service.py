@@ -0,0 +1,174 @@
+"""知识库分块去重模块
+
+入库时对分块做两级去重：
+1. 精确去重：规范化后内容的 SHA256 哈希
+2. 近似去重：字符 shingle 的 MinHash 签名 + LSH 分桶召回候选
+"""
+import hashlib
+import random
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+_MASK_64 = (1 << 64) - 1
+_EMPTY = 1 << 128
+
+
+class ChunkDeduplicator:
+    """分块去重器
+
+    Args:
+        num_perm: MinHash 排列数
+        bands: LSH 分带数（num_perm 必须能被 bands 整除）
+        shingle_size: 字符 shingle 长度
+        threshold: 近似重复判定的 Jaccard 相似度阈值
+        near_duplicate: 是否启用近似去重（关闭时仅做精确去重）
+        seed: 随机种子，保证签名可复现
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        threshold: float = 0.85,
+        near_duplicate: bool = True,
+        seed: int = 1
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.near_duplicate = near_duplicate
+
+        rng = random.Random(seed)
+        self._salt = rng.getrandbits(32)
+        self._mul = rng.getrandbits(64) | 1
+        self._add = rng.getrandbits(64)
+
+        self._hash_index: Dict[str, int] = {}
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = {}
+        self._content_hashes: Dict[int, str] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化文本（合并空白）"""
+        return re.sub(r"\s+", " ", text).strip()
+
+    @classmethod
+    def content_hash(cls, text: str) -> str:
+        """计算规范化内容哈希"""
+        return hashlib.sha256(cls.normalize(text).encode("utf-8")).hexdigest()
+
+    def _shingles(self, text: str) -> Set[int]:
+        """生成字符 shingle 的 64 位哈希集合"""
+        text = self.normalize(text)
+        k = self.shingle_size
+        grams = [text] if len(text) <= k else [text[i:i + k] for i in range(len(text) - k + 1)]
+        hashes = set()
+        for gram in grams:
+            data = gram.encode("utf-8")
+            hashes.add((zlib.crc32(data) << 32) | zlib.crc32(data, self._salt))
+        return hashes
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """计算 MinHash 签名
+
+        采用单次排列哈希（one permutation hashing）：每个 shingle 只哈希一次，
+        按哈希值分配到 num_perm 个桶中取最小值，空桶从右侧最近的非空桶借值
+        （densification），复杂度与 shingle 数量线性相关。
+        """
+        bins = [_EMPTY] * self.num_perm
+        for h in self._shingles(text):
+            h = ((self._mul * h) + self._add) & _MASK_64
+            index = h % self.num_perm
+            value = h // self.num_perm
+            if value < bins[index]:
+                bins[index] = value
+
+        if all(value == _EMPTY for value in bins):
+            return tuple(bins)
+        for i, value in enumerate(bins):
+            if value == _EMPTY:
+                # 从右侧循环查找最近的非空桶，加上偏移区分来源
+                offset = 1
+                while bins[(i + offset) % self.num_perm] == _EMPTY:
+                    offset += 1
+                bins[i] = bins[(i + offset) % self.num_perm] + offset * _MASK_64
+        return tuple(bins)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def estimate_similarity(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+        """根据签名估算 Jaccard 相似度"""
+        if not sig1 or len(sig1) != len(sig2):
+            return 0.0
+        return sum(1 for a, b in zip(sig1, sig2) if a == b) / len(sig1)
+
+    def find_duplicate(self, text: str) -> Optional[int]:
+        """查找已登记的重复分块，返回其ID；无重复返回 None"""
+        chunk_id = self._hash_index.get(self.content_hash(text))
+        if chunk_id is not None or not self.near_duplicate:
+            return chunk_id
+
+        signature = self.signature(text)
+        candidates: Set[int] = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_score = None, 0.0
+        for candidate in candidates:
+            score = self.estimate_similarity(signature, self._signatures[candidate])
+            if score >= self.threshold and score > best_score:
+                best_id, best_score = candidate, score
+        return best_id
+
+    def register(self, text: str, chunk_id: int):
+        """登记新的唯一分块"""
+        digest = self.content_hash(text)
+        self._hash_index[digest] = chunk_id
+        self._content_hashes[chunk_id] = digest
+
+        if self.near_duplicate:
+            signature = self.signature(text)
+            self._signatures[chunk_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(chunk_id)
+
+    def unregister(self, chunk_id: int):
+        """移除已登记的分块（用于入库失败回滚）"""
+        digest = self._content_hashes.pop(chunk_id, None)
+        if digest is not None and self._hash_index.get(digest) == chunk_id:
+            del self._hash_index[digest]
+
+        signature = self._signatures.pop(chunk_id, None)
+        if signature is not None:
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key)
+                if bucket:
+                    bucket.discard(chunk_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def clear(self):
+        """清空索引"""
+        self._hash_index.clear()
+        self._signatures.clear()
+        self._buckets.clear()
+        self._content_hashes.clear()
+
+    def __len__(self) -> int:
+        return len(self._content_hashes)
+
+
+__all__ = ["ChunkDeduplicator"]
@@ -1,12 +1,19 @@
 """向量化服务模块"""
-import time
 from typing import List, Optional
-from config import KeyManager
+from config import KeyManager, config as app_config
+from core.retry import RetryPolicy
 from utils import default_logger
 
 
 class EmbeddingService:
-    """向量化服务"""
+    """向量化服务
+
+    Args:
+        provider: 提供商
+        model: 向量模型
+        max_retries: 最大尝试次数（含首次请求）
+        retry_delay: 重试基础延迟（秒），默认按应用配置
+    """
 
     # OpenAI embedding 限制
     MAX_TEXT_LENGTH = 8000  # 字符数限制（约 2000 tokens）
@@ -17,13 +24,20 @@ class EmbeddingService:
         provider: str = "openai",
         model: str = "text-embedding-3-small",
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: Optional[float] = None
     ):
         self.provider = provider
         self.model = model
         self._client = None
         self.max_retries = max_retries
-        self.retry_delay = retry_delay
+        self.retry_delay = app_config.retry_base_delay if retry_delay is None else retry_delay
+        # RetryPolicy 的 max_retries 不含首次请求
+        self.retry_policy = RetryPolicy(
+            max_retries=max(0, self.max_retries - 1),
+            base_delay=self.retry_delay,
+            max_delay=app_config.retry_max_delay,
+            name=f"embedding/{model}"
+        )
 
     def _get_client(self):
         """获取客户端"""
@@ -65,53 +79,37 @@ class EmbeddingService:
         return [self._validate_text(text) for text in texts if text]
 
     def embed(self, text: str) -> List[float]:
-        """获取文本向量（带重试机制）"""
+        """获取文本向量（可重试的错误按重试策略重试）"""
         text = self._validate_text(text)
         client = self._get_client()
 
-        last_error = None
-        for attempt in range(self.max_retries):
-            try:
-                if self.provider == "openai":
-                    response = client.embeddings.create(
-                        model=self.model,
-                        input=text
-                    )
-                    return response.data[0].embedding
-            except Exception as e:
-                last_error = e
-                default_logger.warning(f"Embedding attempt {attempt + 1} failed: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (2 ** attempt))  # 指数退避
-
-        default_logger.error(f"Embedding failed after {self.max_retries} attempts: {last_error}")
-        raise last_error or RuntimeError("Embedding failed")
+        def request() -> List[float]:
+            response = client.embeddings.create(model=self.model, input=text)
+            return response.data[0].embedding
+
+        try:
+            return self.retry_policy.call(request)
+        except Exception as e:
+            default_logger.error(f"Embedding failed: {e}")
+            raise
 
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """批量获取文本向量（带重试机制）"""
+        """批量获取文本向量（可重试的错误按重试策略重试）"""
         texts = self._validate_texts(texts)
         if not texts:
             return []
 
         client = self._get_client()
-        last_error = None
-
-        for attempt in range(self.max_retries):
-            try:
-                if self.provider == "openai":
-                    response = client.embeddings.create(
-                        model=self.model,
-                        input=texts
-                    )
-                    return [item.embedding for item in response.data]
-            except Exception as e:
-                last_error = e
-                default_logger.warning(f"Batch embedding attempt {attempt + 1} failed: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (2 ** attempt))
-
-        default_logger.error(f"Batch embedding failed after {self.max_retries} attempts: {last_error}")
-        raise last_error or RuntimeError("Batch embedding failed")
+
+        def request() -> List[List[float]]:
+            response = client.embeddings.create(model=self.model, input=texts)
+            return [item.embedding for item in response.data]
+
+        try:
+            return self.retry_policy.call(request)
+        except Exception as e:
+            default_logger.error(f"Batch embedding failed: {e}")
+            raise
 
 
 __all__ = ["EmbeddingService"]
@@ -1,64 +1,204 @@
 """RAG检索增强服务"""
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from .embedding_service import EmbeddingService
 from .chat_service import ChatService
-from tools import TextSplitter
+from .dedup_service import ChunkDeduplicator
+from tools import FileReader, TextSplitter
 from utils import default_logger
 
 
 class RAGService:
     """RAG检索增强服务"""
 
+    NO_RESULT_ANSWER = "抱歉，知识库中没有找到相关信息。"
+
     def __init__(
         self,
         knowledge_base: List[str] = None,
         embedding_service: EmbeddingService = None,
         chat_service: ChatService = None,
-        top_k: int = 3
+        top_k: int = 3,
+        deduplicate: bool = True,
+        deduplicator: ChunkDeduplicator = None,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50
     ):
         self.knowledge_base = knowledge_base or []
         self.embedding_service = embedding_service or EmbeddingService()
-        self.chat_service = chat_service or ChatService()
+        self._chat_service = chat_service
         self.top_k = top_k
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.deduplicator = None
+        if deduplicate:
+            self.deduplicator = deduplicator if deduplicator is not None else ChunkDeduplicator()
         self._chunks = []
         self._chunk_embeddings = []
+        # 每个唯一分块对应的来源文档ID列表
+        self._chunk_sources: List[List[Any]] = []
+        self._next_doc_id = 0
 
         if self.knowledge_base:
             self._process_knowledge_base()
 
+    @property
+    def chat_service(self) -> ChatService:
+        """对话服务（首次生成回答时才创建，纯检索场景无需配置LLM）"""
+        if self._chat_service is None:
+            self._chat_service = ChatService()
+        return self._chat_service
+
+    @chat_service.setter
+    def chat_service(self, value: ChatService):
+        self._chat_service = value
+
+    def _split(self, document: str) -> List[str]:
+        """按配置分块"""
+        return TextSplitter.split_by_chars(document, chunk_size=self.chunk_size, overlap=self.chunk_overlap)
+
+    def _embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """分批计算 embedding，避免超过单次批量上限被截断"""
+        batch_size = getattr(self.embedding_service, "MAX_BATCH_SIZE", 100)
+        embeddings = []
+        for i in range(0, len(chunks), batch_size):
+            embeddings.extend(self.embedding_service.embed_batch(chunks[i:i + batch_size]))
+        return embeddings
+
     def _process_knowledge_base(self):
         """处理知识库，分块并预计算 embedding"""
         self._chunks = []
         self._chunk_embeddings = []
-        splitter = TextSplitter()
+        self._chunk_sources = []
+        self._next_doc_id = 0
+        if self.deduplicator is not None:
+            self.deduplicator.clear()
 
+        total = 0
         for doc in self.knowledge_base:
-            chunks = splitter.split_by_chars(doc, chunk_size=500, overlap=50)
-            self._chunks.extend(chunks)
+            chunks = self._split(doc)
+            total += len(chunks)
+            new_chunks = self._dedup_chunks(chunks, self._allocate_doc_id())
+            self._register_chunks(new_chunks)
 
         # 预计算所有 chunk 的 embedding（批量处理以提高性能）
         if self._chunks:
             try:
-                self._chunk_embeddings = self.embedding_service.embed_batch(self._chunks)
-                default_logger.info(f"Knowledge base processed: {len(self._chunks)} chunks with embeddings")
+                self._chunk_embeddings = self._embed_chunks(self._chunks)
+                default_logger.info(
+                    f"Knowledge base processed: {len(self._chunks)} unique chunks "
+                    f"({total - len(self._chunks)} duplicates merged) with embeddings"
+                )
             except Exception as e:
                 default_logger.error(f"Failed to compute embeddings: {e}")
                 self._chunk_embeddings = []
 
-    def add_document(self, document: str):
-        """添加文档"""
-        splitter = TextSplitter()
-        chunks = splitter.split_by_chars(document, chunk_size=500, overlap=50)
+    def _allocate_doc_id(self) -> int:
+        """分配文档ID"""
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        return doc_id
 
-        if chunks:
-            # 计算新 chunks 的 embeddings
-            try:
-                embeddings = self.embedding_service.embed_batch(chunks)
-                self._chunks.extend(chunks)
-                self._chunk_embeddings.extend(embeddings)
-                default_logger.info(f"Document added: {len(chunks)} chunks with embeddings")
-            except Exception as e:
-                default_logger.error(f"Failed to compute embeddings for new document: {e}")
+    def _dedup_chunks(self, chunks: List[str], doc_id: Any) -> List[tuple]:
+        """对分块去重
+
+        重复分块只追加来源引用，不再重复计算 embedding。
+
+        Returns:
+            List[tuple]: 需要新入库的 (chunk_id, chunk, doc_id) 列表
+        """
+        new_chunks = []
+        for chunk in chunks:
+            if self.deduplicator is None:
+                new_chunks.append((len(self._chunks) + len(new_chunks), chunk, doc_id))
+                continue
+
+            dup_id = self.deduplicator.find_duplicate(chunk)
+            if dup_id is None:
+                chunk_id = len(self._chunks) + len(new_chunks)
+                self.deduplicator.register(chunk, chunk_id)
+                new_chunks.append((chunk_id, chunk, doc_id))
+            elif dup_id < len(self._chunk_sources):
+                if doc_id not in self._chunk_sources[dup_id]:
+                    self._chunk_sources[dup_id].append(doc_id)
+            # 与本批次中尚未入库的分块重复：来源相同，无需处理
+        return new_chunks
+
+    def _register_chunks(self, new_chunks: List[tuple]):
+        """将去重后的分块写入索引"""
+        for _, chunk, doc_id in new_chunks:
+            self._chunks.append(chunk)
+            self._chunk_sources.append([doc_id])
+
+    def add_document(self, document: str, doc_id: Any = None):
+        """添加文档
+
+        Args:
+            document: 文档内容
+            doc_id: 文档ID（默认自动分配）
+        """
+        if doc_id is None:
+            doc_id = self._allocate_doc_id()
+        self._ingest_chunks(self._split(document), doc_id)
+
+    def add_stream(self, texts: Iterable[str], doc_id: Any = None) -> int:
+        """流式添加文档
+
+        接收文本片段迭代器（如 FileReader.iter_chunks 的输出），边分块边入库，
+        每攒满一个 embedding 批次就计算一次，不需要把整篇文档读入内存。
+
+        Returns:
+            int: 新增的唯一分块数
+        """
+        if doc_id is None:
+            doc_id = self._allocate_doc_id()
+
+        batch_size = getattr(self.embedding_service, "MAX_BATCH_SIZE", 100)
+        added = 0
+        batch = []
+        for chunk in TextSplitter.split_stream(texts, chunk_size=self.chunk_size, overlap=self.chunk_overlap):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                added += self._ingest_chunks(batch, doc_id)
+                batch = []
+        if batch:
+            added += self._ingest_chunks(batch, doc_id)
+        return added
+
+    def add_file(self, file_path: str, doc_id: Any = None, encoding: str = "utf-8", use_mmap: bool = False) -> int:
+        """流式读取文件并入库（适用于大文件）
+
+        Returns:
+            int: 新增的唯一分块数
+        """
+        texts = FileReader.iter_chunks(file_path, encoding=encoding, use_mmap=use_mmap)
+        return self.add_stream(texts, doc_id=doc_id if doc_id is not None else file_path)
+
+    def _ingest_chunks(self, chunks: List[str], doc_id: Any) -> int:
+        """去重、计算 embedding 并写入索引，返回新增的唯一分块数"""
+        if not chunks:
+            return 0
+
+        new_chunks = self._dedup_chunks(chunks, doc_id)
+        if not new_chunks:
+            default_logger.info(f"Document added: all {len(chunks)} chunks were duplicates")
+            return 0
+
+        # 仅对新的唯一分块计算 embeddings
+        try:
+            embeddings = self._embed_chunks([chunk for _, chunk, _ in new_chunks])
+            self._register_chunks(new_chunks)
+            self._chunk_embeddings.extend(embeddings)
+            default_logger.info(
+                f"Document added: {len(new_chunks)} new chunks with embeddings, "
+                f"{len(chunks) - len(new_chunks)} duplicates merged"
+            )
+            return len(new_chunks)
+        except Exception as e:
+            if self.deduplicator is not None:
+                for chunk_id, _, _ in new_chunks:
+                    self.deduplicator.unregister(chunk_id)
+            default_logger.error(f"Failed to compute embeddings for new document: {e}")
+            return 0
 
     def retrieve(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
         """检索相关文档
@@ -71,7 +211,7 @@ class RAGService:
         if not self._chunk_embeddings or len(self._chunk_embeddings) != len(self._chunks):
             # 如果没有预计算的 embeddings，回退到逐个计算（性能较差）
             default_logger.warning("No pre-computed embeddings found, falling back to on-the-fly computation")
-            self._chunk_embeddings = self.embedding_service.embed_batch(self._chunks)
+            self._chunk_embeddings = self._embed_chunks(self._chunks)
 
         k = top_k or self.top_k
 
@@ -94,7 +234,8 @@ class RAGService:
             results.append({
                 "chunk": self._chunks[idx],
                 "score": score,
-                "index": idx
+                "index": idx,
+                "sources": list(self._chunk_sources[idx]) if idx < len(self._chunk_sources) else []
             })
 
         return results
@@ -110,19 +251,10 @@ class RAGService:
 
         return dot_product / (magnitude1 * magnitude2)
 
-    def query(self, query: str) -> str:
-        """RAG查询"""
-        # 检索相关文档
-        retrieved = self.retrieve(query)
-
-        if not retrieved:
-            return "抱歉，知识库中没有找到相关信息。"
-
-        # 构建上下文
+    def build_prompt(self, query: str, retrieved: List[Dict]) -> str:
+        """根据检索结果构建提示词"""
         context = "\n\n".join([item["chunk"] for item in retrieved])
-
-        # 构建提示词
-        prompt = f"""根据以下知识库内容回答用户的问题。如果知识库中没有相关信息，请如实说明。
+        return f"""根据以下知识库内容回答用户的问题。如果知识库中没有相关信息，请如实说明。
 
 知识库内容：
 {context}
@@ -131,10 +263,33 @@ class RAGService:
 
 回答："""
 
+    def query(self, query: str) -> str:
+        """RAG查询"""
+        # 检索相关文档
+        retrieved = self.retrieve(query)
+
+        if not retrieved:
+            return self.NO_RESULT_ANSWER
+
         # 调用LLM
-        response = self.chat_service.chat(prompt)
+        response = self.chat_service.chat(self.build_prompt(query, retrieved))
 
         return response.content
 
+    def stream_query(self, query: str, retrieved: Optional[List[Dict]] = None, **kwargs):
+        """流式RAG查询，逐段产出回答文本
+
+        Args:
+            query: 问题
+            retrieved: 已检索的结果（为空时重新检索）
+            **kwargs: 透传给 ChatService.stream_chat（如 cancel_token）
+        """
+        if retrieved is None:
+            retrieved = self.retrieve(query)
+        if not retrieved:
+            yield self.NO_RESULT_ANSWER
+            return
+        yield from self.chat_service.stream_chat(self.build_prompt(query, retrieved), **kwargs)
+
 
 __all__ = ["RAGService"]
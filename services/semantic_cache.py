@@ -0,0 +1,310 @@
+"""语义缓存模块
+
+对首轮（无上下文）问题做向量化，在缓存中查找语义相近的历史问题，
+相似度超过阈值时直接返回缓存的回答，省去一次完整的 LLM 调用。
+例如 "怎么交物业费" 与 "物业费在哪里缴纳" 可命中同一条缓存。
+
+已安装 numpy 时条目向量按行存放在预分配的矩阵中，一次矩阵乘法算出全部相似度；
+新条目追加到矩阵末尾，删除的行清零留空，空行过半时才压缩重建，相似度计算在锁外进行。
+"""
+import heapq
+import itertools
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .embedding_service import EmbeddingService
+from utils import default_logger, default_metrics
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+@dataclass
+class SemanticCacheEntry:
+    """语义缓存条目"""
+    question: str
+    answer: str
+    vector: Any  # 单位向量（安装 numpy 时为 float32 数组，否则为 List[float]）
+    expire_at: float
+    last_hit_at: float
+    hits: int = 0
+    row: int = -1  # 在向量矩阵中的行号
+
+
+class SemanticCache:
+    """语义缓存
+
+    Args:
+        embedding_service: 向量化服务
+        threshold: 命中的余弦相似度阈值
+        max_entries: 最大条目数（超出时淘汰最久未命中的条目）
+        default_ttl: 默认过期时间（秒）
+        name: 指标标签
+    """
+
+    # 向量矩阵的最小预分配行数
+    MIN_CAPACITY = 64
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService = None,
+        threshold: float = 0.92,
+        max_entries: int = 1000,
+        default_ttl: int = 3600,
+        name: str = "default"
+    ):
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.name = name
+        # 规范化问题 -> 条目，按最近命中排序（最久未命中的在最前）
+        self._entries: "OrderedDict[str, SemanticCacheEntry]" = OrderedDict()
+        # 过期时间小顶堆，已被替换或删除的条目弹出时跳过
+        self._expiry: List[Tuple[float, int, str, SemanticCacheEntry]] = []
+        self._seq = itertools.count()
+        # _rows[i] 对应矩阵第 i 行，删除的行为 None；只追加不移动，
+        # 查找在锁外使用的 (行列表, 矩阵, 行数) 快照不受之后写入的影响
+        self._rows: List[Optional[SemanticCacheEntry]] = []
+        self._matrix: Any = None
+        self._dead = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._saved_ms = 0.0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化问题文本（去空白和句末标点）"""
+        return re.sub(r"[\s？?。！!，,]+$", "", re.sub(r"\s+", "", text))
+
+    @staticmethod
+    def _unit(vector: List[float]) -> Any:
+        if HAS_NUMPY:
+            array = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(array))
+            return array / norm if norm else array
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed(self, question: str) -> Any:
+        """问题的单位向量，向量化失败时返回 None"""
+        try:
+            return self._unit(self.embedding_service.embed(question))
+        except Exception as e:
+            default_logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    def _append_row(self, entry: SemanticCacheEntry):
+        """条目向量追加到矩阵末尾（需持有锁）；容量不足时换用两倍大小的新矩阵"""
+        entry.row = len(self._rows)
+        self._rows.append(entry)
+        if not HAS_NUMPY:
+            return
+        if self._matrix is None or entry.row >= len(self._matrix):
+            matrix = np.zeros((max(self.MIN_CAPACITY, 2 * entry.row), len(entry.vector)), dtype=np.float32)
+            if self._matrix is not None:
+                matrix[:entry.row] = self._matrix[:entry.row]
+            self._matrix = matrix
+        self._matrix[entry.row] = entry.vector
+
+    def _remove(self, key: str):
+        """删除条目（需持有锁）：矩阵行清零留空，不移动其它行"""
+        entry = self._entries.pop(key)
+        self._rows[entry.row] = None
+        if self._matrix is not None:
+            self._matrix[entry.row] = 0
+        self._dead += 1
+
+    def _compact(self):
+        """空行过半时重建矩阵，失效的过期记录过多时重建过期堆（需持有锁）"""
+        if self._dead > len(self._rows) // 2:
+            live = list(self._entries.values())
+            for row, entry in enumerate(live):
+                entry.row = row
+            self._rows = live
+            self._matrix = np.stack([e.vector for e in live]) if HAS_NUMPY and live else None
+            self._dead = 0
+        if len(self._expiry) > 2 * len(self._entries) + self.MIN_CAPACITY:
+            self._expiry = [item for item in self._expiry if self._entries.get(item[2]) is item[3]]
+            heapq.heapify(self._expiry)
+
+    def _purge_expired(self, now: float):
+        expiry = self._expiry
+        removed = False
+        while expiry and expiry[0][0] <= now:
+            _, _, key, entry = heapq.heappop(expiry)
+            if self._entries.get(key) is entry:
+                self._remove(key)
+                removed = True
+        if removed:
+            self._compact()
+
+    @staticmethod
+    def _best(
+        vector: Any,
+        rows: List[Optional[SemanticCacheEntry]],
+        matrix: Any,
+        size: int
+    ) -> Tuple[Optional[SemanticCacheEntry], float]:
+        """前 size 行中相似度最高的条目及其分数（对应的条目可能已被删除，为 None）"""
+        if matrix is not None:
+            scores = matrix[:size] @ vector
+            index = int(scores.argmax())
+            return rows[index], float(scores[index])
+        best, best_score = None, 0.0
+        for entry in itertools.islice(rows, size):
+            if entry is None:
+                continue
+            score = sum(a * b for a, b in zip(vector, entry.vector))
+            if score > best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """查找语义相近的缓存回答
+
+        Returns:
+            Dict: {"answer", "question", "score"}，未命中返回 None
+        """
+        return self.lookup_with_vector(question)[0]
+
+    def lookup_with_vector(self, question: str) -> Tuple[Optional[Dict], Any]:
+        """查找语义相近的缓存回答，同时返回查找时算出的问题向量
+
+        未命中后写入缓存时把向量传给 store()，避免再次向量化；
+        精确命中或缓存为空时不做向量化，向量为 None。
+
+        Returns:
+            Tuple: (lookup() 的结果, 问题向量)
+        """
+        now = time.time()
+        key = self.normalize(question)
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._hit(key, entry, 1.0, now), None
+            if not self._entries:
+                return self._miss(), None
+
+        vector = self.embed(question)
+        if vector is None:
+            return None, None
+
+        with self._lock:
+            rows, matrix, size = self._rows, self._matrix, len(self._rows)
+        best, best_score = self._best(vector, rows, matrix, size) if size else (None, 0.0)
+
+        with self._lock:
+            # 计算期间条目可能已被淘汰或失效
+            if best is not None and best_score >= self.threshold:
+                best_key = self.normalize(best.question)
+                if self._entries.get(best_key) is best:
+                    return self._hit(best_key, best, best_score, now), vector
+            return self._miss(), vector
+
+    def _miss(self) -> None:
+        self._misses += 1
+        default_metrics.inc("semantic_cache_misses", cache=self.name)
+        return None
+
+    def _hit(self, key: str, entry: SemanticCacheEntry, score: float, now: float) -> Dict:
+        entry.hits += 1
+        entry.last_hit_at = now
+        self._entries.move_to_end(key)
+        self._hits += 1
+        default_metrics.inc("semantic_cache_hits", cache=self.name)
+        return {"answer": entry.answer, "question": entry.question, "score": score}
+
+    def store(self, question: str, answer: str, ttl: int = None, vector: Any = None):
+        """写入缓存
+
+        Args:
+            vector: lookup_with_vector() 返回的问题向量，为 None 时重新向量化
+        """
+        if vector is None:
+            vector = self.embed(question)
+            if vector is None:
+                return
+
+        now = time.time()
+        entry = SemanticCacheEntry(
+            question=question,
+            answer=answer,
+            vector=vector,
+            expire_at=now + (ttl or self.default_ttl),
+            last_hit_at=now
+        )
+        key = self.normalize(question)
+        with self._lock:
+            self._purge_expired(now)
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = entry
+            self._append_row(entry)
+            heapq.heappush(self._expiry, (entry.expire_at, next(self._seq), key, entry))
+            self._compact()
+
+    def invalidate(
+        self,
+        question: str = None,
+        predicate: Callable[[SemanticCacheEntry], bool] = None
+    ) -> int:
+        """手动失效缓存
+
+        Args:
+            question: 失效与该问题完全相同的条目
+            predicate: 失效满足条件的条目（如回答中包含已变更的电话号码）
+
+        Returns:
+            int: 失效的条目数
+        """
+        with self._lock:
+            key = self.normalize(question) if question else None
+            keys = [
+                k for k, e in self._entries.items()
+                if (key and k == key) or (predicate and predicate(e))
+            ]
+            for k in keys:
+                self._remove(k)
+            self._compact()
+            return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._expiry = []
+            self._rows = []
+            self._matrix = None
+            self._dead = 0
+
+    def record_saved_latency(self, saved_ms: float):
+        """记录命中节省的时延"""
+        with self._lock:
+            self._saved_ms += saved_ms
+        default_metrics.observe("semantic_cache_latency_saved_ms", saved_ms, cache=self.name)
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        total = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else 0.0,
+            "latency_saved_ms": self._saved_ms,
+        }
+
+
+__all__ = ["HAS_NUMPY", "SemanticCache", "SemanticCacheEntry"]
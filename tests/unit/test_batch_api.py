@@ -0,0 +1,218 @@
+"""Provider 批处理接口单元测试（本地批处理服务替身）"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from core.batch_api import BatchAPIClient, BatchJobError
+from core.openai_compatible_client import OpenAICompatibleClient
+from scenarios import WorkOrderAIService
+
+
+class _BatchState:
+    """替身服务的文件和任务存储"""
+
+    def __init__(self, polls_until_done=2, fail_ids=(), status="completed", processed=None):
+        self.files = {}
+        self.batches = {}
+        self.polls = {}
+        self.polls_until_done = polls_until_done
+        self.fail_ids = set(fail_ids)
+        self.final_status = status
+        # 任务过期/取消前处理完的请求数（为空全部处理）
+        self.processed = processed
+        self.uploads = []
+        self.created = []
+        self.auth = set()
+
+
+def _completion(content):
+    return {
+        "id": "chatcmpl-batch",
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def _make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _json(self, data, status=200):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            state.auth.add(self.headers.get("Authorization"))
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path == "/v1/files":
+                # 只取 multipart 中的 JSONL 内容
+                lines = [json.loads(line) for line in re.findall(rb'^\{"custom_id".*$', body, re.M)]
+                assert b'name="purpose"' in body and b"batch" in body
+                file_id = f"file-{len(state.files)}"
+                state.files[file_id] = lines
+                state.uploads.append(lines)
+                return self._json({"id": file_id, "object": "file", "purpose": "batch"})
+            if self.path == "/v1/batches":
+                payload = json.loads(body)
+                state.created.append(payload)
+                batch_id = f"batch_{len(state.batches)}"
+                state.batches[batch_id] = payload
+                state.polls[batch_id] = 0
+                return self._json({"id": batch_id, "status": "validating", "input_file_id": payload["input_file_id"]})
+            self._json({"error": {"message": "not found"}}, 404)
+
+        def do_GET(self):
+            match = re.fullmatch(r"/v1/batches/(\w+)", self.path)
+            if match:
+                batch_id = match.group(1)
+                state.polls[batch_id] += 1
+                if state.polls[batch_id] < state.polls_until_done:
+                    return self._json({"id": batch_id, "status": "in_progress"})
+                return self._json(self._finish(batch_id))
+            match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+            if match:
+                data = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in state.files[match.group(1)])
+                body = data.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self._json({"error": {"message": "not found"}}, 404)
+
+        def _finish(self, batch_id):
+            if state.final_status == "failed":
+                return {"id": batch_id, "status": "failed", "errors": {"data": [{"message": "invalid model"}]}}
+            requests = state.files[state.batches[batch_id]["input_file_id"]]
+            output, errors = [], []
+            for request in requests[:state.processed]:
+                custom_id = request["custom_id"]
+                if custom_id in state.fail_ids:
+                    errors.append({"custom_id": custom_id, "response": {
+                        "status_code": 400, "body": {"error": {"message": "content filtered"}}
+                    }, "error": None})
+                    continue
+                content = request["body"]["messages"][-1]["content"].split("\n", 1)[1]
+                answer = json.dumps({"type": "维修", "urgency": "中", "content": content}, ensure_ascii=False)
+                output.append({"custom_id": custom_id, "response": {"status_code": 200, "body": _completion(answer)},
+                               "error": None})
+            state.files[f"out-{batch_id}"] = output
+            state.files[f"err-{batch_id}"] = errors
+            return {
+                "id": batch_id, "status": state.final_status,
+                "output_file_id": f"out-{batch_id}", "error_file_id": f"err-{batch_id}" if errors else None,
+                "request_counts": {"total": len(requests), "completed": len(output), "failed": len(errors)},
+            }
+
+    return Handler
+
+
+@pytest.fixture
+def batch_server():
+    servers = []
+
+    def start(**kwargs):
+        state = _BatchState(**kwargs)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(state))
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        client = OpenAICompatibleClient(
+            "qwen-plus", provider="qianwen", api_key="sk-batch",
+            base_url=f"http://127.0.0.1:{server.server_port}/v1", concurrency_limiter=None
+        )
+        return state, BatchAPIClient(client, poll_interval=0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _service():
+    return WorkOrderAIService.__new__(WorkOrderAIService)
+
+
+class TestBatchAPIClient:
+    """批处理接口客户端测试"""
+
+    def test_submit_poll_and_map_results(self, batch_server):
+        state, client = batch_server(polls_until_done=3)
+        messages = [{"role": "user", "content": "请分析以下工单：\n漏水"}]
+
+        job = client.submit([("WO-1", messages)], temperature=0.3, max_tokens=256)
+        assert job.status == "validating"
+        assert state.created[0]["endpoint"] == "/v1/chat/completions"
+        assert state.created[0]["completion_window"] == "24h"
+        line = state.uploads[0][0]
+        assert line["custom_id"] == "WO-1" and line["method"] == "POST" and line["url"] == "/v1/chat/completions"
+        assert line["body"]["model"] == "qwen-plus" and line["body"]["max_tokens"] == 256
+
+        sleeps = []
+        finished = client.wait(job.id, sleep=sleeps.append)
+        assert finished.status == "completed"
+        assert len(sleeps) == 2
+
+        result = client.results(finished)["WO-1"]
+        assert result.success
+        assert result.response.usage["total_tokens"] == 15
+        assert state.auth == {"Bearer sk-batch"}
+
+    def test_failed_batch_raises(self, batch_server):
+        _, client = batch_server(polls_until_done=1, status="failed")
+        job = client.wait(client.submit([("1", [{"role": "user", "content": "x\ny"}])]).id)
+        with pytest.raises(BatchJobError, match="invalid model"):
+            client.results(job)
+
+    def test_wait_times_out(self, batch_server):
+        _, client = batch_server(polls_until_done=100)
+        client.poll_interval = 0.05
+        job = client.submit([("1", [{"role": "user", "content": "x\ny"}])])
+        with pytest.raises(BatchJobError, match="still in_progress"):
+            client.wait(job.id, max_wait=0.1, sleep=lambda seconds: None)
+
+    def test_empty_batch_rejected(self, batch_server):
+        _, client = batch_server()
+        with pytest.raises(ValueError):
+            client.submit([])
+
+
+class TestWorkOrderOffline:
+    """工单离线批处理测试"""
+
+    def test_results_mapped_back_to_work_order_ids(self, batch_server):
+        state, client = batch_server(fail_ids={"WO-2"})
+        service = _service()
+
+        job = service.submit_offline([("WO-1", "3栋水管漏水"), ("WO-2", "违规内容"), ("WO-3", "电梯异响")], client)
+        body = state.uploads[0][0]["body"]
+        assert body["messages"][0]["role"] == "system"
+        # 千问只支持 JSON 模式，输出结构约束按能力降级
+        assert body["response_format"] == {"type": "json_object"}
+        assert state.created[0]["metadata"] == {"scenario": "work_order_ai"}
+
+        results = {r["id"]: r for r in service.collect_offline(job.id, client)}
+        assert set(results) == {"WO-1", "WO-2", "WO-3"}
+        assert results["WO-1"]["result"]["content"] == "3栋水管漏水"
+        assert results["WO-3"]["finish_reason"] == "stop"
+        assert results["WO-2"] == {"id": "WO-2", "success": False, "error": "content filtered"}
+
+    def test_missing_ids_reported_for_expired_batch(self, batch_server):
+        _, client = batch_server(status="expired", processed=1)
+        service = _service()
+
+        job = service.submit_offline([("WO-1", "3栋水管漏水"), ("WO-2", "电梯异响"), ("WO-3", "门禁失灵")], client)
+        assert job.custom_ids == ["WO-1", "WO-2", "WO-3"]
+
+        results = {r["id"]: r for r in service.collect_offline(job.id, client, ids=job.custom_ids)}
+        assert results["WO-1"]["success"]
+        for item_id in ("WO-2", "WO-3"):
+            assert results[item_id]["success"] is False
+            assert results[item_id]["batch_status"] == "expired"
+            assert "expired" in results[item_id]["error"]
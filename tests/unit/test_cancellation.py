@@ -0,0 +1,191 @@
+"""流式请求取消单元测试"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from core.cancellation import CancellationToken
+from core.openai_compatible_client import OpenAICompatibleClient
+from utils.metrics import default_metrics
+
+
+class TestCancellationToken:
+    """取消令牌测试"""
+
+    def test_callbacks_run_once(self):
+        token = CancellationToken()
+        calls = []
+        token.register(lambda: calls.append(1))
+        token.cancel()
+        token.cancel()
+        assert token.cancelled
+        assert calls == [1]
+
+    def test_register_after_cancel_runs_immediately(self):
+        token = CancellationToken()
+        token.cancel()
+        calls = []
+        token.register(lambda: calls.append(1))
+        assert calls == [1]
+
+    def test_unregister(self):
+        token = CancellationToken()
+        calls = []
+        unregister = token.register(lambda: calls.append(1))
+        unregister()
+        token.cancel()
+        assert calls == []
+
+    def test_failing_callback_does_not_block_others(self):
+        token = CancellationToken()
+        calls = []
+        token.register(lambda: 1 / 0)
+        token.register(lambda: calls.append(1))
+        token.cancel()
+        assert calls == [1]
+
+
+class _SlowSSEHandler(BaseHTTPRequestHandler):
+    """每 50ms 输出一个片段，记录连接是否被客户端提前关闭"""
+
+    protocol_version = "HTTP/1.1"
+    chunks = 40
+    stall_after = None
+    finished = threading.Event()
+    aborted = threading.Event()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(self.chunks):
+                self._write_chunk(f'data: {{"choices": [{{"delta": {{"content": "t{i}"}}}}]}}\n\n'.encode())
+                time.sleep(3 if i == self.stall_after else 0.05)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+            self.finished.set()
+        except (BrokenPipeError, ConnectionResetError):
+            self.aborted.set()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sse_server():
+    _SlowSSEHandler.finished.clear()
+    _SlowSSEHandler.aborted.clear()
+    _SlowSSEHandler.stall_after = None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowSSEHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestStreamCancellation:
+    """上游流取消测试"""
+
+    def _client(self, base_url):
+        return OpenAICompatibleClient(
+            "test-model", provider="cancel-test", api_key="sk-test", base_url=base_url,
+            concurrency_limiter=None
+        )
+
+    def test_cancel_closes_upstream(self, sse_server):
+        token = CancellationToken()
+        client = self._client(sse_server)
+        before = default_metrics.get_counter("llm_stream_cancelled", provider="cancel-test", model="test-model")
+        stream = client.stream_chat([{"role": "user", "content": "hi"}], cancel_token=token)
+        received = [next(stream), next(stream)]
+
+        # 模拟客户端断开：另一个线程取消，阻塞中的读取随之结束
+        threading.Timer(0.02, token.cancel).start()
+        received.extend(stream)
+
+        assert received[:2] == ["t0", "t1"]
+        assert len(received) < 10
+        assert _SlowSSEHandler.aborted.wait(timeout=3)
+        assert not _SlowSSEHandler.finished.is_set()
+        after = default_metrics.get_counter("llm_stream_cancelled", provider="cancel-test", model="test-model")
+        assert after == before + 1
+
+    def test_cancel_interrupts_blocked_read(self, sse_server):
+        _SlowSSEHandler.stall_after = 0
+        token = CancellationToken()
+        stream = self._client(sse_server).stream_chat([{"role": "user", "content": "hi"}], cancel_token=token)
+        assert next(stream) == "t0"
+        threading.Timer(0.05, token.cancel).start()
+        start = time.monotonic()
+        assert list(stream) == []
+        assert time.monotonic() - start < 1
+
+    def test_cancelled_before_request(self, sse_server):
+        token = CancellationToken()
+        token.cancel()
+        assert list(self._client(sse_server).stream_chat([], cancel_token=token)) == []
+
+    def test_close_generator_closes_upstream(self, sse_server):
+        stream = self._client(sse_server).stream_chat([{"role": "user", "content": "hi"}])
+        assert next(stream) == "t0"
+        stream.close()
+        assert _SlowSSEHandler.aborted.wait(timeout=3)
+
+
+class _FakeRequest:
+    """模拟客户端在收到若干片段后断开"""
+
+    def __init__(self, disconnect_after: int):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        self.polls += 1
+        return self.polls > self.disconnect_after
+
+
+class TestEndpointDisconnect:
+    """流式接口断开检测测试"""
+
+    def test_disconnect_cancels_token_and_closes_stream(self):
+        import asyncio
+        from api.main import _iterate_until_disconnect
+
+        closed = []
+
+        def stream():
+            try:
+                for i in range(100):
+                    yield i
+            finally:
+                closed.append(True)
+
+        token = CancellationToken()
+        before = default_metrics.get_counter("stream_client_disconnects", endpoint="test")
+
+        async def consume():
+            return [c async for c in _iterate_until_disconnect(_FakeRequest(3), stream(), token, "test")]
+
+        assert asyncio.run(consume()) == [0, 1, 2]
+        assert token.cancelled
+        assert closed == [True]
+        assert default_metrics.get_counter("stream_client_disconnects", endpoint="test") == before + 1
+
+    def test_completed_stream_is_not_cancelled(self):
+        import asyncio
+        from api.main import _iterate_until_disconnect
+
+        token = CancellationToken()
+
+        async def consume():
+            return [c async for c in _iterate_until_disconnect(_FakeRequest(100), iter("abc"), token, "test")]
+
+        assert asyncio.run(consume()) == ["a", "b", "c"]
+        assert not token.cancelled
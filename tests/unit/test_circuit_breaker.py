@@ -0,0 +1,197 @@
+"""熔断与降级单元测试"""
+import asyncio
+import pytest
+import requests
+from core import BaseLLMClient, LLMResponse
+from core.circuit_breaker import (
+    CLOSED, OPEN, HALF_OPEN, CircuitBreaker, CircuitBreakerLLMClient, CircuitOpenError
+)
+from core.errors import classify_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class FlakyClient(BaseLLMClient):
+    """按预设抛出异常的本地客户端"""
+
+    def __init__(self, name, error=None):
+        super().__init__(model=name, api_key="test")
+        self.error = error
+        self.calls = 0
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return LLMResponse(content=self.model, model=self.model, usage={}, raw_response={})
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        yield self.model
+
+
+class HangingClient(FlakyClient):
+    """异步请求一直挂起的本地客户端"""
+
+    async def achat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        await asyncio.Event().wait()
+
+
+MESSAGES = [{"role": "user", "content": "电梯故障"}]
+
+
+def _breaker(clock, **kwargs):
+    options = dict(min_requests=4, failure_rate_threshold=0.5, open_seconds=10, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+class TestClassifyError:
+    """错误分类测试"""
+
+    def test_status_codes(self):
+        assert classify_error(_http_error(503)) == "server"
+        assert classify_error(_http_error(429)) == "rate_limit"
+        assert classify_error(_http_error(400)) == "client"
+
+    def test_transport_errors(self):
+        assert classify_error(requests.Timeout()) == "timeout"
+        assert classify_error(requests.ConnectionError()) == "connection"
+
+
+class TestCircuitBreaker:
+    """熔断器状态测试"""
+
+    def test_opens_on_failure_rate(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+
+    def test_opens_on_timeout_rate(self):
+        breaker = _breaker(FakeClock(), timeout_rate_threshold=0.25, failure_rate_threshold=0.9)
+        for _ in range(3):
+            breaker.record_success()
+        breaker.record_failure(timeout=True)
+        assert breaker.state == OPEN
+
+    def test_half_open_probe(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_requests=1)
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_failure_reopens(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_requests=1)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+    def test_old_outcomes_leave_window(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, window_seconds=5)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 10
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+
+class TestCircuitBreakerLLMClient:
+    """熔断降级客户端测试"""
+
+    def test_falls_back_on_server_error(self):
+        primary = FlakyClient("primary", error=_http_error(502))
+        fallback = FlakyClient("fallback")
+        client = CircuitBreakerLLMClient(
+            primary, fallbacks=[fallback], breaker=_breaker(FakeClock(), min_requests=2)
+        )
+        assert client.chat(MESSAGES).content == "fallback"
+        assert client.chat(MESSAGES).content == "fallback"
+        # 熔断打开后不再调用主客户端
+        assert client.breaker.state == OPEN
+        assert client.chat(MESSAGES).content == "fallback"
+        assert primary.calls == 2
+
+    def test_client_error_not_retried(self):
+        primary = FlakyClient("primary", error=_http_error(400))
+        fallback = FlakyClient("fallback")
+        client = CircuitBreakerLLMClient(primary, fallbacks=[fallback], breaker=_breaker(FakeClock()))
+        with pytest.raises(requests.HTTPError):
+            client.chat(MESSAGES)
+        assert fallback.calls == 0
+        assert client.breaker.stats()["window_requests"] == 0
+
+    def test_open_without_fallback_fails_fast(self):
+        primary = FlakyClient("primary", error=requests.Timeout())
+        client = CircuitBreakerLLMClient(primary, breaker=_breaker(FakeClock(), min_requests=1))
+        with pytest.raises(requests.Timeout):
+            client.chat(MESSAGES)
+        with pytest.raises(CircuitOpenError):
+            client.chat(MESSAGES)
+        assert primary.calls == 1
+
+    def test_stream_falls_back_before_first_chunk(self):
+        primary = FlakyClient("primary", error=requests.ConnectionError())
+        client = CircuitBreakerLLMClient(
+            primary, fallbacks=[FlakyClient("fallback")], breaker=_breaker(FakeClock())
+        )
+        assert list(client.stream_chat(MESSAGES)) == ["fallback"]
+
+    def _half_open(self, primary):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_requests=1)
+        breaker.record_failure()
+        clock.now = 10
+        return CircuitBreakerLLMClient(primary, breaker=breaker)
+
+    def test_cancelled_probe_releases_slot(self):
+        client = self._half_open(HangingClient("primary"))
+
+        async def run():
+            task = asyncio.ensure_future(client.achat(MESSAGES))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        # 探测名额已归还，下一个请求仍可作为探测放行
+        assert client.breaker.state == HALF_OPEN
+        assert client.breaker.allow_request()
+
+    def test_stream_closed_early_after_first_chunk_counts_success(self):
+        client = self._half_open(FlakyClient("primary"))
+        stream = client.stream_chat(MESSAGES)
+        assert next(stream) == "primary"
+        stream.close()
+        assert client.breaker.state == CLOSED
@@ -0,0 +1,190 @@
+"""自适应并发限制单元测试"""
+import asyncio
+import random
+import threading
+import time
+import pytest
+import requests
+from core.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from core.openai_compatible_client import OpenAICompatibleClient
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """AIMD 并发限制测试"""
+
+    def test_additive_increase_near_baseline(self):
+        limiter = AdaptiveConcurrencyLimiter("inc", initial_limit=4)
+        for _ in range(40):
+            limiter.acquire()
+            limiter.release(latency=0.1)
+        assert limiter.limit > 4
+
+    def test_multiplicative_decrease_on_latency(self):
+        limiter = AdaptiveConcurrencyLimiter("lat", initial_limit=10, tolerance=2.0, backoff=0.5, min_samples=1)
+        limiter.acquire()
+        limiter.release(latency=0.1, size=100)
+        limiter.acquire()
+        limiter.release(latency=0.5, size=100)
+        assert limiter.limit == 5
+
+    def test_healthy_provider_with_mixed_lengths_keeps_limit(self):
+        # 首 token 约 1 秒、每 token 20 毫秒，回答长度 20~2000 token：不应被判为过载
+        limiter = AdaptiveConcurrencyLimiter("mixed", initial_limit=20)
+        rng = random.Random(7)
+        for _ in range(500):
+            size = rng.randint(20, 2000)
+            limiter.acquire()
+            limiter.release(latency=rng.uniform(0.9, 1.1) + size * 0.02, size=size)
+        assert limiter.limit >= 20
+
+    def test_latency_compared_within_length_bucket(self):
+        limiter = AdaptiveConcurrencyLimiter("bucket", initial_limit=10, backoff=0.5, min_samples=1)
+        limiter.acquire()
+        limiter.release(latency=1.2, size=10)
+        # 长回答耗时更久但属于另一长度档，不触发收紧
+        limiter.acquire()
+        limiter.release(latency=20.0, size=1000)
+        assert limiter.limit >= 10
+        assert limiter.baseline(12) == 1.2
+
+    def test_decrease_on_overload(self):
+        limiter = AdaptiveConcurrencyLimiter("err", initial_limit=10, backoff=0.5, min_limit=2)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(overloaded=True)
+        assert limiter.limit == 2
+
+    def test_concurrent_overloads_decrease_once(self):
+        limiter = AdaptiveConcurrencyLimiter("burst", initial_limit=20, backoff=0.7)
+        tickets = [limiter.acquire() for _ in range(20)]
+        for ticket in tickets:
+            limiter.release(overloaded=True, ticket=ticket)
+        # 同一波 429 只减一次
+        assert limiter.limit == 14
+        # 减小之后发出的请求再过载时继续减
+        limiter.release(overloaded=True, ticket=limiter.acquire())
+        assert limiter.limit == 9
+
+    def test_queue_until_release(self):
+        limiter = AdaptiveConcurrencyLimiter("queue", initial_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        time.sleep(0.05)
+        assert not acquired.is_set()
+        assert limiter.stats()["queued"] == 1
+        limiter.release(latency=0.1)
+        t.join(timeout=1)
+        assert acquired.is_set()
+        assert limiter.in_flight == 1
+
+    def test_shed_when_queue_full(self):
+        limiter = AdaptiveConcurrencyLimiter("shed", initial_limit=1, max_queue=0)
+        limiter.acquire()
+        with pytest.raises(ConcurrencyLimitExceeded):
+            limiter.acquire()
+
+    def test_shed_on_queue_timeout(self):
+        limiter = AdaptiveConcurrencyLimiter("timeout", initial_limit=1, queue_timeout=0.05)
+        limiter.acquire()
+        with pytest.raises(ConcurrencyLimitExceeded):
+            limiter.acquire()
+        assert limiter.stats()["queued"] == 0
+
+    def test_async_acquire(self):
+        limiter = AdaptiveConcurrencyLimiter("async", initial_limit=1, max_limit=1)
+        peak = []
+
+        async def call():
+            await limiter.aacquire()
+            peak.append(limiter.in_flight)
+            await asyncio.sleep(0.01)
+            limiter.release(latency=0.01)
+
+        async def main():
+            await asyncio.gather(*[call() for _ in range(4)])
+
+        asyncio.run(main())
+        assert max(peak) == 1
+        assert limiter.in_flight == 0
+
+
+class _Response:
+    def __init__(self, status=200, data=None):
+        self.status_code = status
+        self._data = data or {
+            "choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"completion_tokens": 10},
+        }
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+    def json(self):
+        return self._data
+
+
+class TestClientIntegration:
+    """OpenAICompatibleClient 接入测试"""
+
+    def _client(self, limiter):
+        return OpenAICompatibleClient(
+            "test-model", provider="test", api_key="sk-test", base_url="http://localhost",
+            concurrency_limiter=limiter
+        )
+
+    def test_success_releases_slot(self, monkeypatch):
+        limiter = AdaptiveConcurrencyLimiter("client-ok", initial_limit=2, min_samples=1)
+        monkeypatch.setattr("core.openai_compatible_client.requests.post", lambda *a, **k: _Response())
+        assert self._client(limiter).chat([{"role": "user", "content": "hi"}]).content == "ok"
+        assert limiter.in_flight == 0
+        assert limiter.baseline(10) is not None
+        assert limiter.baseline(1000) is None
+
+    def test_shed_is_not_retried(self):
+        from core.retry import RetryPolicy
+        policy = RetryPolicy(max_retries=3, base_delay=0, name="shed-test")
+        assert policy.next_delay(0, ConcurrencyLimitExceeded("full")) is None
+
+    def test_server_error_lowers_limit(self, monkeypatch):
+        limiter = AdaptiveConcurrencyLimiter("client-503", initial_limit=10, backoff=0.5)
+        monkeypatch.setattr("core.openai_compatible_client.requests.post", lambda *a, **k: _Response(503))
+        with pytest.raises(requests.HTTPError):
+            self._client(limiter).chat([{"role": "user", "content": "hi"}])
+        assert limiter.limit == 5
+        assert limiter.in_flight == 0
+
+    def test_concurrent_429_burst_lowers_limit_once(self, monkeypatch):
+        limiter = AdaptiveConcurrencyLimiter("client-429", initial_limit=20, backoff=0.7)
+        barrier = threading.Barrier(20)
+
+        def post(*args, **kwargs):
+            # 20 个请求都在途时一起收到 429
+            barrier.wait(timeout=1)
+            return _Response(429)
+
+        monkeypatch.setattr("core.openai_compatible_client.requests.post", post)
+        client = self._client(limiter)
+        errors = []
+
+        def call():
+            try:
+                client.chat([{"role": "user", "content": "hi"}])
+            except requests.HTTPError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=2)
+        assert len(errors) == 20
+        assert limiter.limit == 14
+        assert limiter.in_flight == 0
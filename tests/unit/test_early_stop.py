@@ -0,0 +1,178 @@
+"""结构化输出提前结束单元测试"""
+import pytest
+from core import BaseLLMClient, LLMResponse
+from core.early_stop import JSON_COMPLETE, JSONEarlyStopLLMClient
+from core.llm_client import StreamInfo
+from core.openai_compatible_client import OpenAICompatibleClient
+from core.response_cache import CachedLLMClient, ResponseCache
+from utils.metrics import default_metrics
+
+MESSAGES = [{"role": "user", "content": "请分析以下工单：3号楼停电"}]
+ANSWER = '{"type": "电力", "urgency": "high"}'
+TAIL = "\n\n说明：以上分析基于工单描述，" + "仅供参考。" * 20
+
+
+class StreamClient(BaseLLMClient):
+    """按片段输出并记录读取进度和关闭情况的本地客户端"""
+
+    def __init__(self, chunks, finish_reason="stop", usage=None):
+        super().__init__(model="test-model", api_key="test")
+        self.chunks = chunks
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.read = 0
+        self.calls = 0
+        self.closed = False
+        self.kwargs = None
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.kwargs = kwargs
+        return LLMResponse(content="".join(self.chunks), model=self.model, usage={}, raw_response={},
+                           finish_reason="stop")
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.kwargs = kwargs
+        self.calls += 1
+        try:
+            for chunk in self.chunks:
+                self.read += 1
+                yield chunk
+            info = kwargs.get("stream_info")
+            if info is not None:
+                info.finish_reason = self.finish_reason
+                info.usage = self.usage
+        finally:
+            self.closed = True
+
+
+def _split(text, size=5):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    default_metrics.reset()
+    yield
+    default_metrics.reset()
+
+
+class TestJSONEarlyStop:
+    """顶层 JSON 对象完成后提前结束测试"""
+
+    def test_stream_stops_at_closing_brace(self):
+        chunks = _split(ANSWER + TAIL)
+        inner = StreamClient(chunks)
+        client = JSONEarlyStopLLMClient(inner, scenario="work_order_ai")
+
+        output = "".join(client.stream_chat(MESSAGES, stop_on_json=True))
+
+        assert output == ANSWER
+        assert inner.closed
+        assert inner.read < len(chunks)
+        assert "stop_on_json" not in inner.kwargs
+        assert default_metrics.get_counter("llm_json_early_stop", scenario="work_order_ai") == 1
+        assert default_metrics.get_counter("llm_json_early_stop_dropped_tokens", scenario="work_order_ai") > 0
+        assert default_metrics.get_counter("llm_json_early_stop_saved_tokens", scenario="work_order_ai") > 0
+
+    def test_chat_reports_structural_completion(self):
+        inner = StreamClient(["好的，结果如下：\n", *_split(ANSWER + TAIL)])
+        client = JSONEarlyStopLLMClient(inner)
+
+        response = client.chat(MESSAGES, max_tokens=512, stop_on_json=True)
+
+        assert response.content == "好的，结果如下：\n" + ANSWER
+        assert response.finish_reason == JSON_COMPLETE
+        assert response.usage["completion_tokens"] > 0
+        assert inner.closed
+
+    def test_without_flag_passes_through(self):
+        inner = StreamClient(_split(ANSWER + TAIL))
+        client = JSONEarlyStopLLMClient(inner)
+
+        assert "".join(client.stream_chat(MESSAGES)) == ANSWER + TAIL
+        assert client.chat(MESSAGES).finish_reason == "stop"
+        assert default_metrics.get_counter("llm_json_early_stop", scenario="default") == 0
+
+    def test_unfinished_object_streams_to_end(self):
+        inner = StreamClient(_split('{"type": "电力", "urgency": "hi'))
+        client = JSONEarlyStopLLMClient(inner)
+
+        response = client.chat(MESSAGES, stop_on_json=True)
+
+        assert response.content == '{"type": "电力", "urgency": "hi'
+        assert response.finish_reason == "stop"
+        assert inner.read == len(inner.chunks)
+
+    def test_nested_braces_and_strings_do_not_stop_early(self):
+        answer = '{"key_info": {"location": "3栋"}, "suggestion": "检查 } 配电箱"}'
+        inner = StreamClient(_split(answer + TAIL, size=3))
+        client = JSONEarlyStopLLMClient(inner)
+
+        assert "".join(client.stream_chat(MESSAGES, stop_on_json=True)) == answer
+
+    def test_no_tail_keeps_upstream_finish_reason_and_usage(self):
+        usage = {"prompt_tokens": 30, "completion_tokens": 12, "total_tokens": 42}
+        inner = StreamClient(_split(ANSWER + "\n"), usage=usage)
+        client = JSONEarlyStopLLMClient(inner)
+
+        response = client.chat(MESSAGES, max_tokens=512, stop_on_json=True)
+
+        # 对象之后只有空白，没有截掉任何内容
+        assert response.content == ANSWER + "\n"
+        assert response.finish_reason == "stop"
+        assert response.usage == usage
+        assert inner.read == len(inner.chunks)
+        assert default_metrics.get_counter("llm_json_early_stop", scenario="default") == 0
+        assert default_metrics.get_counter("llm_json_early_stop_saved_tokens", scenario="default") == 0
+
+    def test_length_finish_reason_propagated(self):
+        inner = StreamClient(_split('{"type": "电力", "urgency": "hi'), finish_reason="length")
+        client = JSONEarlyStopLLMClient(inner)
+
+        info = StreamInfo()
+        "".join(client.stream_chat(MESSAGES, stop_on_json=True, stream_info=info))
+        assert info.finish_reason == "length"
+        assert client.chat(MESSAGES, stop_on_json=True).finish_reason == "length"
+
+    def test_tail_in_later_chunk_is_cut(self):
+        inner = StreamClient([ANSWER, "  ", "\n说明：", "仅供参考。"])
+        client = JSONEarlyStopLLMClient(inner)
+
+        info = StreamInfo()
+        output = "".join(client.stream_chat(MESSAGES, stop_on_json=True, stream_info=info))
+
+        assert output == ANSWER
+        assert info.finish_reason == JSON_COMPLETE
+        assert inner.read == 3
+
+    def test_complete_results_are_cached(self):
+        for chunks, expected_calls in ((_split(ANSWER), 1), (_split(ANSWER + TAIL), 1)):
+            inner = StreamClient(chunks)
+            client = CachedLLMClient(JSONEarlyStopLLMClient(inner), ResponseCache(max_temperature=0.3))
+            for _ in range(3):
+                assert client.chat(MESSAGES, temperature=0.1, stop_on_json=True).content == ANSWER
+            assert inner.calls == expected_calls
+
+    def test_truncated_result_not_cached(self):
+        inner = StreamClient(_split('{"type": "电力"'), finish_reason="length")
+        client = CachedLLMClient(JSONEarlyStopLLMClient(inner), ResponseCache(max_temperature=0.3))
+        for _ in range(2):
+            client.chat(MESSAGES, temperature=0.1, stop_on_json=True)
+        assert inner.calls == 2
+
+
+class TestStreamInfo:
+    """流式结束信息解析测试"""
+
+    def test_finish_reason_and_usage_recorded(self):
+        events = (
+            b'data: {"choices": [{"delta": {"content": "{}"}, "finish_reason": null}]}\n\n'
+            b'data: {"choices": [{"delta": {}, "finish_reason": "length"}]}\n\n'
+            b'data: {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}}\n\n'
+            b'data: [DONE]\n\n'
+        )
+        info = StreamInfo()
+        chunks = (events[i:i + 7] for i in range(0, len(events), 7))
+        assert "".join(OpenAICompatibleClient._iter_deltas(chunks, info)) == "{}"
+        assert info.finish_reason == "length"
+        assert info.usage["total_tokens"] == 4
@@ -0,0 +1,132 @@
+"""文件工具单元测试"""
+import json
+import os
+import pytest
+from tools import FileReader, FileLister, DirectoryScanner, TextSplitter
+
+
+@pytest.fixture
+def chinese_file(tmp_path):
+    path = tmp_path / "workorders.txt"
+    text = "业主报修：厨房水管漏水，请尽快处理。\n" * 200
+    path.write_text(text, encoding="utf-8")
+    return path, text
+
+
+class TestFileReaderStreaming:
+    """流式读取测试"""
+
+    def test_iter_chunks_utf8_boundary(self, chinese_file):
+        path, text = chinese_file
+        # 7 字节的块必然切断 3 字节的中文字符
+        chunks = list(FileReader.iter_chunks(str(path), chunk_bytes=7))
+        assert "".join(chunks) == text
+
+    def test_iter_chunks_mmap(self, chinese_file):
+        path, text = chinese_file
+        assert "".join(FileReader.iter_chunks(str(path), chunk_bytes=1000, use_mmap=True)) == text
+
+    def test_open_mmap_empty_file(self, tmp_path):
+        path = tmp_path / "empty.txt"
+        path.write_bytes(b"")
+        with FileReader.open_mmap(str(path)) as mapped:
+            assert len(mapped) == 0
+        assert list(FileReader.iter_chunks(str(path), use_mmap=True)) == []
+
+    def test_iter_lines(self, chinese_file):
+        path, _ = chinese_file
+        lines = FileReader.iter_lines(str(path))
+        assert next(lines) == "业主报修：厨房水管漏水，请尽快处理。"
+
+    def test_iter_json_records_ndjson(self, tmp_path):
+        path = tmp_path / "orders.ndjson"
+        records = [{"id": i, "content": f"工单{i}", "amount": i * 10} for i in range(50)]
+        path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records), encoding="utf-8")
+        assert list(FileReader.iter_json_records(str(path), chunk_bytes=16)) == records
+
+    def test_iter_json_records_array(self, tmp_path):
+        path = tmp_path / "orders.json"
+        records = [{"id": i, "tags": ["维修", "紧急"]} for i in range(30)] + [12345, "末尾"]
+        path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        assert list(FileReader.iter_json_records(str(path), chunk_bytes=5)) == records
+
+    @pytest.mark.parametrize("text, chunk_bytes, expected", [
+        ("3.25", 1, [3.25]),
+        ("3.25", 2, [3.25]),
+        ("[1.5, 2]", 1, [1.5, 2]),
+        ("[1.5, 2]", 3, [1.5, 2]),
+        ("2.5e3", 1, [2500.0]),
+        ("1.5\n-20 true", 1, [1.5, -20, True]),
+    ])
+    def test_iter_json_records_numbers_split_across_chunks(self, tmp_path, text, chunk_bytes, expected):
+        path = tmp_path / "numbers.json"
+        path.write_text(text, encoding="utf-8")
+        assert list(FileReader.iter_json_records(str(path), chunk_bytes=chunk_bytes)) == expected
+
+    def test_iter_json_records_invalid(self, tmp_path):
+        path = tmp_path / "bad.ndjson"
+        path.write_text('{"id": 1}\n{"id": ', encoding="utf-8")
+        with pytest.raises(json.JSONDecodeError):
+            list(FileReader.iter_json_records(str(path)))
+
+
+class TestSplitStream:
+    """流式分块测试"""
+
+    @pytest.mark.parametrize("length", [0, 5, 100, 1000, 2000, 2345])
+    def test_matches_split_by_chars(self, length):
+        text = "".join(chr(0x4e00 + i % 500) for i in range(length))
+        pieces = [text[i:i + 37] for i in range(0, len(text), 37)]
+        expected = TextSplitter.split_by_chars(text, chunk_size=300, overlap=50)
+        assert list(TextSplitter.split_stream(pieces, chunk_size=300, overlap=50)) == expected
+
+    @pytest.mark.parametrize("chunk_size, overlap", [(100, 100), (50, 100)])
+    def test_rejects_overlap_not_less_than_chunk_size(self, chunk_size, overlap):
+        with pytest.raises(ValueError):
+            list(TextSplitter.split_stream(["物业费标准"], chunk_size=chunk_size, overlap=overlap))
+
+
+class TestDirectoryScanner:
+    """增量目录扫描测试"""
+
+    def test_detects_changes(self, tmp_path):
+        kb = tmp_path / "kb"
+        (kb / "sub").mkdir(parents=True)
+        (kb / "a.txt").write_text("物业费标准", encoding="utf-8")
+        (kb / "sub" / "b.txt").write_text("停车规定", encoding="utf-8")
+        (kb / "skip.md").write_text("忽略", encoding="utf-8")
+        manifest = str(tmp_path / "manifest.json")
+
+        first = FileLister.scan_changes(str(kb), manifest, pattern="*.txt")
+        assert sorted(first.added) == sorted([str(kb / "a.txt"), str(kb / "sub" / "b.txt")])
+
+        (kb / "a.txt").write_text("物业费标准已调整", encoding="utf-8")
+        (kb / "sub" / "b.txt").unlink()
+        (kb / "c.txt").write_text("装修须知", encoding="utf-8")
+
+        second = FileLister.scan_changes(str(kb), manifest, pattern="*.txt")
+        assert second.added == [str(kb / "c.txt")]
+        assert second.modified == [str(kb / "a.txt")]
+        assert second.deleted == [str(kb / "sub" / "b.txt")]
+
+    def test_unchanged_files_not_rehashed(self, tmp_path):
+        (tmp_path / "a.txt").write_text("内容", encoding="utf-8")
+        scanner = DirectoryScanner(str(tmp_path))
+        scanner.scan()
+        result = scanner.scan()
+        assert not result.has_changes
+        assert result.unchanged == 1 and result.hashed == 0
+
+    def test_touch_without_content_change(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("内容", encoding="utf-8")
+        scanner = DirectoryScanner(str(tmp_path))
+        scanner.scan()
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        result = scanner.scan()
+        assert not result.has_changes and result.hashed == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
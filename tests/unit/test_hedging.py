@@ -0,0 +1,188 @@
+"""对冲请求单元测试"""
+import asyncio
+import threading
+import time
+from core import BaseLLMClient, LLMResponse
+from core.cancellation import CancellationToken
+from core.hedging import HedgeBudget, HedgingLLMClient, LatencyTracker
+from core.llm_client import StreamInfo
+
+
+class ScriptedClient(BaseLLMClient):
+    """按调用顺序使用预设时延的本地客户端"""
+
+    def __init__(self, name, delays):
+        super().__init__(model=name, api_key="test")
+        self.delays = list(delays)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _next_delay(self):
+        with self._lock:
+            self.calls += 1
+            return self.delays.pop(0) if self.delays else 0.0
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.thread = threading.current_thread().name
+        time.sleep(self._next_delay())
+        return LLMResponse(content=f"{self.model}-{self.calls}", model=self.model, usage={}, raw_response={})
+
+    async def achat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        await asyncio.sleep(self._next_delay())
+        return LLMResponse(content=f"{self.model}-{self.calls}", model=self.model, usage={}, raw_response={})
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.thread = threading.current_thread().name
+        time.sleep(self._next_delay())
+        yield self.model
+        yield "!"
+
+
+class BlockingStreamClient(ScriptedClient):
+    """首个片段前一直阻塞（模拟阻塞在 socket 读取上），取消令牌触发时才返回"""
+
+    def __init__(self, name, finish_reason="stop"):
+        super().__init__(name, [])
+        self.finish_reason = finish_reason
+        self.torn_down = threading.Event()
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        token, info = kwargs["cancel_token"], kwargs["stream_info"]
+        aborted = threading.Event()
+        token.register(aborted.set)
+        aborted.wait(timeout=5)
+        # 落后的流在被关闭时也会写入自己的结束信息
+        info.finish_reason = self.finish_reason
+        self.torn_down.set()
+        return
+        yield
+
+
+class InfoStreamClient(ScriptedClient):
+    """立即输出并写入结束信息的本地客户端"""
+
+    def __init__(self, name):
+        super().__init__(name, [])
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield self.model
+        kwargs["stream_info"].finish_reason = "stop"
+        kwargs["stream_info"].usage = {"total_tokens": 7}
+
+
+MESSAGES = [{"role": "user", "content": "工单"}]
+
+
+def _warm_tracker(value=0.01, count=5):
+    tracker = LatencyTracker(min_samples=count)
+    for _ in range(count):
+        tracker.observe(value)
+    return tracker
+
+
+def _budget():
+    return HedgeBudget(ratio=1.0)
+
+
+class TestHedgeBudget:
+    """对冲预算测试"""
+
+    def test_ratio_caps_hedges(self):
+        budget = HedgeBudget(ratio=0.05)
+        granted = 0
+        for _ in range(100):
+            budget.on_request()
+            granted += budget.try_acquire()
+        assert granted == 5
+
+
+class TestHedgingLLMClient:
+    """对冲客户端测试"""
+
+    def test_no_hedge_without_samples(self):
+        primary = ScriptedClient("primary", [0.05])
+        client = HedgingLLMClient(primary, budget=_budget(), latency=LatencyTracker(min_samples=5))
+        assert client.chat(MESSAGES).content == "primary-1"
+        assert primary.calls == 1
+
+    def test_hedge_wins_when_primary_stalls(self):
+        primary = ScriptedClient("primary", [1.0])
+        alternate = ScriptedClient("alternate", [0.0])
+        client = HedgingLLMClient(
+            primary, hedge_client=alternate, budget=_budget(), min_delay=0.02, latency=_warm_tracker()
+        )
+        start = time.perf_counter()
+        assert client.chat(MESSAGES).content == "alternate-1"
+        assert time.perf_counter() - start < 0.5
+
+    def test_fast_primary_not_hedged(self):
+        primary = ScriptedClient("primary", [0.0])
+        alternate = ScriptedClient("alternate", [0.0])
+        client = HedgingLLMClient(
+            primary, hedge_client=alternate, budget=_budget(), min_delay=0.2, latency=_warm_tracker()
+        )
+        assert client.chat(MESSAGES).content == "primary-1"
+        assert alternate.calls == 0
+
+    def test_budget_exhausted(self):
+        primary = ScriptedClient("primary", [0.1])
+        alternate = ScriptedClient("alternate", [0.0])
+        client = HedgingLLMClient(
+            primary, hedge_client=alternate, budget=HedgeBudget(ratio=0.0),
+            min_delay=0.01, latency=_warm_tracker()
+        )
+        assert client.chat(MESSAGES).content == "primary-1"
+        assert alternate.calls == 0
+        # 无法对冲时不经过线程池
+        assert primary.thread == threading.current_thread().name
+
+    def test_async_loser_cancelled(self):
+        primary = ScriptedClient("primary", [1.0])
+        alternate = ScriptedClient("alternate", [0.0])
+        client = HedgingLLMClient(
+            primary, hedge_client=alternate, budget=_budget(), min_delay=0.02, latency=_warm_tracker()
+        )
+
+        async def main():
+            start = time.perf_counter()
+            response = await client.achat(MESSAGES)
+            return response, time.perf_counter() - start
+
+        response, elapsed = asyncio.run(main())
+        assert response.content == "alternate-1"
+        assert elapsed < 0.5
+
+    def test_stream_hedge_on_first_token(self):
+        primary = ScriptedClient("primary", [1.0])
+        alternate = ScriptedClient("alternate", [0.0])
+        client = HedgingLLMClient(
+            primary, hedge_client=alternate, budget=_budget(), min_delay=0.02, ttft=_warm_tracker()
+        )
+        assert list(client.stream_chat(MESSAGES)) == ["alternate", "!"]
+        # 流式读取使用独立线程，不占用同步请求的线程池
+        assert primary.thread == "llm-hedge-primary"
+        assert alternate.thread == "llm-hedge-hedge"
+
+    def test_blocked_losing_stream_is_torn_down(self):
+        primary = BlockingStreamClient("primary", finish_reason="loser")
+        client = HedgingLLMClient(
+            primary, hedge_client=InfoStreamClient("alternate"), budget=_budget(),
+            min_delay=0.02, ttft=_warm_tracker()
+        )
+        info = StreamInfo()
+        start = time.perf_counter()
+        assert list(client.stream_chat(MESSAGES, stream_info=info)) == ["alternate"]
+        # 胜出后立即关闭落后流的连接，而不是等到它的下一个片段
+        assert primary.torn_down.wait(timeout=1)
+        assert time.perf_counter() - start < 1
+        assert info.finish_reason == "stop"
+        assert info.usage == {"total_tokens": 7}
+
+    def test_caller_cancel_reaches_readers(self):
+        primary = BlockingStreamClient("primary")
+        client = HedgingLLMClient(primary, budget=_budget(), min_delay=10, ttft=_warm_tracker())
+        token = CancellationToken()
+        stream = client.stream_chat(MESSAGES, cancel_token=token)
+        threading.Timer(0.05, token.cancel).start()
+        assert list(stream) == []
+        assert primary.torn_down.is_set()
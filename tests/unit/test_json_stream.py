@@ -0,0 +1,116 @@
+"""流式 JSON 解析单元测试"""
+import json
+import pytest
+from scenarios import ContractAuditService, WorkOrderAIService
+from utils.json_stream import IncrementalJSONParser, loads_tolerant, repair_json
+
+WORK_ORDER = {
+    "type": "维修",
+    "urgency": "high",
+    "key_info": {"location": "3栋2单元", "contact": "138xxxx", "description": "厨房水管漏水, 已关阀"},
+    "suggestion": "派维修工上门检查，更换老化管件"
+}
+
+
+class TestRepairJson:
+    """JSON 修复测试"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ('```json\n{"a": 1}\n```', {"a": 1}),
+        ('分析结果如下：{"a": 1} 以上。', {"a": 1}),
+        ("{'a': 'x', 'b': [1, 2]}", {"a": "x", "b": [1, 2]}),
+        ('{a: 1, b: 高}', {"a": 1, "b": "高"}),
+        ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+        ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+        ('{"a": 1 // 注释\n, /* 块注释 */ "b": 2}', {"a": 1, "b": 2}),
+        ('{"a": 1\n"b": 2}', {"a": 1, "b": 2}),
+        ('{"a"：1，"b"：2}', {"a": 1, "b": 2}),
+        ('{"a": "第一行\n第二行\t"}', {"a": "第一行\n第二行\t"}),
+        ("{'a': 'it\\'s \"ok\"'}", {"a": "it's \"ok\""}),
+    ])
+    def test_common_mistakes(self, text, expected):
+        assert json.loads(repair_json(text)) == expected
+
+    @pytest.mark.parametrize("text, expected", [
+        ('{"a": 1, "b": "未完', {"a": 1, "b": "未完"}),
+        ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}),
+        ('{"a": 1, "b":', {"a": 1, "b": None}),
+        ('{"a": 1,', {"a": 1}),
+    ])
+    def test_truncated_output_is_closed(self, text, expected):
+        assert json.loads(repair_json(text)) == expected
+
+    def test_loads_tolerant_prefers_strict_parse(self):
+        assert loads_tolerant('{"a": "//不是注释"}') == {"a": "//不是注释"}
+
+    def test_loads_tolerant_raises_value_error(self):
+        with pytest.raises(ValueError):
+            loads_tolerant("没有 JSON")
+
+
+class TestIncrementalJSONParser:
+    """增量解析测试"""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_fields_emitted_in_order_for_any_split(self, size):
+        text = "结果：\n" + json.dumps(WORK_ORDER, ensure_ascii=False, indent=2) + "\n说明文字"
+        parser = IncrementalJSONParser()
+        emitted = []
+        for i in range(0, len(text), size):
+            emitted.extend(parser.feed(text[i:i + size]).items())
+        assert emitted == list(WORK_ORDER.items())
+        assert parser.complete
+        assert parser.result() == WORK_ORDER
+
+    def test_field_available_before_object_finishes(self):
+        parser = IncrementalJSONParser()
+        assert parser.feed('{"type": "维修", "urg') == {"type": "维修"}
+        assert parser.feed('ency": "high", "suggestion": "派') == {"urgency": "high"}
+        assert not parser.complete
+        assert parser.feed('人"}') == {"suggestion": "派人"}
+        assert parser.complete
+
+    def test_commas_and_braces_inside_strings_are_ignored(self):
+        parser = IncrementalJSONParser()
+        fields = parser.feed('{"a": "x, {y}", "b": [1, {"c": 2}], "d": 3}')
+        assert fields == {"a": "x, {y}", "b": [1, {"c": 2}], "d": 3}
+
+    def test_tolerant_members_and_truncated_result(self):
+        parser = IncrementalJSONParser()
+        assert parser.feed("{'type': '投诉', urgency: high, 'suggestion': '尽快回") == {
+            "type": "投诉", "urgency": "high"
+        }
+        assert parser.result() == {"type": "投诉", "urgency": "high", "suggestion": "尽快回"}
+
+
+class _FakeChatService:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream_chat(self, user_message, history=None, **kwargs):
+        yield from self.chunks
+
+
+class TestServiceFieldEvents:
+    """场景服务字段事件测试"""
+
+    def test_workorder_stream_emits_fields_before_result(self):
+        text = json.dumps(WORK_ORDER, ensure_ascii=False)
+        service = WorkOrderAIService.__new__(WorkOrderAIService)
+        service.chat_service = _FakeChatService([text[i:i + 4] for i in range(0, len(text), 4)])
+
+        events = list(service.process_stream("水管漏水"))
+        fields = [(i, d["name"]) for i, (e, d) in enumerate(events) if e == "field"]
+        assert [name for _, name in fields] == ["type", "urgency", "key_info", "suggestion"]
+        # type/urgency 在 suggestion 的增量文本输出之前就已产出
+        first_suggestion_delta = next(i for i, (e, d) in enumerate(events) if e == "delta" and "派" in d["text"])
+        assert fields[1][0] < first_suggestion_delta
+        assert events[-1] == ("result", {
+            "success": True, "result": WORK_ORDER, "raw_response": text, "finish_reason": "stop"
+        })
+
+    def test_parse_response_repairs_without_second_call(self):
+        service = ContractAuditService.__new__(ContractAuditService)
+        result = service._parse_response("```json\n{'risk_level': '高', 'risks': ['违约金过高',],}\n```")
+        assert result == {"risk_level": "高", "risks": ["违约金过高"]}
+        assert service._parse_response("无法审核") == {"summary": "无法审核", "raw": True}
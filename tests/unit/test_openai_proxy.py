@@ -0,0 +1,184 @@
+"""OpenAI 兼容代理接口单元测试"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi.testclient import TestClient
+from api import main as api_main
+from core import LLMFactory
+from core.openai_compatible_client import OpenAICompatibleClient
+from core.sse import SSEUsageTap
+from utils.metrics import default_metrics
+
+STREAM_BODY = (
+    b'data: {"id":"c1","choices":[{"index":0,"delta":{"role":"assistant","content":""}}]}\n\n'
+    b'data: {"id":"c1","choices":[{"index":0,"delta":{"content":"\xe7\x89\xa9\xe4\xb8\x9a"}}]}\n\n'
+    b'data: {"id":"c1","choices":[{"index":0,"delta":{},"finish_reason":"stop"}],'
+    b'"usage":{"prompt_tokens":11,"completion_tokens":2,"total_tokens":13}}\n\n'
+    b"data: [DONE]\n\n"
+)
+COMPLETION = {
+    "id": "c2",
+    "object": "chat.completion",
+    "model": "deepseek-chat",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+}
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payloads = []
+    status = 200
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.payloads.append(payload)
+        if self.status != 200:
+            body = b'{"error": {"message": "slow down"}}'
+            self.send_response(self.status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            # 故意在事件中间切块，验证透传不依赖分块方式
+            for i in range(0, len(STREAM_BODY), 37):
+                part = STREAM_BODY[i:i + 37]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    _UpstreamHandler.payloads = []
+    _UpstreamHandler.status = 200
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def create_for_scenario(scenario, provider=None, model=None, **kwargs):
+        return OpenAICompatibleClient(
+            model or "deepseek-chat", provider=provider, api_key="sk-test", base_url=base_url
+        )
+
+    monkeypatch.setattr(LLMFactory, "create_for_scenario", create_for_scenario)
+    yield _UpstreamHandler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(api_main.app)
+
+
+class TestOpenAIProxy:
+    """/v1/chat/completions 测试"""
+
+    def test_stream_bytes_are_relayed_unchanged(self, upstream, client):
+        labels = {"provider": "deepseek", "model": "deepseek-chat", "source": "provider"}
+        before = default_metrics.get_counter("proxy_tokens", kind="completion_tokens", **labels)
+        response = client.post("/v1/chat/completions", json={
+            "model": "deepseek/deepseek-chat",
+            "messages": [{"role": "user", "content": "hi"}],
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        })
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.content == STREAM_BODY
+        assert upstream.payloads[0]["stream_options"] == {"include_usage": True}
+        assert default_metrics.get_counter("proxy_tokens", kind="completion_tokens", **labels) == before + 2
+
+    def test_non_stream_returns_upstream_body(self, upstream, client):
+        response = client.post("/v1/chat/completions", json={
+            "model": "deepseek-chat",
+            "messages": [{"role": "user", "content": "hi"}],
+            "top_p": 0.5,
+            "cache": False,
+        })
+        assert response.status_code == 200
+        assert response.json() == COMPLETION
+        assert upstream.payloads[0]["top_p"] == 0.5
+        assert "cache" not in upstream.payloads[0]
+
+    def test_control_params_in_body_are_ignored(self, upstream, client):
+        response = client.post("/v1/chat/completions", json={
+            "model": "deepseek-chat",
+            "messages": [{"role": "user", "content": "hi"}],
+            "stream": True,
+            "cancel_token": "x",
+            "raw_stream": False,
+            "scenario": "work_order_ai",
+        })
+        assert response.status_code == 200
+        assert response.content == STREAM_BODY
+        assert not {"cancel_token", "raw_stream", "scenario"} & set(upstream.payloads[0])
+
+    def test_upstream_error_status_is_preserved(self, upstream, client):
+        upstream.status = 429
+        response = client.post("/v1/chat/completions", json={
+            "model": "deepseek-chat",
+            "messages": [{"role": "user", "content": "hi"}],
+            "stream": True,
+        })
+        assert response.status_code == 429
+        assert response.json()["error"]["type"] == "rate_limit_error"
+
+    def test_unknown_model(self, upstream, client):
+        response = client.post("/v1/chat/completions", json={
+            "model": "no-such-model", "messages": [{"role": "user", "content": "hi"}]
+        })
+        assert response.status_code == 404
+        assert response.json()["error"]["type"] == "model_not_found"
+
+    def test_invalid_messages(self, client):
+        response = client.post("/v1/chat/completions", json={"model": "deepseek-chat", "messages": []})
+        assert response.status_code == 400
+
+
+class TestResolveProxyModel:
+    """model 字段解析测试"""
+
+    def test_provider_prefix(self):
+        assert api_main._resolve_proxy_model("qianwen/qwen-max") == ("qianwen", "qwen-max")
+
+    def test_registered_model(self):
+        assert api_main._resolve_proxy_model("deepseek-chat") == ("deepseek", "deepseek-chat")
+
+    def test_provider_name(self):
+        assert api_main._resolve_proxy_model("openai") == ("openai", None)
+
+
+class TestSSEUsageTap:
+    """用量旁路统计测试"""
+
+    def test_usage_split_across_chunks(self):
+        tap = SSEUsageTap()
+        for i in range(0, len(STREAM_BODY), 5):
+            tap.feed(STREAM_BODY[i:i + 5])
+        tap.close()
+        assert tap.usage == {"prompt_tokens": 11, "completion_tokens": 2, "total_tokens": 13}
+        assert tap.events == 4
+
+    def test_no_usage(self):
+        tap = SSEUsageTap()
+        tap.feed(b'data: {"choices":[{"delta":{"content":"a"}}]}\n\ndata: [DONE]\n\n')
+        tap.close()
+        assert tap.usage is None
+        assert tap.events == 2
@@ -0,0 +1,67 @@
+"""RAG 基准测试套件单元测试"""
+import pytest
+from benchmarks import (
+    BenchmarkConfig,
+    HashingEmbeddingService,
+    RAGBenchmark,
+    build_property_corpus,
+    build_synthetic_corpus,
+    format_results,
+)
+from benchmarks.rag_benchmark import percentile
+
+
+class TestCorpus:
+    """语料生成测试"""
+
+    def test_property_corpus_size(self):
+        corpus = build_property_corpus(num_communities=5)
+        assert len(corpus.documents) == 5
+        assert len(corpus.qa_pairs) == 35
+        for pair in corpus.qa_pairs:
+            assert pair.answer in corpus.documents[pair.doc_id]
+
+    def test_synthetic_corpus_deterministic(self):
+        assert build_synthetic_corpus(10).documents == build_synthetic_corpus(10).documents
+
+
+class TestHashingEmbedding:
+    """本地向量化替身测试"""
+
+    def test_deterministic_and_normalized(self):
+        service = HashingEmbeddingService(dim=64)
+        vec = service.embed("物业费怎么交")
+        assert vec == HashingEmbeddingService(dim=64).embed("物业费怎么交")
+        assert sum(v * v for v in vec) == pytest.approx(1.0)
+
+
+class TestRAGBenchmark:
+    """基准测试运行测试"""
+
+    def test_run_reports_metrics(self):
+        corpus = build_property_corpus(num_communities=4)
+        result = RAGBenchmark(corpus, measure_memory=False).run(BenchmarkConfig(top_k=3))
+        assert result.num_queries == 28
+        assert result.recall_at_k > 0.8
+        assert 0 < result.mrr <= 1
+        assert result.p99_latency_ms >= result.p50_latency_ms
+
+    def test_compare_and_format(self):
+        corpus = build_property_corpus(num_communities=3)
+        benchmark = RAGBenchmark(corpus, max_queries=5)
+        results = benchmark.compare([
+            BenchmarkConfig(name="small", chunk_size=100, chunk_overlap=20),
+            BenchmarkConfig(name="large", chunk_size=500, chunk_overlap=50),
+        ])
+        assert [r.config for r in results] == ["small", "large"]
+        assert results[0].num_chunks > results[1].num_chunks
+        table = format_results(results)
+        assert "recall@k" in table and "small" in table
+
+    def test_percentile(self):
+        assert percentile([1, 2, 3, 4, 5], 50) == 3
+        assert percentile([], 99) == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
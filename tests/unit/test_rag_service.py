@@ -0,0 +1,93 @@
+"""RAG 服务单元测试"""
+import pytest
+from services import RAGService, ChunkDeduplicator
+
+
+class FakeEmbeddingService:
+    """记录调用次数的本地向量化服务"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed(self, text):
+        return [float(len(text)), 1.0]
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed(text) for text in texts]
+
+
+HEADER = "【物业通知】尊敬的各位业主：为保障小区安全，请仔细阅读以下内容。"
+
+
+class TestChunkDeduplicator:
+    """分块去重测试"""
+
+    def test_exact_duplicate(self):
+        dedup = ChunkDeduplicator()
+        dedup.register("电梯年检通知 本周六上午停运", 0)
+        assert dedup.find_duplicate("电梯年检通知  本周六上午停运") == 0
+
+    def test_near_duplicate(self):
+        dedup = ChunkDeduplicator()
+        base = "本小区物业费收费标准为每平方米每月二点五元，按季度缴纳，逾期将产生滞纳金。" * 3
+        dedup.register(base, 7)
+        assert dedup.find_duplicate(base + "谢谢") == 7
+
+    def test_distinct_text(self):
+        dedup = ChunkDeduplicator()
+        dedup.register("停车场月卡办理需携带行驶证和身份证", 0)
+        assert dedup.find_duplicate("装修施工时间为工作日上午八点至十二点") is None
+
+    def test_unregister(self):
+        dedup = ChunkDeduplicator()
+        dedup.register("垃圾分类投放时间", 3)
+        dedup.unregister(3)
+        assert dedup.find_duplicate("垃圾分类投放时间") is None
+        assert len(dedup) == 0
+
+
+class TestRAGServiceDedup:
+    """RAG 入库去重测试"""
+
+    def test_duplicate_documents_embedded_once(self):
+        embedding = FakeEmbeddingService()
+        rag = RAGService(
+            knowledge_base=[HEADER, HEADER, "电梯维保时间为每月第一个周二"],
+            embedding_service=embedding,
+            chat_service=object()
+        )
+        assert len(embedding.embedded) == 2
+        results = rag.retrieve("物业通知", top_k=5)
+        sources = {tuple(item["sources"]) for item in results}
+        assert (0, 1) in sources
+
+    def test_add_document_merges_sources(self):
+        embedding = FakeEmbeddingService()
+        rag = RAGService(embedding_service=embedding, chat_service=object())
+        rag.add_document(HEADER, doc_id="notice-1")
+        rag.add_document(HEADER, doc_id="notice-2")
+        assert len(embedding.embedded) == 1
+        assert rag.retrieve("通知")[0]["sources"] == ["notice-1", "notice-2"]
+
+    def test_dedup_disabled(self):
+        embedding = FakeEmbeddingService()
+        RAGService(
+            knowledge_base=[HEADER, HEADER],
+            embedding_service=embedding,
+            chat_service=object(),
+            deduplicate=False
+        )
+        assert len(embedding.embedded) == 2
+
+    def test_add_file_streams_into_index(self, tmp_path):
+        path = tmp_path / "notice.txt"
+        path.write_text(HEADER + "电梯维保时间为每月第一个周二。" * 100, encoding="utf-8")
+        rag = RAGService(embedding_service=FakeEmbeddingService(), chat_service=object())
+        added = rag.add_file(str(path))
+        assert added == len(rag._chunks) > 1
+        assert rag.retrieve("电梯")[0]["sources"] == [str(path)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
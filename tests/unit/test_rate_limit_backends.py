@@ -0,0 +1,159 @@
+"""跨进程限流存储单元测试"""
+import multiprocessing
+import threading
+import time
+import pytest
+from core.rate_limiter import BucketSpec, RateLimiter
+from core.rate_limit_backends import (
+    SQLiteRateLimitBackend, RedisRateLimitBackend, create_rate_limit_backend
+)
+
+
+class WatchError(Exception):
+    """与 redis.exceptions.WatchError 同名，供存储按类名识别"""
+
+
+class LocalRedis:
+    """Redis 本地替身：实现限流存储用到的哈希、过期、TIME 和 WATCH/MULTI/EXEC"""
+
+    def __init__(self):
+        self.data = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def time(self):
+        now = time.time()
+        return int(now), int((now % 1) * 1e6)
+
+    def hmget(self, key, *fields):
+        with self.lock:
+            values = self.data.get(key, {})
+            return [values.get(f) for f in fields]
+
+    def pipeline(self):
+        return _Pipeline(self)
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.watched = {}
+        self.commands = None
+
+    def watch(self, *keys):
+        with self.redis.lock:
+            self.watched = {k: self.redis.versions.get(k, 0) for k in keys}
+
+    def unwatch(self):
+        self.watched = {}
+
+    def hmget(self, key, *fields):
+        return self.redis.hmget(key, *fields)
+
+    def multi(self):
+        self.commands = []
+
+    def hset(self, key, mapping):
+        self.commands.append(("hset", key, mapping))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    def execute(self):
+        with self.redis.lock:
+            for key, version in self.watched.items():
+                if self.redis.versions.get(key, 0) != version:
+                    raise WatchError()
+            for name, key, arg in self.commands:
+                if name == "hset":
+                    self.redis.data.setdefault(key, {}).update({k: str(v).encode() for k, v in arg.items()})
+                    self.redis.versions[key] = self.redis.versions.get(key, 0) + 1
+
+    def reset(self):
+        self.watched = {}
+        self.commands = None
+
+
+def _take_from_sqlite(path, count, results):
+    backend = SQLiteRateLimitBackend(path)
+    spec = BucketSpec("shared", 10, 0)
+    results.put(sum(1 for _ in range(count) if backend.take([(spec, 1)]) == 0))
+
+
+def _concurrent_takes(backend, spec, workers=20):
+    granted = []
+
+    def worker():
+        if backend.take([(spec, 1)]) == 0:
+            granted.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(granted)
+
+
+class TestSQLiteBackend:
+    """SQLite 存储测试"""
+
+    def test_shared_across_processes(self, tmp_path):
+        path = str(tmp_path / "limits.db")
+        SQLiteRateLimitBackend(path)
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        processes = [ctx.Process(target=_take_from_sqlite, args=(path, 8, results)) for _ in range(3)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join(timeout=30)
+        assert sum(results.get(timeout=5) for _ in processes) == 10
+
+    def test_shared_across_threads(self, tmp_path):
+        backend = SQLiteRateLimitBackend(str(tmp_path / "limits.db"))
+        assert _concurrent_takes(backend, BucketSpec("threads", 10, 0)) == 10
+
+    def test_limiter_with_sqlite(self, tmp_path):
+        path = str(tmp_path / "limits.db")
+        first = RateLimiter("deepseek:abc", tpm=1000, backend=SQLiteRateLimitBackend(path))
+        second = RateLimiter("deepseek:abc", tpm=1000, backend=SQLiteRateLimitBackend(path))
+        reserved = first.acquire(600)
+        first.correct(reserved, 100)
+        assert second.stats()["tpm_available"] == pytest.approx(900, abs=5)
+
+
+class TestRedisBackend:
+    """Redis 存储测试（本地替身）"""
+
+    def test_atomic_take_under_contention(self):
+        backend = RedisRateLimitBackend(LocalRedis())
+        assert _concurrent_takes(backend, BucketSpec("redis", 10, 0)) == 10
+
+    def test_multi_bucket_all_or_nothing(self):
+        backend = RedisRateLimitBackend(LocalRedis())
+        rpm = BucketSpec("rpm", 5, 0)
+        tpm = BucketSpec("tpm", 100, 0)
+        assert backend.take([(rpm, 1), (tpm, 90)]) == 0
+        assert backend.take([(rpm, 1), (tpm, 20)]) == float("inf")
+        assert backend.peek(rpm) == 4
+        backend.adjust(tpm, 50)
+        assert backend.peek(tpm) == pytest.approx(60)
+
+    def test_shared_between_limiters(self):
+        redis = LocalRedis()
+        first = RateLimiter("qianwen:abc", rpm=2, backend=RedisRateLimitBackend(redis), max_wait=0.05)
+        second = RateLimiter("qianwen:abc", rpm=2, backend=RedisRateLimitBackend(redis), max_wait=0.05)
+        first.acquire()
+        second.acquire()
+        with pytest.raises(TimeoutError):
+            first.acquire()
+
+
+class TestCreateBackend:
+    """存储工厂测试"""
+
+    def test_create(self, tmp_path):
+        assert isinstance(create_rate_limit_backend("sqlite", path=str(tmp_path / "a.db")), SQLiteRateLimitBackend)
+        with pytest.raises(ValueError):
+            create_rate_limit_backend("etcd")
@@ -0,0 +1,218 @@
+"""客户端限流单元测试"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+from core import BaseLLMClient, LLMResponse
+from core.errors import classify_error
+from core.rate_limiter import (
+    BucketSpec, MemoryRateLimitBackend, RateLimiter, RateLimitedLLMClient, RateLimitTimeout,
+    estimate_request_tokens, limiter_name
+)
+from utils import default_metrics
+
+
+class UsageClient(BaseLLMClient):
+    """返回固定 usage 的本地客户端"""
+
+    def __init__(self, total_tokens=10):
+        super().__init__(model="test-model", api_key="sk-test")
+        self.total_tokens = total_tokens
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        return LLMResponse(
+            content="ok", model=self.model, usage={"total_tokens": self.total_tokens}, raw_response={}
+        )
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield "ok"
+
+
+class FailingClient(UsageClient):
+    """请求总是失败的本地客户端"""
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        raise ConnectionError("upstream reset")
+
+
+class RawStreamClient(UsageClient):
+    """raw_stream 时原样输出 SSE 字节的本地客户端"""
+
+    def __init__(self, usage=None):
+        super().__init__()
+        self.usage = usage
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        assert kwargs.get("raw_stream")
+        for text in ("电梯", "已派单"):
+            yield b'data: {"choices": [{"delta": {"content": "%s"}}]}\n\n' % text.encode("utf-8")
+        if self.usage:
+            yield b'data: {"choices": [], "usage": %s}\n\n' % json.dumps(self.usage).encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+class InfoStreamClient(UsageClient):
+    """流结束时把 usage 写入 stream_info 的本地客户端"""
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield "ok"
+        kwargs["stream_info"].usage = {"total_tokens": self.total_tokens}
+
+
+MESSAGES = [{"role": "user", "content": "电梯故障，请尽快维修"}]
+
+
+class TestMemoryBackend:
+    """令牌桶存储测试"""
+
+    def test_take_is_all_or_nothing(self):
+        backend = MemoryRateLimitBackend()
+        rpm = BucketSpec("rpm", 10, 1)
+        tpm = BucketSpec("tpm", 100, 10)
+        assert backend.take([(rpm, 1), (tpm, 100)]) == 0
+        wait = backend.take([(rpm, 1), (tpm, 50)])
+        assert wait == pytest.approx(5, abs=0.1)
+        # 失败的请求不扣减 RPM 桶
+        assert backend.take([(rpm, 9)]) == 0
+
+    def test_adjust_refunds(self):
+        backend = MemoryRateLimitBackend()
+        spec = BucketSpec("tpm", 100, 0)
+        backend.take([(spec, 100)])
+        backend.adjust(spec, 40)
+        assert backend.take([(spec, 40)]) == 0
+        assert backend.take([(spec, 1)]) == float("inf")
+
+
+class TestRateLimiter:
+    """限流器测试"""
+
+    def test_rpm_waits_for_refill(self):
+        limiter = RateLimiter("rpm-test", rpm=600)  # 每秒补充 10 个
+        for _ in range(600):
+            limiter.acquire()
+        start = time.monotonic()
+        limiter.acquire()
+        assert time.monotonic() - start >= 0.05
+
+    def test_fifo_order(self):
+        limiter = RateLimiter("fifo-test", rpm=60 * 20)
+        for _ in range(60 * 20):
+            limiter.acquire()
+        order = []
+
+        def worker(i):
+            limiter.acquire()
+            order.append(i)
+
+        threads = []
+        for i in range(5):
+            t = threading.Thread(target=worker, args=(i,))
+            t.start()
+            threads.append(t)
+            time.sleep(0.01)
+        for t in threads:
+            t.join()
+        assert order == [0, 1, 2, 3, 4]
+        assert limiter.queue_depth == 0
+
+    def test_usage_correction(self):
+        limiter = RateLimiter("tpm-test", tpm=1000)
+        client = RateLimitedLLMClient(UsageClient(total_tokens=10), limiter)
+        for _ in range(5):
+            client.chat(MESSAGES, max_tokens=150)
+        # 每次预占约 150+ token，按 usage 修正后只消耗 10 个
+        assert limiter.backend.take([(limiter.tpm_bucket, 900)]) == 0
+
+    def test_stream_usage_correction(self):
+        limiter = RateLimiter("stream-tpm-test", tpm=1000)
+        client = RateLimitedLLMClient(InfoStreamClient(total_tokens=10), limiter)
+        for _ in range(5):
+            assert list(client.stream_chat(MESSAGES, max_tokens=150)) == ["ok"]
+        assert limiter.backend.take([(limiter.tpm_bucket, 950)]) == 0
+
+    def test_raw_stream_corrected_from_usage(self):
+        limiter = RateLimiter("raw-usage-test", tpm=1000)
+        client = RateLimitedLLMClient(RawStreamClient(usage={"prompt_tokens": 6, "completion_tokens": 4}), limiter)
+        for _ in range(5):
+            list(client.stream_chat(MESSAGES, max_tokens=150, raw_stream=True))
+        # 预留的 max_tokens 按上游 usage 退回，每次只消耗 10 个
+        assert limiter.backend.take([(limiter.tpm_bucket, 950)]) == 0
+
+    def test_raw_stream_without_usage_counts_events(self):
+        limiter = RateLimiter("raw-events-test", tpm=1000)
+        client = RateLimitedLLMClient(RawStreamClient(), limiter)
+        list(client.stream_chat(MESSAGES, max_tokens=150, raw_stream=True))
+        # 提示词估算值加 3 个 data 事件
+        spent = estimate_request_tokens(MESSAGES, 0) + 3
+        assert limiter.backend.take([(limiter.tpm_bucket, 1000 - spent)]) == 0
+        assert limiter.backend.take([(limiter.tpm_bucket, 1)]) > 0
+
+    def test_failed_call_refunds_reservation(self):
+        limiter = RateLimiter("refund-test", tpm=1000)
+        client = RateLimitedLLMClient(FailingClient(), limiter)
+        for _ in range(5):
+            with pytest.raises(ConnectionError):
+                client.chat(MESSAGES, max_tokens=150)
+        with pytest.raises(ConnectionError):
+            asyncio.run(client.achat(MESSAGES, max_tokens=150))
+        assert limiter.backend.take([(limiter.tpm_bucket, 990)]) == 0
+
+    def test_max_wait_raises_rate_limit(self):
+        limiter = RateLimiter("wait-test", rpm=1, max_wait=0.05)
+        limiter.acquire()
+        with pytest.raises(RateLimitTimeout) as info:
+            limiter.acquire()
+        assert classify_error(info.value) == "rate_limit"
+        assert info.value.retryable is False
+
+    def test_async_acquire(self):
+        limiter = RateLimiter("async-test", rpm=600)
+        client = RateLimitedLLMClient(UsageClient(), limiter)
+
+        async def main():
+            return await asyncio.gather(*[client.achat(MESSAGES) for _ in range(3)])
+
+        assert len(asyncio.run(main())) == 3
+        assert default_metrics.get_timing("llm_rate_limit_wait_ms", limiter="async-test")["count"] == 3
+
+    def test_async_acquire_runs_blocking_backend_off_loop(self):
+        class SlowBackend(MemoryRateLimitBackend):
+            blocking = True
+
+            def __init__(self):
+                super().__init__()
+                self.threads = set()
+
+            def take(self, requests):
+                self.threads.add(threading.get_ident())
+                time.sleep(0.05)
+                return super().take(requests)
+
+        backend = SlowBackend()
+        limiter = RateLimiter("blocking-test", rpm=600, tpm=10000, backend=backend)
+        client = RateLimitedLLMClient(UsageClient(), limiter)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks += 1
+
+            task = asyncio.ensure_future(ticker())
+            await client.achat(MESSAGES)
+            task.cancel()
+            return ticks
+
+        # 取额度期间事件循环仍在运行
+        assert asyncio.run(main()) >= 3
+        assert threading.get_ident() not in backend.threads
+
+    def test_estimate_and_name(self):
+        assert estimate_request_tokens(MESSAGES, 100) > 100
+        name = limiter_name("deepseek", "sk-secret")
+        assert name.startswith("deepseek:") and "secret" not in name
@@ -0,0 +1,109 @@
+"""LLM 响应缓存单元测试"""
+import pytest
+from core import BaseLLMClient, LLMResponse
+from core.response_cache import CachedLLMClient, ResponseCache, make_request_key
+
+
+class CountingClient(BaseLLMClient):
+    """记录调用次数的本地客户端"""
+
+    def __init__(self, finish_reason="stop"):
+        super().__init__(model="test-model", api_key="test")
+        self.calls = 0
+        self.finish_reason = finish_reason
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        return LLMResponse(
+            content=f"answer-{self.calls}",
+            model=self.model,
+            usage={"total_tokens": 42},
+            raw_response={},
+            finish_reason=self.finish_reason
+        )
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield "answer"
+
+
+MESSAGES = [{"role": "user", "content": "请分析工单：电梯故障"}]
+
+
+class TestRequestKey:
+    """请求键测试"""
+
+    def test_normalized_whitespace(self):
+        other = [{"role": "user", "content": "  请分析工单：电梯故障\r\n"}]
+        assert make_request_key("p", "m", MESSAGES, 0.3, 100) == make_request_key("p", "m", other, 0.3, 100)
+
+    def test_params_affect_key(self):
+        assert make_request_key("p", "m", MESSAGES, 0.3, 100) != make_request_key("p", "m", MESSAGES, 0.3, 200)
+        assert make_request_key("p", "m", MESSAGES, 0.3, 100) != make_request_key("p", "m", MESSAGES, 0.3, 100, top_p=0.5)
+
+
+class TestCachedLLMClient:
+    """缓存客户端测试"""
+
+    def test_hit_for_deterministic_request(self):
+        inner = CountingClient()
+        client = CachedLLMClient(inner, ResponseCache(max_temperature=0.3), scenario="work_order_ai")
+        first = client.chat(MESSAGES, temperature=0.2)
+        second = client.chat(MESSAGES, temperature=0.2)
+        assert inner.calls == 1
+        assert second.content == first.content and second.cached
+        stats = client.cache.stats()
+        assert stats["hits"] == 1 and stats["saved_tokens"] == 42 and stats["hit_rate"] == 0.5
+
+    def test_high_temperature_not_cached(self):
+        inner = CountingClient()
+        client = CachedLLMClient(inner, ResponseCache(max_temperature=0.3))
+        client.chat(MESSAGES, temperature=0.9)
+        client.chat(MESSAGES, temperature=0.9)
+        assert inner.calls == 2
+
+    def test_bypass(self):
+        inner = CountingClient()
+        client = CachedLLMClient(inner, ResponseCache())
+        client.chat(MESSAGES, temperature=0)
+        client.chat(MESSAGES, temperature=0, cache=False)
+        assert inner.calls == 2
+
+    def test_truncated_response_not_cached(self):
+        inner = CountingClient(finish_reason="length")
+        client = CachedLLMClient(inner, ResponseCache())
+        client.chat(MESSAGES, temperature=0)
+        client.chat(MESSAGES, temperature=0)
+        assert inner.calls == 2
+
+
+class TestResponseCache:
+    """缓存存储测试"""
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        response = LLMResponse(content="x", model="m", usage={}, raw_response={})
+        for key in ("a", "b", "c"):
+            cache.set(key, response)
+        assert cache.get("a") is None
+        assert cache.get("c").content == "x"
+
+    def test_expired(self):
+        cache = ResponseCache()
+        cache.set("a", LLMResponse(content="x", model="m", usage={}, raw_response={}), ttl=-1)
+        assert cache.get("a") is None
+
+    def test_disk_tier(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        response = LLMResponse(content="持久化", model="m", usage={"total_tokens": 1}, raw_response={"id": 1})
+        ResponseCache(disk_path=path).set("k", response)
+        restored = ResponseCache(disk_path=path).get("k")
+        assert restored.content == "持久化" and restored.raw_response == {"id": 1}
+
+    def test_scenario_ttl(self):
+        cache = ResponseCache(default_ttl=10, scenario_ttls={"contract_audit": 100})
+        assert cache.ttl_for("contract_audit") == 100
+        assert cache.ttl_for("other") == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
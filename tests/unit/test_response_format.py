@@ -0,0 +1,103 @@
+"""结构化输出格式单元测试"""
+import pytest
+from config import get_response_format_support
+from core.openai_compatible_client import OpenAICompatibleClient
+from core.response_format import JSON_OBJECT, JSON_SCHEMA, adapt_response_format, json_schema_format
+from scenarios import ContractAuditService, WorkOrderAIService
+from scenarios.work_order_ai.prompt import OUTPUT_SCHEMA
+from utils.metrics import default_metrics
+
+SCHEMA_FORMAT = json_schema_format("work_order_analysis", OUTPUT_SCHEMA)
+MESSAGES = [{"role": "user", "content": "请以JSON格式分析工单"}]
+
+
+class TestAdaptResponseFormat:
+    """按模型能力调整格式测试"""
+
+    @pytest.mark.parametrize("supported, expected", [
+        (JSON_SCHEMA, SCHEMA_FORMAT),
+        (JSON_OBJECT, {"type": JSON_OBJECT}),
+        (None, None),
+    ])
+    def test_schema_downgrades(self, supported, expected):
+        assert adapt_response_format(SCHEMA_FORMAT, supported) == expected
+
+    def test_json_object_is_not_upgraded(self):
+        assert adapt_response_format({"type": JSON_OBJECT}, JSON_SCHEMA) == {"type": JSON_OBJECT}
+        assert adapt_response_format({"type": JSON_OBJECT}, None) is None
+
+    def test_other_formats_pass_through(self):
+        assert adapt_response_format({"type": "text"}, None) == {"type": "text"}
+        assert adapt_response_format(None, JSON_SCHEMA) is None
+
+    @pytest.mark.parametrize("provider, model, expected", [
+        ("openai", "gpt-4o", JSON_SCHEMA),
+        ("openai", "gpt-3.5-turbo", JSON_OBJECT),
+        ("deepseek", "deepseek-chat", JSON_OBJECT),
+        ("qianwen", "qwen-max", JSON_OBJECT),
+        ("wenxin", "ernie-4.0-8k", None),
+    ])
+    def test_capability_table(self, provider, model, expected):
+        assert get_response_format_support(provider, model) == expected
+
+
+class TestBuildPayload:
+    """请求体中的 response_format 测试"""
+
+    def _payload(self, provider, model, **kwargs):
+        client = OpenAICompatibleClient(
+            model, provider=provider, api_key="sk-test", base_url="http://localhost", concurrency_limiter=None
+        )
+        return client._build_payload(MESSAGES, 0.3, 512, **kwargs)
+
+    def test_schema_sent_to_supporting_model(self):
+        payload = self._payload("openai", "gpt-4o-mini", response_format=SCHEMA_FORMAT)
+        assert payload["response_format"] == SCHEMA_FORMAT
+        assert payload["response_format"]["json_schema"]["strict"] is True
+
+    def test_schema_downgraded_to_json_mode(self):
+        before = default_metrics.get_counter(
+            "llm_response_format_downgraded", provider="deepseek", model="deepseek-chat",
+            requested=JSON_SCHEMA, sent=JSON_OBJECT
+        )
+        payload = self._payload("deepseek", "deepseek-chat", response_format=SCHEMA_FORMAT)
+        assert payload["response_format"] == {"type": JSON_OBJECT}
+        assert default_metrics.get_counter(
+            "llm_response_format_downgraded", provider="deepseek", model="deepseek-chat",
+            requested=JSON_SCHEMA, sent=JSON_OBJECT
+        ) == before + 1
+
+    def test_dropped_for_unsupported_provider(self):
+        payload = self._payload("custom", "local-model", response_format=SCHEMA_FORMAT)
+        assert "response_format" not in payload
+
+    def test_absent_by_default(self):
+        assert "response_format" not in self._payload("openai", "gpt-4o")
+
+
+class _RecordingChatService:
+    def __init__(self):
+        self.kwargs = None
+
+    def stream_chat(self, user_message, history=None, **kwargs):
+        self.kwargs = kwargs
+        yield "{}"
+
+
+class TestScenarioSchemas:
+    """场景输出结构声明测试"""
+
+    @pytest.mark.parametrize("service_cls, method", [
+        (WorkOrderAIService, "process_stream"),
+        (ContractAuditService, "audit_stream"),
+    ])
+    def test_services_request_their_schema(self, service_cls, method):
+        service = service_cls.__new__(service_cls)
+        service.chat_service = _RecordingChatService()
+        list(getattr(service, method)("内容"))
+        response_format = service.chat_service.kwargs["response_format"]
+        assert response_format["type"] == JSON_SCHEMA
+        schema = response_format["json_schema"]["schema"]
+        # strict 模式要求列出全部字段并禁止额外字段
+        assert set(schema["required"]) == set(schema["properties"])
+        assert schema["additionalProperties"] is False
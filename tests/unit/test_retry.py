@@ -0,0 +1,132 @@
+"""重试策略单元测试"""
+import asyncio
+import time
+import pytest
+import requests
+from core import BaseLLMClient, LLMResponse
+from core.retry import RetryBudget, RetryPolicy, RetryingLLMClient, retry_after_seconds
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class FailingClient(BaseLLMClient):
+    """前若干次调用失败的本地客户端"""
+
+    def __init__(self, errors):
+        super().__init__(model="test-model", api_key="test")
+        self.errors = list(errors)
+        self.calls = 0
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return LLMResponse(content="ok", model=self.model, usage={}, raw_response={})
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        yield "ok"
+
+
+MESSAGES = [{"role": "user", "content": "工单"}]
+
+
+def _policy(**kwargs):
+    options = dict(max_retries=3, base_delay=0.001, max_delay=0.01, budget=RetryBudget(min_tokens=100))
+    options.update(kwargs)
+    return RetryPolicy(**options)
+
+
+class TestRetryPolicy:
+    """重试策略测试"""
+
+    def test_retries_server_errors(self):
+        client = RetryingLLMClient(FailingClient([_http_error(503), requests.ConnectionError()]), _policy())
+        assert client.chat(MESSAGES).content == "ok"
+        assert client.client.calls == 3
+
+    def test_client_error_not_retried(self):
+        client = RetryingLLMClient(FailingClient([_http_error(400)]), _policy())
+        with pytest.raises(requests.HTTPError):
+            client.chat(MESSAGES)
+        assert client.client.calls == 1
+
+    def test_max_retries(self):
+        client = RetryingLLMClient(FailingClient([_http_error(500)] * 5), _policy(max_retries=2))
+        with pytest.raises(requests.HTTPError):
+            client.chat(MESSAGES)
+        assert client.client.calls == 3
+
+    def test_full_jitter_bounds(self):
+        policy = _policy(base_delay=1.0, max_delay=4.0)
+        delays = [policy.backoff(5) for _ in range(200)]
+        assert all(0 <= d <= 4.0 for d in delays)
+        assert len(set(delays)) > 100
+
+    def test_retry_after_header(self):
+        assert retry_after_seconds(_http_error(429, {"Retry-After": "3"})) == 3.0
+        assert _policy().backoff(0, _http_error(429, {"Retry-After": "2"})) == 2.0
+
+    def test_deadline_stops_retry(self):
+        error = _http_error(429, {"Retry-After": "5"})
+        client = RetryingLLMClient(FailingClient([error]), _policy())
+        with pytest.raises(requests.HTTPError):
+            client.chat(MESSAGES, deadline=time.monotonic() + 1)
+        assert client.client.calls == 1
+
+    def test_budget_limits_retries(self):
+        policy = _policy(budget=RetryBudget(ratio=0.0, min_tokens=1))
+        client = RetryingLLMClient(FailingClient([_http_error(502)] * 3), policy)
+        with pytest.raises(requests.HTTPError):
+            client.chat(MESSAGES)
+        assert client.client.calls == 2
+
+    def test_async_does_not_block_loop(self):
+        client = RetryingLLMClient(
+            FailingClient([_http_error(503)]), _policy(base_delay=0.2, max_delay=0.2)
+        )
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            tick = asyncio.ensure_future(ticker())
+            response = await client.achat(MESSAGES)
+            await tick
+            return response
+
+        assert asyncio.run(main()).content == "ok"
+        # 退避期间事件循环仍在调度其它任务
+        assert ticks[-1] - ticks[0] < 0.15
+
+    def test_stream_retries_before_first_chunk(self):
+        client = RetryingLLMClient(FailingClient([requests.Timeout()]), _policy())
+        assert list(client.stream_chat(MESSAGES)) == ["ok"]
+
+    def test_embedding_max_retries_counts_attempts(self):
+        from services import EmbeddingService
+
+        class Embeddings:
+            calls = 0
+
+            def create(self, **kwargs):
+                Embeddings.calls += 1
+                raise requests.ConnectionError()
+
+        service = EmbeddingService(max_retries=3, retry_delay=0.001)
+        service.retry_policy.budget = RetryBudget(min_tokens=100)
+        service._client = type("Client", (), {"embeddings": Embeddings()})()
+        with pytest.raises(requests.ConnectionError):
+            service.embed("物业费怎么交")
+        # max_retries 为含首次请求的总尝试次数
+        assert Embeddings.calls == 3
@@ -0,0 +1,130 @@
+"""多Provider路由单元测试"""
+import pytest
+from core import BaseLLMClient, LLMResponse
+from core.router import RouteTarget, RouterLLMClient, RouterWeights
+
+
+class FakeClient(BaseLLMClient):
+    """可控时延与失败的本地客户端"""
+
+    def __init__(self, name, fail=False):
+        super().__init__(model=name, api_key="test")
+        self.fail = fail
+        self.calls = 0
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return LLMResponse(content=self.model, model=self.model, usage={}, raw_response={})
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        yield self.model
+
+
+MESSAGES = [{"role": "user", "content": "物业费怎么交"}]
+
+
+def _router(*clients, costs=None, **kwargs):
+    costs = costs or [1.0] * len(clients)
+    targets = [RouteTarget("fake", c.model, cost=cost, client=c) for c, cost in zip(clients, costs)]
+    return RouterLLMClient(targets, **kwargs)
+
+
+class TestRouterWeights:
+    """评分权重测试"""
+
+    def test_parse(self):
+        weights = RouterWeights.parse("latency=2, cost=0, unknown=5")
+        assert weights.latency == 2.0
+        assert weights.cost == 0.0
+        assert weights.error_rate == RouterWeights().error_rate
+
+
+class TestRouterLLMClient:
+    """路由客户端测试"""
+
+    def test_prefers_lower_latency(self):
+        fast, slow = FakeClient("fast"), FakeClient("slow")
+        router = _router(fast, slow)
+        router._health[0].record_success(100)
+        router._health[1].record_success(900)
+        assert router.chat(MESSAGES).content == "fast"
+
+    def test_prefers_lower_cost_when_latency_equal(self):
+        cheap, expensive = FakeClient("cheap"), FakeClient("expensive")
+        router = _router(expensive, cheap, costs=[5.0, 1.0])
+        assert router.chat(MESSAGES).content == "cheap"
+
+    def test_errors_shift_traffic(self):
+        bad, good = FakeClient("bad", fail=True), FakeClient("good")
+        router = _router(bad, good, weights=RouterWeights(cost=0))
+        with pytest.raises(RuntimeError):
+            router.chat(MESSAGES)
+        assert router.chat(MESSAGES).content == "good"
+        scores = {s["model"]: s for s in router.scores()}
+        assert scores["bad"]["errors"] == 1
+        assert scores["bad"]["score"] > scores["good"]["score"]
+
+    def test_sticky_session(self):
+        a, b = FakeClient("a"), FakeClient("b")
+        router = _router(a, b)
+        first = router.chat(MESSAGES, session_id="s1").content
+        # 即使另一目标评分更优，会话仍保持在原目标
+        other = 1 if first == "a" else 0
+        router._health[other].record_success(1)
+        router._health[1 - other].record_success(1000)
+        assert router.chat(MESSAGES, session_id="s1").content == first
+        assert router.chat(MESSAGES, session_id="s2").content != first
+
+    def test_sticky_released_when_unhealthy(self):
+        a, b = FakeClient("a", fail=True), FakeClient("b")
+        router = _router(a, b, costs=[1.0, 2.0], unhealthy_error_rate=0.2)
+        with pytest.raises(RuntimeError):
+            router.chat(MESSAGES, session_id="s1")
+        assert router.chat(MESSAGES, session_id="s1").content == "b"
+
+    def test_stream_records_ttft(self):
+        router = _router(FakeClient("a"))
+        assert list(router.stream_chat(MESSAGES)) == ["a"]
+        score = router.scores()[0]
+        assert score["ttft_ms"] is not None
+        assert score["requests"] == 1
+        assert score["in_flight"] == 0
+
+
+class TestScenarioRouter:
+    """场景路由创建测试"""
+
+    @pytest.fixture
+    def factory(self, monkeypatch):
+        from config import KeyManager, config as app_config
+        from core import LLMFactory
+        import core.router as router_module
+
+        created = []
+
+        def create_upstream(provider, model=None, **kwargs):
+            client = FakeClient(f"{provider}/{model}")
+            created.append(client)
+            return client
+
+        monkeypatch.setattr(router_module, "_routers", {})
+        monkeypatch.setattr(KeyManager, "is_provider_available", classmethod(lambda cls, provider: True))
+        monkeypatch.setattr(LLMFactory, "_create_upstream", staticmethod(create_upstream))
+        monkeypatch.setattr(app_config, "llm_breaker_enabled", False)
+        return LLMFactory, created
+
+    def test_targets_use_upstream_clients_without_breaker(self, factory):
+        llm_factory, created = factory
+        router = llm_factory._create_router("work_order_ai", "deepseek", "deepseek-chat")
+        assert [t.client for t in router.targets] == created
+        assert len(created) == 2
+
+    def test_targets_built_once_per_scenario(self, factory):
+        llm_factory, created = factory
+        first = llm_factory._create_router("work_order_ai", "deepseek", None)
+        second = llm_factory._create_router("work_order_ai", "qianwen", "qwen-plus")
+        assert first is second
+        assert len(created) == 2
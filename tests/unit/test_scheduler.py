@@ -0,0 +1,155 @@
+"""优先级调度单元测试"""
+import asyncio
+import threading
+import time
+import pytest
+from core.llm_client import BaseLLMClient, LLMResponse
+from core.scheduler import PriorityClass, PriorityScheduler, ScheduledLLMClient, SchedulerQueueTimeout
+
+
+def _scheduler(capacity=1, **kwargs):
+    classes = [
+        PriorityClass("interactive", weight=8, preempt=True),
+        PriorityClass("standard", weight=3),
+        PriorityClass("batch", weight=1),
+    ]
+    return PriorityScheduler(capacity, classes, **kwargs)
+
+
+def _queue(scheduler, order, cls, tag):
+    def run():
+        scheduler.acquire(cls)
+        order.append(tag)
+        scheduler.release()
+
+    t = threading.Thread(target=run)
+    t.start()
+    deadline = time.monotonic() + 1
+    while scheduler.queued(cls) == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return t
+
+
+class TestPriorityScheduler:
+    """调度顺序测试"""
+
+    def test_interactive_preempts_queued_batch(self):
+        scheduler = _scheduler()
+        scheduler.acquire("batch")
+        order = []
+        threads = [_queue(scheduler, order, "batch", f"b{i}") for i in range(3)]
+        threads.append(_queue(scheduler, order, "interactive", "chat"))
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=1)
+        assert order[0] == "chat"
+        assert order[1:] == ["b0", "b1", "b2"]
+
+    def test_weighted_fair_share(self):
+        scheduler = _scheduler()
+        scheduler.acquire("batch")
+        order = []
+        threads = [_queue(scheduler, order, "batch", "b") for _ in range(4)]
+        threads += [_queue(scheduler, order, "standard", "s") for _ in range(6)]
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=1)
+        # 权重 3:1，前 4 个名额中 standard 占 3 个，batch 不会饿死
+        assert order[:4].count("s") == 3
+        assert order[:4].count("b") == 1
+
+    def test_preemption_bounded_by_window(self):
+        scheduler = _scheduler(preempt_window=1.0)
+        scheduler.acquire("batch")
+        order = []
+        threads = [_queue(scheduler, order, "batch", "b")]
+        threads += [_queue(scheduler, order, "interactive", "i") for _ in range(30)]
+        deadline = time.monotonic() + 1
+        while scheduler.queued("interactive") < 30 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        scheduler.release()
+        for t in threads:
+            t.join(timeout=1)
+        # 持续的抢占流量领先超过窗口后，batch 照常被调度
+        assert 0 < order.index("b") < 30
+
+    def test_unknown_class_uses_default(self):
+        scheduler = _scheduler(capacity=2)
+        assert scheduler.acquire("unknown") == "standard"
+        assert scheduler.stats()["classes"]["standard"]["dispatched"] == 1
+
+    def test_queue_timeout(self):
+        scheduler = _scheduler(queue_timeout=0.05)
+        scheduler.acquire("batch")
+        with pytest.raises(SchedulerQueueTimeout):
+            scheduler.acquire("batch")
+        assert scheduler.queued() == 0
+        assert scheduler.in_flight == 1
+
+    def test_wait_time_reported_per_class(self):
+        scheduler = _scheduler(name="waits")
+        scheduler.acquire("batch")
+        order = []
+        t = _queue(scheduler, order, "interactive", "chat")
+        time.sleep(0.05)
+        scheduler.release()
+        t.join(timeout=1)
+        stats = scheduler.stats()
+        assert stats["classes"]["interactive"]["wait_ms"]["max"] >= 40
+        assert stats["in_flight"] == 0
+
+    def test_async_acquire_and_cancel(self):
+        scheduler = _scheduler()
+
+        async def main():
+            await scheduler.aacquire("batch")
+            waiter = asyncio.ensure_future(scheduler.aacquire("interactive"))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert scheduler.queued() == 0
+            queued = asyncio.ensure_future(scheduler.aacquire("interactive"))
+            await asyncio.sleep(0.01)
+            scheduler.release()
+            assert await asyncio.wait_for(queued, 1) == "interactive"
+            scheduler.release()
+
+        asyncio.run(main())
+        assert scheduler.in_flight == 0
+
+
+class _EchoClient(BaseLLMClient):
+    def __init__(self):
+        super().__init__(model="echo", api_key="")
+        self.calls = []
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls.append(kwargs)
+        return LLMResponse(content="ok", model=self.model, usage={}, raw_response=None)
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield "o"
+        yield "k"
+
+
+class TestScheduledLLMClient:
+    """客户端包装测试"""
+
+    def test_priority_override_is_consumed(self):
+        inner = _EchoClient()
+        scheduler = _scheduler(capacity=2)
+        client = ScheduledLLMClient(inner, scheduler, priority="batch")
+        client.chat([{"role": "user", "content": "hi"}], priority="interactive")
+        assert inner.calls == [{}]
+        assert scheduler.stats()["classes"]["interactive"]["dispatched"] == 1
+        assert scheduler.in_flight == 0
+
+    def test_stream_holds_slot_until_done(self):
+        scheduler = _scheduler(capacity=2)
+        client = ScheduledLLMClient(_EchoClient(), scheduler, priority="interactive")
+        stream = client.stream_chat([{"role": "user", "content": "hi"}])
+        assert next(stream) == "o"
+        assert scheduler.in_flight == 1
+        stream.close()
+        assert scheduler.in_flight == 0
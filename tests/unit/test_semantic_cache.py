@@ -0,0 +1,81 @@
+"""语义缓存单元测试"""
+from benchmarks import HashingEmbeddingService
+from services import SemanticCache
+
+
+class TestSemanticCache:
+    """语义缓存测试"""
+
+    def _cache(self, **kwargs):
+        return SemanticCache(embedding_service=HashingEmbeddingService(), **kwargs)
+
+    def test_exact_hit_after_normalization(self):
+        cache = self._cache()
+        cache.store("怎么交物业费？", "请在APP缴费页面缴纳。")
+        hit = cache.lookup(" 怎么交物业费 ")
+        assert hit["answer"] == "请在APP缴费页面缴纳。"
+        assert hit["score"] == 1.0
+
+    def test_similar_question_hit(self):
+        cache = self._cache(threshold=0.6)
+        cache.store("物业费怎么交", "请在APP缴费页面缴纳。")
+        assert cache.lookup("物业费怎么交纳") is not None
+        assert cache.lookup("电梯坏了找谁修") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_expired_entry_misses(self):
+        cache = self._cache(default_ttl=-1)
+        cache.store("物业费怎么交", "答案")
+        assert cache.lookup("物业费怎么交") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_eviction(self):
+        cache = self._cache(max_entries=2)
+        cache.store("问题一", "a")
+        cache.store("问题二", "b")
+        cache.lookup("问题一")
+        cache.store("问题三", "c")
+        assert cache.stats()["entries"] == 2
+        assert cache.invalidate(question="问题二") == 0
+        assert cache.lookup("问题一")["answer"] == "a"
+
+    def test_invalidate(self):
+        cache = self._cache()
+        cache.store("报修电话是多少", "0571-81234567")
+        cache.store("物业费怎么交", "APP缴纳")
+        assert cache.invalidate(predicate=lambda e: "0571" in e.answer) == 1
+        assert cache.invalidate(question="物业费怎么交？") == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_best_match_among_many_entries(self):
+        cache = self._cache(threshold=0.6)
+        for i in range(200):
+            cache.store(f"第{i}号楼停车位怎么租", f"answer-{i}")
+        cache.store("物业费怎么交", "APP缴纳")
+        assert cache.lookup("物业费怎么交纳")["answer"] == "APP缴纳"
+        # 新写入的条目在下次查找时可见
+        cache.store("电梯坏了找谁修", "拨打报修电话")
+        assert cache.lookup("电梯坏了找谁来修")["answer"] == "拨打报修电话"
+
+    def test_miss_then_store_embeds_once(self):
+        cache = self._cache()
+        cache.store("物业费怎么交", "APP缴纳")
+        before = cache.embedding_service.call_count
+        hit, vector = cache.lookup_with_vector("电梯坏了找谁修")
+        assert hit is None and vector is not None
+        cache.store("电梯坏了找谁修", "拨打报修电话", vector=vector)
+        assert cache.embedding_service.call_count == before + 1
+        assert cache.lookup("电梯坏了找谁修")["answer"] == "拨打报修电话"
+
+    def test_store_appends_without_rebuilding(self):
+        cache = self._cache(threshold=0.6, max_entries=50)
+        for i in range(200):
+            cache.store(f"第{i}号楼停车位怎么租", f"answer-{i}")
+        # 淘汰留下的空行过半时压缩，行数不超过条目数的两倍
+        assert cache.stats()["entries"] == 50
+        assert len(cache._rows) <= 100
+        assert cache.lookup("第199号楼停车位怎么租")["answer"] == "answer-199"
+        assert cache.invalidate(question="第10号楼停车位怎么租") == 0
+        cache.store("物业费怎么交", "APP缴纳")
+        assert cache.lookup("物业费怎么交纳")["answer"] == "APP缴纳"
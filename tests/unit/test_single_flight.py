@@ -0,0 +1,122 @@
+"""请求合并单元测试"""
+import asyncio
+import threading
+import time
+import pytest
+from core import BaseLLMClient, LLMResponse
+from core.single_flight import SingleFlight, SingleFlightLLMClient
+
+
+class SlowClient(BaseLLMClient):
+    """带延迟、记录上游调用次数的本地客户端"""
+
+    def __init__(self, delay=0.1, fail=False):
+        super().__init__(model="test-model", api_key="test")
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return LLMResponse(content="answer", model=self.model, usage={"total_tokens": 10}, raw_response={})
+
+    async def achat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return LLMResponse(content="answer", model=self.model, usage={"total_tokens": 10}, raw_response={})
+
+    def stream_chat(self, messages, temperature=0.7, max_tokens=2048, **kwargs):
+        yield "answer"
+
+
+MESSAGES = [{"role": "user", "content": "3号楼停电，电梯困人"}]
+
+
+def _run_threads(fn, count):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+class TestSingleFlight:
+    """请求合并测试"""
+
+    def test_sync_coalesces_identical_requests(self):
+        upstream = SlowClient()
+        group = SingleFlight()
+        client = SingleFlightLLMClient(upstream, group=group)
+
+        results, errors = _run_threads(lambda: client.chat(MESSAGES, temperature=0.3), 8)
+
+        assert not errors
+        assert upstream.calls == 1
+        assert all(r.content == "answer" for r in results)
+        assert len({id(r) for r in results}) == 8
+        assert group.stats()["coalesced"] == 7
+        assert group.in_flight() == 0
+
+    def test_sync_different_requests_not_coalesced(self):
+        upstream = SlowClient(delay=0.05)
+        client = SingleFlightLLMClient(upstream, group=SingleFlight())
+        _run_threads(lambda: client.chat(MESSAGES, temperature=0.3), 2)
+        _run_threads(lambda: client.chat(MESSAGES, temperature=0.9), 1)
+        assert upstream.calls == 2
+
+    def test_sync_error_shared(self):
+        upstream = SlowClient(fail=True)
+        client = SingleFlightLLMClient(upstream, group=SingleFlight())
+        results, errors = _run_threads(lambda: client.chat(MESSAGES), 4)
+        assert upstream.calls == 1
+        assert len(errors) == 4
+
+    def test_opt_out(self):
+        upstream = SlowClient(delay=0.05)
+        client = SingleFlightLLMClient(upstream, group=SingleFlight())
+        _run_threads(lambda: client.chat(MESSAGES, coalesce=False), 3)
+        assert upstream.calls == 3
+
+    def test_async_coalesces_identical_requests(self):
+        upstream = SlowClient()
+        group = SingleFlight()
+        client = SingleFlightLLMClient(upstream, group=group)
+
+        async def main():
+            return await asyncio.gather(*[client.achat(MESSAGES) for _ in range(5)])
+
+        results = asyncio.run(main())
+        assert upstream.calls == 1
+        assert [r.content for r in results] == ["answer"] * 5
+        assert group.stats()["coalesced"] == 4
+        assert group.in_flight() == 0
+
+    def test_async_cancelled_waiter_does_not_cancel_others(self):
+        upstream = SlowClient()
+        client = SingleFlightLLMClient(upstream, group=SingleFlight())
+
+        async def main():
+            first = asyncio.ensure_future(client.achat(MESSAGES))
+            second = asyncio.ensure_future(client.achat(MESSAGES))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(main()).content == "answer"
+        assert upstream.calls == 1
@@ -0,0 +1,86 @@
+"""增量 SSE 解码单元测试"""
+import json
+import pytest
+from core.sse import SSEDecoder, extract_delta_content, iter_sse_events
+
+
+def _delta(text):
+    return json.dumps({"choices": [{"index": 0, "delta": {"content": text}}]}, ensure_ascii=False)
+
+
+def _split_every(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestSSEDecoder:
+    """解码器测试"""
+
+    def test_basic_events(self):
+        decoder = SSEDecoder()
+        events = decoder.feed(b"data: a\n\ndata: b\n\n")
+        assert [e.data for e in events] == ["a", "b"]
+        assert events[0].event == "message"
+
+    def test_partial_event_is_buffered(self):
+        decoder = SSEDecoder()
+        assert decoder.feed(b"data: hel") == []
+        assert decoder.feed(b"lo\n") == []
+        assert [e.data for e in decoder.feed(b"\n")] == ["hello"]
+
+    def test_multiline_data_event_and_id(self):
+        decoder = SSEDecoder()
+        events = decoder.feed(b"event: delta\nid: 7\nretry: 3000\ndata: line1\ndata:line2\n\n")
+        assert len(events) == 1
+        assert events[0].data == "line1\nline2"
+        assert events[0].event == "delta"
+        assert events[0].id == "7"
+        assert events[0].retry == 3000
+        assert decoder.last_event_id == "7"
+
+    def test_comments_and_empty_events_are_ignored(self):
+        decoder = SSEDecoder()
+        assert decoder.feed(b": keep-alive\n\nevent: ping\n\n") == []
+
+    @pytest.mark.parametrize("newline", [b"\n", b"\r\n", b"\r"])
+    def test_newline_styles(self, newline):
+        payload = b"data: a" + newline + newline + b"data: b" + newline + newline
+        for size in (1, 2, 3, len(payload)):
+            decoder = SSEDecoder()
+            events = []
+            for chunk in _split_every(payload, size):
+                events.extend(decoder.feed(chunk))
+            assert [e.data for e in events] == ["a", "b"], (newline, size)
+
+    def test_multibyte_characters_split_across_chunks(self):
+        payload = f"data: {_delta('物业费缴纳')}\n\n".encode("utf-8")
+        events = list(iter_sse_events(_split_every(payload, 1)))
+        assert extract_delta_content(events[0].data) == "物业费缴纳"
+
+    def test_done_stops_iteration(self):
+        payload = b"data: a\n\ndata: [DONE]\n\ndata: b\n\n"
+        assert [e.data for e in iter_sse_events([payload])] == ["a"]
+
+    def test_flush_dispatches_unterminated_event(self):
+        assert [e.data for e in iter_sse_events([b"data: tail"])] == ["tail"]
+
+
+class TestExtractDeltaContent:
+    """增量文本提取测试"""
+
+    def test_escaped_content(self):
+        text = 'say "hi"\n\\ é 物业'
+        assert extract_delta_content(_delta(text)) == text
+
+    def test_missing_or_null_content(self):
+        assert extract_delta_content(json.dumps({"choices": [{"delta": {"role": "assistant"}}]})) == ""
+        assert extract_delta_content(json.dumps({"choices": [{"delta": {"content": None}}]})) == ""
+
+    def test_whitespace_after_colon(self):
+        assert extract_delta_content('{"choices": [{"delta": {"content":   "ok"}}]}') == "ok"
+
+    def test_reasoning_content_is_not_content(self):
+        data = json.dumps({"choices": [{"delta": {"reasoning_content": "think", "content": "answer"}}]})
+        assert extract_delta_content(data) == "answer"
+
+    def test_malformed_json(self):
+        assert extract_delta_content('{"choices": [{"delta": {"content": "unterminated') == ""
@@ -0,0 +1,79 @@
+"""流式片段合并单元测试"""
+import asyncio
+from utils.stream_coalescer import CoalescePolicy, coalesce_stream
+
+
+async def _source(chunks, delays=None):
+    for i, chunk in enumerate(chunks):
+        if delays:
+            await asyncio.sleep(delays[i])
+        yield chunk
+
+
+def _collect(source, policy):
+    async def run():
+        return [c async for c in coalesce_stream(source, policy)]
+    return asyncio.run(run())
+
+
+class TestCoalesceStream:
+    """合并策略测试"""
+
+    def test_disabled_passes_through(self):
+        assert _collect(_source(["a", "b"]), None) == ["a", "b"]
+
+    def test_byte_threshold(self):
+        # 每个汉字 3 字节，阈值 6 字节即两个字一帧
+        policy = CoalescePolicy(max_bytes=6, max_delay=10, sentence=False)
+        assert _collect(_source(list("物业服务中心")), policy) == ["物业", "服务", "中心"]
+
+    def test_sentence_boundary(self):
+        policy = CoalescePolicy(max_bytes=1000, max_delay=10)
+        frames = _collect(_source(["您", "好", "。", "请", "问"]), policy)
+        assert frames == ["您好。", "请问"]
+
+    def test_time_window_flushes_while_upstream_stalls(self):
+        policy = CoalescePolicy(max_bytes=1000, max_delay=0.02, sentence=False)
+        frames = _collect(_source(["a", "b", "c"], delays=[0, 0, 0.2]), policy)
+        assert frames == ["ab", "c"]
+
+    def test_bytes_chunks(self):
+        policy = CoalescePolicy(max_bytes=4, max_delay=10)
+        assert _collect(_source([b"ab", b"c", b"de"]), policy) == [b"abcde"]
+
+    def test_structured_items_flush_and_pass_through(self):
+        policy = CoalescePolicy(max_bytes=1000, max_delay=10)
+        frames = _collect(_source(["a", "b", ("result", {"ok": True}), "c"]), policy)
+        assert frames == ["ab", ("result", {"ok": True}), "c"]
+
+    def test_early_close_cancels_pending_read(self):
+        cancelled = []
+
+        async def slow():
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+                yield "b"
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run():
+            stream = coalesce_stream(slow(), CoalescePolicy(max_bytes=1, max_delay=10))
+            assert await stream.__anext__() == "a"
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.01)
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        assert cancelled == [True]
+
+
+class TestSSEFrame:
+    """SSE 帧编码测试"""
+
+    def test_multiline_text(self):
+        from api.main import _sse_frame
+        assert _sse_frame("第一行\n第二行") == "data: 第一行\ndata: 第二行\n\n"
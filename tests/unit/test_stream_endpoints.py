@@ -0,0 +1,114 @@
+"""结构化流式接口单元测试"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from api import main as api_main
+from scenarios import ContractAuditService, KnowledgeQAService, WorkOrderAIService
+
+WORK_ORDER_JSON = '{"type": "维修", "urgency": "high"}'
+
+
+class _FakeChatService:
+    """按固定片段输出的对话服务"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.kwargs = None
+
+    def stream_chat(self, user_message, history=None, **kwargs):
+        self.kwargs = kwargs
+        yield from self.chunks
+        if self.error:
+            raise self.error
+
+
+def _workorder_service(chunks, error=None):
+    service = WorkOrderAIService.__new__(WorkOrderAIService)
+    service.chat_service = _FakeChatService(chunks, error)
+    return service
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def client():
+    return TestClient(api_main.app)
+
+
+class TestWorkOrderStream:
+    """工单流式接口测试"""
+
+    def test_sse_events_end_with_parsed_result(self, client, monkeypatch):
+        chunks = [WORK_ORDER_JSON[i:i + 5] for i in range(0, len(WORK_ORDER_JSON), 5)]
+        service = _workorder_service(chunks)
+        monkeypatch.setattr(api_main, "get_workorder_service", lambda: service)
+
+        response = client.post("/workorder/process/stream", json={"content": "水管漏水", "stream_coalesce": False})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.text)
+        assert events[0] == ("progress", {"stage": "analyzing"})
+        assert "".join(d["text"] for e, d in events if e == "delta") == WORK_ORDER_JSON
+        assert events[-1] == ("result", {
+            "success": True, "result": json.loads(WORK_ORDER_JSON), "error": None, "finish_reason": "stop"
+        })
+        assert service.chat_service.kwargs["cancel_token"] is not None
+
+    def test_ndjson_with_coalescing(self, client, monkeypatch):
+        monkeypatch.setattr(api_main, "get_workorder_service", lambda: _workorder_service(list(WORK_ORDER_JSON)))
+        response = client.post("/workorder/process/stream?format=ndjson", json={"content": "水管漏水"})
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.strip().split("\n")]
+        deltas = [line["data"]["text"] for line in lines if line["event"] == "delta"]
+        assert "".join(deltas) == WORK_ORDER_JSON
+        assert len(deltas) < len(WORK_ORDER_JSON)
+        assert lines[-1]["event"] == "result"
+
+    def test_upstream_error_becomes_failed_result(self, client, monkeypatch):
+        service = _workorder_service(["{"], error=RuntimeError("upstream reset"))
+        monkeypatch.setattr(api_main, "get_workorder_service", lambda: service)
+        events = _parse_sse(client.post("/workorder/process/stream", json={"content": "x"}).text)
+        assert events[-1][0] == "result"
+        assert events[-1][1]["success"] is False
+
+    def test_invalid_format(self, client):
+        response = client.post("/workorder/process/stream?format=xml", json={"content": "x"})
+        assert response.status_code == 422
+
+
+class TestServiceStreams:
+    """各场景服务的流式事件测试"""
+
+    def test_contract_audit_stream(self):
+        service = ContractAuditService.__new__(ContractAuditService)
+        service.chat_service = _FakeChatService(['{"risk": ', '"low"}'])
+        events = list(service.audit_stream("合同"))
+        assert events[0][0] == "progress"
+        assert events[-1] == ("result", {
+            "success": True, "result": {"risk": "low"}, "raw_response": '{"risk": "low"}',
+            "finish_reason": "stop"
+        })
+
+    def test_knowledge_query_stream(self):
+        service = KnowledgeQAService.__new__(KnowledgeQAService)
+
+        class _RAG:
+            def retrieve(self, question):
+                return [{"chunk": "物业费每月缴纳"}]
+
+            def stream_query(self, question, retrieved, **kwargs):
+                yield "每月"
+                yield "缴纳"
+
+        service.rag_service = _RAG()
+        events = list(service.query_stream("物业费怎么交"))
+        assert [e for e, _ in events] == ["progress", "progress", "delta", "delta", "result"]
+        assert events[1][1] == {"stage": "generating", "documents": 1}
+        assert events[-1][1]["answer"] == "每月缴纳"
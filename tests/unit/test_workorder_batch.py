@@ -0,0 +1,120 @@
+"""批量工单处理单元测试"""
+import json
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from api import main as api_main
+from core import LLMResponse
+from core.cancellation import CancellationToken
+from scenarios import WorkOrderAIService
+
+
+class _FakeChatService:
+    """按工单内容决定时延和结果、记录并发峰值的对话服务"""
+
+    def __init__(self, delays=None, failures=()):
+        self.delays = delays or {}
+        self.failures = set(failures)
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, user_message, history=None, **kwargs):
+        content = user_message.split("\n", 1)[1]
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delays.get(content, 0.01))
+            if content in self.failures:
+                raise RuntimeError(f"upstream error for {content}")
+            answer = json.dumps({"type": "维修", "urgency": "中", "content": content}, ensure_ascii=False)
+            return LLMResponse(content=answer, model="test", usage={}, raw_response={}, finish_reason="stop")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _service(**kwargs):
+    service = WorkOrderAIService.__new__(WorkOrderAIService)
+    service.chat_service = _FakeChatService(**kwargs)
+    return service
+
+
+class TestProcessMany:
+    """process_many 测试"""
+
+    def test_results_in_completion_order_with_ids(self):
+        service = _service(delays={"慢": 0.2, "快": 0.01})
+        results = list(service.process_many([("a", "慢"), ("b", "快")], concurrency=2))
+        assert [r["id"] for r in results] == ["b", "a"]
+        assert results[1]["result"]["content"] == "慢"
+
+    def test_concurrency_is_bounded(self):
+        service = _service(delays={str(i): 0.03 for i in range(20)})
+        results = list(service.process_many(((str(i), str(i)) for i in range(20)), concurrency=4))
+        assert len(results) == 20
+        assert service.chat_service.peak == 4
+
+    def test_partial_failures_do_not_abort(self):
+        service = _service(failures={"坏"})
+        results = {r["id"]: r for r in service.process_many([("1", "好"), ("2", "坏"), ("3", "好")], concurrency=2)}
+        assert results["2"]["success"] is False
+        assert "upstream error" in results["2"]["error"]
+        assert results["1"]["success"] and results["3"]["success"]
+
+    def test_cancel_stops_submitting(self):
+        service = _service()
+        token = CancellationToken()
+        results = service.process_many(((str(i), str(i)) for i in range(50)), concurrency=2, cancel_token=token)
+        first = next(results)
+        token.cancel()
+        rest = list(results)
+        assert first["id"] in {"0", "1"}
+        # 取消后只收尾在途的工单
+        assert len(rest) <= 2
+        assert service.chat_service.calls <= 3
+
+
+class TestBatchEndpoint:
+    """/workorder/batch 接口测试"""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(api_main.app)
+
+    def test_ndjson_lines_per_item(self, client, monkeypatch):
+        service = _service(failures={"坏"})
+        monkeypatch.setattr(api_main, "get_workorder_service", lambda: service)
+
+        response = client.post("/workorder/batch", json={
+            "items": [{"id": "WO-1", "content": "水管漏水"}, {"id": "WO-2", "content": "坏"}],
+            "concurrency": 100
+        })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = {line["id"]: line for line in map(json.loads, response.text.strip().split("\n"))}
+        assert set(lines) == {"WO-1", "WO-2"}
+        assert lines["WO-1"]["success"] is True
+        assert lines["WO-1"]["result"]["content"] == "水管漏水"
+        assert lines["WO-2"] == {
+            "id": "WO-2", "success": False, "result": None, "error": "upstream error for 坏", "finish_reason": None
+        }
+        # 请求的并发数不超过服务配置的上限
+        assert service.chat_service.peak <= api_main.app_config.workorder_batch_concurrency
+
+    def test_rejects_duplicate_ids_and_oversized_batches(self, client, monkeypatch):
+        response = client.post("/workorder/batch", json={
+            "items": [{"id": "1", "content": "a"}, {"id": "1", "content": "b"}]
+        })
+        assert response.status_code == 400
+
+        monkeypatch.setattr(api_main.app_config, "workorder_batch_max_items", 1)
+        response = client.post("/workorder/batch", json={
+            "items": [{"id": "1", "content": "a"}, {"id": "2", "content": "b"}]
+        })
+        assert response.status_code == 400
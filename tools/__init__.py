@@ -2,7 +2,7 @@
 from .base_tool import BaseTool, ToolInput
 from .text_tools import TextCleaner, TextSplitter, TextExtractor
 from .http_tools import HTTPTool
-from .file_tools import FileReader, FileWriter, FileLister
+from .file_tools import FileReader, FileWriter, FileLister, DirectoryScanner, ScanResult
 from .date_tools import DateParser, DateFormatter, DateCalculator
 from .security_tools import HashTool, DataMasker, Validator
 
@@ -16,6 +16,8 @@ __all__ = [
     "FileReader",
     "FileWriter",
     "FileLister",
+    "DirectoryScanner",
+    "ScanResult",
     "DateParser",
     "DateFormatter",
     "DateCalculator",
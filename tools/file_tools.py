@@ -1,10 +1,21 @@
 """文件处理工具"""
 import os
 import json
+import mmap
+import codecs
+import fnmatch
+import hashlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from .base_tool import BaseTool
 
+# 流式读取默认块大小（字节）
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+# JSON 值之间可能出现的分隔字符
+_JSON_DELIMITERS = frozenset(" \t\r\n,]}")
+
 
 class FileReader(BaseTool):
     """文件读取工具"""
@@ -30,11 +41,153 @@ class FileReader(BaseTool):
         with open(file_path, "r", encoding=encoding) as f:
             return f.readlines()
 
+    @staticmethod
+    @contextmanager
+    def open_mmap(file_path: str):
+        """以只读内存映射方式打开文件
+
+        由操作系统按需分页加载，不会一次性把文件读入进程内存。
+        空文件返回 b""。
+        """
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    @staticmethod
+    def iter_chunks(
+        file_path: str,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+        encoding: str = "utf-8",
+        use_mmap: bool = False
+    ) -> Iterator[str]:
+        """按块流式读取文本
+
+        使用增量解码器，跨块边界被截断的多字节字符会留到下一块再解码。
+
+        Args:
+            file_path: 文件路径
+            chunk_bytes: 每次读取的字节数
+            encoding: 文本编码
+            use_mmap: 是否通过内存映射读取
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+
+        if use_mmap:
+            with FileReader.open_mmap(file_path) as mapped:
+                for offset in range(0, len(mapped), chunk_bytes):
+                    text = decoder.decode(mapped[offset:offset + chunk_bytes])
+                    if text:
+                        yield text
+        else:
+            with open(file_path, "rb") as f:
+                while True:
+                    block = f.read(chunk_bytes)
+                    if not block:
+                        break
+                    text = decoder.decode(block)
+                    if text:
+                        yield text
+
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    @staticmethod
+    def iter_lines(file_path: str, encoding: str = "utf-8", keepends: bool = False) -> Iterator[str]:
+        """逐行流式读取"""
+        with open(file_path, "r", encoding=encoding) as f:
+            for line in f:
+                yield line if keepends else line.rstrip("\r\n")
+
+    @staticmethod
+    def iter_json_records(
+        file_path: str,
+        encoding: str = "utf-8",
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES
+    ) -> Iterator[Any]:
+        """流式读取JSON记录
+
+        支持三种格式：
+        - 顶层JSON数组：逐个返回数组元素
+        - NDJSON（每行一个JSON）
+        - 连续拼接的多个JSON值
+        """
+        decoder = json.JSONDecoder()
+        chunks = FileReader.iter_chunks(file_path, chunk_bytes=chunk_bytes, encoding=encoding)
+        buffer = ""
+        pos = 0
+        eof = False
+        in_array = None
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            try:
+                buffer = buffer[pos:] + next(chunks)
+                pos = 0
+                return True
+            except StopIteration:
+                eof = True
+                return False
+
+        def skip(chars: str) -> bool:
+            """跳过指定字符，返回是否还有剩余数据"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer):
+                    return True
+                if not fill():
+                    return False
+
+        while True:
+            if not skip(" \t\r\n\ufeff"):
+                return
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+            if in_array:
+                if not skip(" \t\r\n,"):
+                    raise ValueError(f"Unterminated JSON array in {file_path}")
+                if buffer[pos] == "]":
+                    return
+
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # 数字可能被分块截断（如 3.25 只读到 3.），后面跟着分隔符或已到文件末尾才能确认
+                    if eof or (end < len(buffer) and (
+                        isinstance(value, (dict, list, str)) or buffer[end] in _JSON_DELIMITERS
+                    )):
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    value, end = decoder.raw_decode(buffer, pos)
+                    break
+            pos = end
+            yield value
+
     def execute(self, file_path: str, file_type: str = "text", **kwargs) -> Any:
         if file_type == "json":
             return self.read_json(file_path, **kwargs)
         elif file_type == "lines":
             return self.read_lines(file_path, **kwargs)
+        elif file_type == "records":
+            return self.iter_json_records(file_path, **kwargs)
+        elif file_type == "chunks":
+            return self.iter_chunks(file_path, **kwargs)
         else:
             return self.read_text(file_path, **kwargs)
 
@@ -92,8 +245,163 @@ class FileLister(BaseTool):
         else:
             return [str(f) for f in path.glob(pattern) if f.is_file()]
 
+    @staticmethod
+    def scan_changes(
+        directory: str,
+        manifest_path: str,
+        pattern: str = "*",
+        recursive: bool = True
+    ) -> "ScanResult":
+        """增量扫描目录，只返回上次扫描以来新增、修改、删除的文件"""
+        return DirectoryScanner(directory, pattern, recursive, manifest_path).scan()
+
     def execute(self, directory: str, pattern: str = "*", recursive: bool = False, **kwargs) -> List[str]:
         return self.list_files(directory, pattern, recursive)
 
 
-__all__ = ["FileReader", "FileWriter", "FileLister"]
+@dataclass
+class FileEntry:
+    """清单中的文件记录"""
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass
+class ScanResult:
+    """增量扫描结果"""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    hashed: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+
+class DirectoryScanner:
+    """增量目录扫描器
+
+    基于 os.scandir 遍历目录（stat 信息来自目录项，无需额外系统调用），
+    维护 路径 -> (大小, mtime, 内容哈希) 清单。只有大小或 mtime 变化的文件才会
+    重新计算哈希；mtime 变化但内容未变的文件不计为修改。
+
+    Args:
+        directory: 扫描目录
+        pattern: 文件名匹配模式（fnmatch 语法）
+        recursive: 是否递归子目录
+        manifest_path: 清单持久化路径（为空则只保存在内存中）
+    """
+
+    HASH_BLOCK_SIZE = DEFAULT_CHUNK_BYTES
+
+    def __init__(
+        self,
+        directory: str,
+        pattern: str = "*",
+        recursive: bool = True,
+        manifest_path: Optional[str] = None
+    ):
+        self.directory = directory
+        self.pattern = pattern
+        self.recursive = recursive
+        self.manifest_path = manifest_path
+        self.manifest: Dict[str, FileEntry] = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, FileEntry]:
+        """加载清单"""
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {path: FileEntry(**entry) for path, entry in data.get("files", {}).items()}
+
+    def save_manifest(self):
+        """保存清单（先写临时文件再原子替换）"""
+        if not self.manifest_path:
+            return
+        Path(self.manifest_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"directory": self.directory, "files": {p: asdict(e) for p, e in self.manifest.items()}},
+                f,
+                ensure_ascii=False
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def _walk(self) -> Iterator[os.DirEntry]:
+        """遍历匹配的文件"""
+        stack = [self.directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive:
+                                stack.append(entry.path)
+                        elif entry.is_file() and fnmatch.fnmatch(entry.name, self.pattern):
+                            yield entry
+            except (FileNotFoundError, PermissionError, NotADirectoryError):
+                continue
+
+    @classmethod
+    def file_hash(cls, file_path: str) -> str:
+        """流式计算文件 SHA256"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(cls.HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def scan(self, commit: bool = True) -> ScanResult:
+        """扫描目录并与清单比较
+
+        Args:
+            commit: 是否用本次结果更新（并持久化）清单
+
+        Returns:
+            ScanResult: 新增、修改、删除的文件路径
+        """
+        result = ScanResult()
+        manifest: Dict[str, FileEntry] = {}
+
+        for entry in self._walk():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            path = entry.path
+            previous = self.manifest.get(path)
+
+            if previous and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+                manifest[path] = previous
+                result.unchanged += 1
+                continue
+
+            try:
+                digest = self.file_hash(path)
+            except FileNotFoundError:
+                continue
+            result.hashed += 1
+            manifest[path] = FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=digest)
+
+            if previous is None:
+                result.added.append(path)
+            elif previous.sha256 != digest:
+                result.modified.append(path)
+            else:
+                result.unchanged += 1
+
+        result.deleted = [path for path in self.manifest if path not in manifest]
+
+        if commit:
+            self.manifest = manifest
+            self.save_manifest()
+        return result
+
+
+__all__ = ["FileReader", "FileWriter", "FileLister", "DirectoryScanner", "FileEntry", "ScanResult"]
@@ -1,6 +1,6 @@
 """文本处理工具"""
 import re
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from .base_tool import BaseTool
 
 
@@ -46,6 +46,37 @@ class TextSplitter(BaseTool):
             chunks.append(text[i:i + chunk_size])
         return chunks
 
+    @staticmethod
+    def split_stream(
+        texts: Iterable[str],
+        chunk_size: int = 1000,
+        overlap: int = 100
+    ) -> Iterator[str]:
+        """流式按字符数分割
+
+        输入为文本片段迭代器（如 FileReader.iter_chunks），输出与对拼接后的
+        全文调用 split_by_chars 完全一致，但内存中只保留一个分块大小的缓冲。
+
+        Raises:
+            ValueError: chunk_size 不大于 overlap（分块无法前进）
+        """
+        step = chunk_size - overlap
+        if step <= 0:
+            raise ValueError(f"chunk_size ({chunk_size}) must be greater than overlap ({overlap})")
+        buffer = ""
+        start = 0
+        for text in texts:
+            buffer += text
+            while len(buffer) - start >= chunk_size:
+                yield buffer[start:start + chunk_size]
+                start += step
+            buffer = buffer[start:]
+            start = 0
+
+        while start < len(buffer):
+            yield buffer[start:start + chunk_size]
+            start += step
+
     @staticmethod
     def split_by_sentences(text: str, max_chars: int = 1000) -> List[str]:
         """按句子分割"""
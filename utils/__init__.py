@@ -2,6 +2,9 @@
 from .logger import setup_logger, default_logger
 from .cache import SimpleCache, cached, default_cache
 from .validators import BaseValidator, RequestValidator, ResponseValidator
+from .metrics import MetricsRegistry, default_metrics
+from .stream_coalescer import CoalescePolicy, coalesce_stream
+from .json_stream import IncrementalJSONParser, loads_tolerant, repair_json
 
 __all__ = [
     "setup_logger",
@@ -12,4 +15,11 @@ __all__ = [
     "BaseValidator",
     "RequestValidator",
     "ResponseValidator",
+    "MetricsRegistry",
+    "default_metrics",
+    "CoalescePolicy",
+    "coalesce_stream",
+    "IncrementalJSONParser",
+    "loads_tolerant",
+    "repair_json",
 ]
@@ -0,0 +1,293 @@
+"""大模型 JSON 输出解析工具
+
+- repair_json：修复大模型输出中常见的 JSON 错误，不需要再调用一次模型：
+  代码块围栏、前后的说明文字、单引号字符串、未加引号的键和值、Python 的
+  True/False/None、注释、尾随逗号、成员间缺少的逗号、全角冒号/逗号、
+  字符串中未转义的换行，以及输出被截断时缺少的引号和括号
+- loads_tolerant：先按标准 JSON 解析，失败后修复再解析
+- IncrementalJSONParser：逐段输入流式增量，顶层对象的每个字段一完成就产出，
+  不必等整个回答生成结束（如工单的 type/urgency 可先用于分派和告警）
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_FENCE = re.compile(r"```[a-zA-Z]*")
+_LITERALS = {
+    "true": "true", "True": "true",
+    "false": "false", "False": "false",
+    "null": "null", "None": "null", "undefined": "null",
+}
+_NUMBER = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+_BARE_STOP = set(",:]}，：\"'\n\r") | {"{", "["}
+_FULLWIDTH = {"：": ":", "，": ","}
+_VALUE_END = "value"
+
+
+def _strip_wrapping(text: str) -> str:
+    """去掉代码块围栏和第一个 { 或 [ 之前的说明文字"""
+    text = _FENCE.sub("", text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):] if starts else text
+
+
+def repair_json(text: str) -> str:
+    """把大模型输出修复为合法的 JSON 文本（只处理第一个顶层对象或数组）"""
+    text = _strip_wrapping(text)
+    out: List[str] = []
+    stack: List[str] = []
+    # 上一个有效记号：open / comma / colon / value，用于判断键的位置和补逗号
+    last = None
+    quote = None
+    i, n = 0, len(text)
+
+    def begin_value():
+        if last == _VALUE_END and stack:
+            out.append(",")
+
+    while i < n:
+        c = text[i]
+        if quote is not None:
+            if c == "\\" and i + 1 < n:
+                nxt = text[i + 1]
+                out.append("\\" + nxt if nxt in "\"\\/bfnrtu" else ("'" if nxt == "'" else "\\\\" + nxt))
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+                last = _VALUE_END
+            elif c == '"':
+                out.append('\\"')
+            elif c == "\n":
+                out.append("\\n")
+            elif c == "\r":
+                out.append("\\r")
+            elif c == "\t":
+                out.append("\\t")
+            elif ord(c) < 0x20:
+                out.append(f"\\u{ord(c):04x}")
+            else:
+                out.append(c)
+            i += 1
+            continue
+
+        if c in " \t\r\n":
+            i += 1
+            continue
+        if c == "/" and text[i + 1:i + 2] in ("/", "*"):
+            end = text.find("\n" if text[i + 1] == "/" else "*/", i + 2)
+            i = n if end < 0 else end + (1 if text[i + 1] == "/" else 2)
+            continue
+        c = _FULLWIDTH.get(c, c)
+        if c in "\"'":
+            begin_value()
+            out.append('"')
+            quote = c
+            i += 1
+            continue
+        if c in "{[":
+            begin_value()
+            stack.append("}" if c == "{" else "]")
+            out.append(c)
+            last = "open"
+            i += 1
+            continue
+        if c in "}]":
+            while out and out[-1] in (",", ":"):
+                if out.pop() == ":":
+                    out.append(":null")
+                    break
+            if not stack:
+                break
+            # 括号不匹配时按栈补齐
+            while stack and stack[-1] != c:
+                out.append(stack.pop())
+            if stack:
+                out.append(stack.pop())
+            last = _VALUE_END
+            i += 1
+            if not stack:
+                break
+            continue
+        if c == ",":
+            if last not in ("open", "comma"):
+                out.append(",")
+                last = "comma"
+            i += 1
+            continue
+        if c == ":":
+            out.append(":")
+            last = "colon"
+            i += 1
+            continue
+
+        # 裸词：数字、字面量、未加引号的键或字符串
+        j = i
+        while j < n and text[j] not in _BARE_STOP and not (text[j] == "/" and text[j + 1:j + 2] in ("/", "*")):
+            j += 1
+        word = text[i:j].strip()
+        i = j
+        if not word:
+            i += 1
+            continue
+        begin_value()
+        expecting_key = stack and stack[-1] == "}" and last in ("open", "comma", _VALUE_END)
+        if not expecting_key and word in _LITERALS:
+            out.append(_LITERALS[word])
+        elif not expecting_key and _NUMBER.match(word):
+            out.append(word)
+        else:
+            out.append(json.dumps(word, ensure_ascii=False))
+        last = _VALUE_END
+
+    if quote is not None:
+        out.append('"')
+    while out and out[-1] in (",", ":"):
+        if out.pop() == ":":
+            out.append(":null")
+            break
+    while stack:
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def loads_tolerant(text: str) -> Any:
+    """解析大模型输出的 JSON：标准解析失败时修复后再解析
+
+    Raises:
+        ValueError: 没有找到 JSON 对象或数组，或修复后仍无法解析
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    text = _strip_wrapping(text)
+    if text[:1] not in ("{", "["):
+        raise ValueError("no JSON object or array found")
+    try:
+        return json.loads(text.strip())
+    except ValueError:
+        pass
+    return json.loads(repair_json(text))
+
+
+class IncrementalJSONParser:
+    """流式 JSON 增量解析器
+
+    只跟踪字符串和括号深度来定位顶层对象的成员边界，每个成员结束时单独
+    容错解析，整体为 O(n)。
+
+    用法：
+        parser = IncrementalJSONParser()
+        for delta in stream:
+            for key, value in parser.feed(delta).items():
+                ...
+        result = parser.result()
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._member_start = 0
+        self._depth = 0
+        self._quote: Optional[str] = None
+        self._escape = False
+        self._end: Optional[int] = None
+        self.fields: Dict[str, Any] = {}
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def started(self) -> bool:
+        """是否已出现顶层对象"""
+        return self._start is not None
+
+    @property
+    def complete(self) -> bool:
+        """顶层对象是否已闭合"""
+        return self._end is not None
+
+    @property
+    def end_offset(self) -> Optional[int]:
+        """顶层对象闭合处在全文中的偏移（闭合括号之后）"""
+        return self._end
+
+    def feed(self, delta: str) -> Dict[str, Any]:
+        """输入一段增量，返回本次新完成的顶层字段"""
+        self._text += delta
+        if self._end is not None:
+            return {}
+        completed: Dict[str, Any] = {}
+        text = self._text
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self._start is None:
+                if c == "{":
+                    self._start = i
+                    self._member_start = i + 1
+                    self._depth = 1
+                i += 1
+                continue
+            if self._quote is not None:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == self._quote:
+                    self._quote = None
+                i += 1
+                continue
+            if c in "\"'":
+                self._quote = c
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(text[self._member_start:i], completed)
+                    self._end = i + 1
+                    i += 1
+                    break
+            elif c in ",，" and self._depth == 1:
+                self._emit(text[self._member_start:i], completed)
+                self._member_start = i + 1
+            i += 1
+        self._pos = i
+        return completed
+
+    def _emit(self, member: str, completed: Dict[str, Any]):
+        if not member.strip():
+            return
+        try:
+            value = loads_tolerant("{" + member + "}")
+        except ValueError:
+            return
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key not in self.fields:
+                    self.fields[key] = item
+                    completed[key] = item
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """解析完整结果；对象未闭合（输出被截断）时尽量修复，无法解析返回 None"""
+        if self._start is None:
+            return None
+        end = self._end if self._end is not None else len(self._text)
+        try:
+            value = loads_tolerant(self._text[self._start:end])
+        except ValueError:
+            return dict(self.fields) if self.fields else None
+        return value if isinstance(value, dict) else None
+
+
+__all__ = [
+    "repair_json",
+    "loads_tolerant",
+    "IncrementalJSONParser",
+]
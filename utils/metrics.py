@@ -0,0 +1,129 @@
+"""进程内指标统计工具"""
+import threading
+from collections import deque
+from typing import Any, Dict, Tuple
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class _Timing:
+    """数值分布统计（计数、总和、最值、最近样本百分位）"""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.samples.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "p50": _percentile(ordered, 50),
+            "p99": _percentile(ordered, 99),
+        }
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    支持计数器（counter）、瞬时值（gauge）和分布（timing），均可带标签：
+
+        metrics.inc("llm_cache_hits", provider="deepseek")
+        metrics.observe("llm_latency_ms", 123.4, provider="deepseek")
+    """
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._timings: Dict[Tuple, _Timing] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    @staticmethod
+    def _format(key: Tuple) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器累加"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """设置瞬时值"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一个分布样本"""
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = _Timing(self._window)
+            timing.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        """获取计数器值"""
+        return self._counters.get(self._key(name, labels), 0)
+
+    def get_gauge(self, name: str, **labels) -> float:
+        """获取瞬时值"""
+        return self._gauges.get(self._key(name, labels), 0)
+
+    def get_timing(self, name: str, **labels) -> Dict[str, float]:
+        """获取分布统计"""
+        with self._lock:
+            timing = self._timings.get(self._key(name, labels))
+            return timing.summary() if timing else _Timing(1).summary()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """导出全部指标"""
+        with self._lock:
+            return {
+                "counters": {self._format(k): v for k, v in self._counters.items()},
+                "gauges": {self._format(k): v for k, v in self._gauges.items()},
+                "timings": {self._format(k): t.summary() for k, t in self._timings.items()},
+            }
+
+    def reset(self):
+        """清空全部指标"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+# 全局指标实例
+default_metrics = MetricsRegistry()
+
+
+__all__ = ["MetricsRegistry", "default_metrics"]
@@ -0,0 +1,94 @@
+"""流式片段合并工具
+
+上游增量往往只有一两个字，逐个写成 SSE 帧会带来大量小写入。合并器把片段缓冲起来，
+满足以下任一条件时整体输出：
+
+- 缓冲的字节数达到 max_bytes
+- 片段中出现句末标点或换行（sentence=True 时）
+- 缓冲中最早的片段已等待 max_delay 秒（上游停顿时也会按时输出，不会一直攒着）
+
+流中的非文本项（如进度、结果等结构化事件）会先输出已缓冲的文本，再原样输出。
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Union
+
+Chunk = Union[str, bytes]
+
+SENTENCE_ENDINGS = frozenset("。！？；…!?;\n")
+
+
+@dataclass
+class CoalescePolicy:
+    """合并策略
+
+    Attributes:
+        max_bytes: 缓冲字节数阈值
+        max_delay: 最长缓冲时间（秒）
+        sentence: 是否在句末标点处输出（只对文本片段生效）
+    """
+    max_bytes: int = 48
+    max_delay: float = 0.04
+    sentence: bool = True
+
+    def is_boundary(self, chunk: Chunk) -> bool:
+        return self.sentence and isinstance(chunk, str) and any(c in SENTENCE_ENDINGS for c in chunk)
+
+
+def _join(buffer: List[Chunk]) -> Chunk:
+    return b"".join(buffer) if isinstance(buffer[0], bytes) else "".join(buffer)
+
+
+async def coalesce_stream(source: AsyncIterator[Chunk], policy: Optional[CoalescePolicy]) -> AsyncIterator[Chunk]:
+    """按策略合并异步流中的片段；policy 为空时原样输出"""
+    if policy is None:
+        async for chunk in source:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = source.__aiter__()
+    buffer: List[Chunk] = []
+    size = 0
+    flush_at = 0.0
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, flush_at - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # 时间窗口到期，上游片段仍在等待中
+                yield _join(buffer)
+                buffer, size = [], 0
+                continue
+
+            future, pending = pending, None
+            try:
+                chunk = future.result()
+            except StopAsyncIteration:
+                break
+            if not isinstance(chunk, (str, bytes)):
+                if buffer:
+                    yield _join(buffer)
+                    buffer, size = [], 0
+                yield chunk
+                continue
+            if not buffer:
+                flush_at = loop.time() + policy.max_delay
+            buffer.append(chunk)
+            size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode("utf-8"))
+            if size >= policy.max_bytes or policy.is_boundary(chunk):
+                yield _join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield _join(buffer)
+    finally:
+        # 提前关闭时取消仍在等待的读取，由上游流自行处理取消
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
+__all__ = ["SENTENCE_ENDINGS", "CoalescePolicy", "coalesce_stream"]